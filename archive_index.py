@@ -0,0 +1,279 @@
+"""
+Search index over folders of generated invoice PDFs.
+
+Walks a directory tree, extracts the embedded invoice data of every PDF in a
+process pool and stores it in a separate SQLite index (one row per file,
+keyed by path with mtime, size and SHA-256). Re-runs only open files whose
+mtime or size changed; deleted files are dropped from the index.
+
+Examples:
+    python archive_index.py index archiv/ --pattern "Rechnung*.pdf"
+    python archive_index.py search --customer 17 --from 2024-01-01 --to 2024-12-31
+    python archive_index.py search --product kabel
+"""
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from database import db
+from pdf.invoice_data import read_invoice_data
+
+INDEX_FILE = "invoice_index.db"
+
+HASH_CHUNK = 1024 * 1024
+UNCHANGED = "unchanged"
+COMMIT_EVERY = 500   # files per transaction while indexing
+
+
+def create_index(index_file=INDEX_FILE):
+    db.get_connection(index_file).executescript("""
+        CREATE TABLE IF NOT EXISTS archive_files (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            invoice_date TEXT,
+            customer_id INTEGER,
+            item_count INTEGER,
+            subtotal REAL,
+            error TEXT
+        );
+        CREATE TABLE IF NOT EXISTS archive_items (
+            path TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            product TEXT NOT NULL,
+            product_id INTEGER,
+            quantity INTEGER,
+            price REAL,
+            PRIMARY KEY (path, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_archive_customer_date ON archive_files(customer_id, invoice_date);
+        CREATE INDEX IF NOT EXISTS idx_archive_date ON archive_files(invoice_date);
+        CREATE INDEX IF NOT EXISTS idx_archive_items_product ON archive_items(product COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_archive_items_product_id ON archive_items(product_id);
+    """)
+
+
+# ----------------------------------------------------------
+# WORKER
+# ----------------------------------------------------------
+def _extract(job):
+    """
+    Hash one PDF and read its invoice data. Returns a result tuple, never raises.
+    If the hash equals the known one (file only touched), data is UNCHANGED.
+    """
+    path, mtime_ns, size, known_sha256 = job
+    try:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+        if digest.hexdigest() == known_sha256:
+            return path, mtime_ns, size, known_sha256, UNCHANGED, None
+        payload = read_invoice_data(path)
+        data = json.loads(payload) if payload is not None else None
+        return path, mtime_ns, size, digest.hexdigest(), data, None if data else "keine Rechnungsdaten"
+    except Exception as e:
+        return path, mtime_ns, size, "", None, f"{type(e).__name__}: {e}"
+
+
+# ----------------------------------------------------------
+# INDEXING
+# ----------------------------------------------------------
+def scan(root, pattern="*.pdf"):
+    """Yield (path, mtime_ns, size) of all matching files below root."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file() and fnmatch.fnmatch(entry.name, pattern):
+                    stat = entry.stat()
+                    yield os.path.abspath(entry.path), stat.st_mtime_ns, stat.st_size
+
+
+def index_archive(root, index_file=INDEX_FILE, pattern="*.pdf", workers=None):
+    """
+    Bring the index up to date with the files below root.
+
+    Results are committed every COMMIT_EVERY files, so memory stays bounded
+    and an interrupted run keeps what it indexed (the next run finds those
+    files unchanged).
+    Returns a dict with the counts "scanned", "indexed", "unchanged", "removed", "failed".
+    """
+    create_index(index_file)
+    conn = db.get_connection(index_file)
+    root = os.path.abspath(root)
+    known = {
+        path: (mtime_ns, size, sha256)
+        for path, mtime_ns, size, sha256 in conn.execute(
+            "SELECT path, mtime_ns, size, sha256 FROM archive_files WHERE path >= ? AND path < ?",
+            (root + os.sep, root + chr(ord(os.sep) + 1)),
+        )
+    }
+
+    stats = {"scanned": 0, "indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+    jobs = []
+    for path, mtime_ns, size in scan(root, pattern):
+        stats["scanned"] += 1
+        old = known.pop(path, None)
+        if old and old[:2] == (mtime_ns, size):
+            stats["unchanged"] += 1
+        else:
+            jobs.append((path, mtime_ns, size, old[2] if old else None))
+
+    removed = [(path,) for path in known]
+    with db.transaction(index_file) as conn:
+        conn.executemany("DELETE FROM archive_items WHERE path = ?", removed)
+        conn.executemany("DELETE FROM archive_files WHERE path = ?", removed)
+    stats["removed"] = len(removed)
+
+    touched = []
+    files = []
+    items = []
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, mtime_ns, size, sha256, data, error in pool.map(_extract, jobs, chunksize=chunksize):
+                if data == UNCHANGED:
+                    touched.append((mtime_ns, size, path))
+                    stats["unchanged"] += 1
+                else:
+                    stats["failed" if error else "indexed"] += 1
+                    _collect(files, items, path, mtime_ns, size, sha256, data, error)
+                if len(touched) + len(files) >= COMMIT_EVERY:
+                    _store(index_file, touched, files, items)
+    _store(index_file, touched, files, items)
+    return stats
+
+
+def _collect(files, items, path, mtime_ns, size, sha256, data, error):
+    """Add the archive_files row and archive_items rows of one extracted file."""
+    data = data or {}
+    lines = data.get("items") or []
+    customer = data.get("customer") or {}
+    subtotal = round(sum(line.get("sum", 0.0) for line in lines), 2) if lines else None
+    files.append((path, mtime_ns, size, sha256, data.get("date"), customer.get("id"),
+                  len(lines), subtotal, error))
+    items.extend(
+        (path, position, line.get("product", ""), line.get("product_id"),
+         line.get("quantity"), line.get("price"))
+        for position, line in enumerate(lines, 1)
+    )
+
+
+def _store(index_file, touched, files, items):
+    """Write the collected rows in one transaction and empty the lists."""
+    if not (touched or files):
+        return
+    with db.transaction(index_file) as conn:
+        conn.executemany("UPDATE archive_files SET mtime_ns = ?, size = ? WHERE path = ?", touched)
+        conn.executemany("DELETE FROM archive_items WHERE path = ?", ((f[0],) for f in files))
+        conn.executemany("""
+            INSERT INTO archive_files (path, mtime_ns, size, sha256, invoice_date, customer_id,
+                                       item_count, subtotal, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                mtime_ns = excluded.mtime_ns, size = excluded.size, sha256 = excluded.sha256,
+                invoice_date = excluded.invoice_date, customer_id = excluded.customer_id,
+                item_count = excluded.item_count, subtotal = excluded.subtotal, error = excluded.error
+        """, files)
+        conn.executemany("""
+            INSERT INTO archive_items (path, position, product, product_id, quantity, price)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, items)
+    touched.clear()
+    files.clear()
+    items.clear()
+
+
+# ----------------------------------------------------------
+# QUERIES
+# ----------------------------------------------------------
+def search(index_file=INDEX_FILE, customer_id=None, date_from=None, date_to=None, product=None, limit=None):
+    """
+    Indexed invoices matching all given filters, newest first.
+    product matches the product name case-insensitively (literal substring, "%" and "_" included)
+    or, if numeric, the product id.
+    Returns a list of dicts with path, date, customer_id, item_count and subtotal (net, before discount).
+    """
+    sql = """
+        SELECT f.path, f.invoice_date, f.customer_id, f.item_count, f.subtotal
+        FROM archive_files f
+        WHERE f.error IS NULL
+    """
+    params = []
+    if customer_id is not None:
+        sql += " AND f.customer_id = ?"
+        params.append(customer_id)
+    if date_from:
+        sql += " AND f.invoice_date >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND f.invoice_date <= ?"
+        params.append(date_to)
+    if product:
+        if str(product).isdigit():
+            sql += " AND EXISTS (SELECT 1 FROM archive_items i WHERE i.path = f.path AND i.product_id = ?)"
+            params.append(int(product))
+        else:
+            sql += (" AND EXISTS (SELECT 1 FROM archive_items i"
+                    " WHERE i.path = f.path AND i.product LIKE ? ESCAPE '\\')")
+            escaped = product.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+    sql += " ORDER BY f.invoice_date DESC, f.path"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    return [
+        {"path": path, "date": invoice_date, "customer_id": cust_id, "item_count": count, "subtotal": net}
+        for path, invoice_date, cust_id, count, net in db.get_connection(index_file).execute(sql, params)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default=INDEX_FILE, help="SQLite index file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_cmd = commands.add_parser("index", help="index (or update) a directory tree")
+    index_cmd.add_argument("root", help="folder with invoice PDFs")
+    index_cmd.add_argument("--pattern", default="*.pdf", help="file name pattern (default: %(default)s)")
+    index_cmd.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+
+    search_cmd = commands.add_parser("search", help="query the index")
+    search_cmd.add_argument("--customer", type=int, help="customer id")
+    search_cmd.add_argument("--from", dest="date_from", help="first invoice date, YYYY-MM-DD")
+    search_cmd.add_argument("--to", dest="date_to", help="last invoice date, YYYY-MM-DD")
+    search_cmd.add_argument("--product", help="product name (part of it) or product id")
+    search_cmd.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "index":
+        start = time.perf_counter()
+        stats = index_archive(args.root, args.index, args.pattern, args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{stats['scanned']} Dateien geprüft in {elapsed:.2f} s: {stats['indexed']} indiziert, "
+              f"{stats['unchanged']} unverändert, {stats['removed']} entfernt, {stats['failed']} ohne Rechnungsdaten")
+    else:
+        create_index(args.index)
+        rows = search(args.index, args.customer, args.date_from, args.date_to, args.product, args.limit)
+        for row in rows:
+            net = f"{row['subtotal']:.2f}" if row["subtotal"] is not None else "-"
+            print(f"{row['date'] or '-':10}  Kunde {row['customer_id'] or '-':>6}  {net:>10} €  {row['path']}")
+        print(f"{len(rows)} Rechnungen gefunden")
+
+    db.close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Headless batch rendering of invoice PDFs.
+
+Invoice definitions come either from the database (invoices/invoice_lines)
+or from JSON files. A JSON file holds one invoice or a list of invoices in
+the same shape as the data embedded into generated PDFs:
+
+    {"customer": {"id": 3}, "date": "2024-05-31",
+     "items": [{"product": "Kabel", "quantity": 2, "price": 4.5}],
+     "rabatt": {"mode": "Rabattbetrag (€)", "value": 5.0},
+     "file_name": "Rechnung_2024_0001.pdf"}
+
+JSON invoices are rendered, not stored, so they take no number from the
+invoice number counters: the PDF shows the "invoice_number" given in the
+file, or none. Invoices to be numbered belong in the database (--db).
+
+Examples:
+    python batch_render.py --json monthly/*.json --out out/
+    python batch_render.py --db --from 2024-05-01 --to 2024-05-31 --out out/
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from database import db
+
+# Per-worker state, set up once by _init_worker
+_renderer = None
+
+
+def _init_worker(db_file):
+    global _renderer
+    from pdf.invoice_renderer import InvoiceRenderer
+
+    db.DB_FILE = db_file
+    _renderer = InvoiceRenderer()
+    # Business info and the decoded logo are loaded once per worker and reused for every job
+    _renderer.context.preload()
+
+
+def _render_job(job):
+    """Render one invoice; returns (file_path, error message or None)."""
+    file_path = job["file_path"]
+    try:
+        rabatt = job.get("rabatt") or {}
+        _renderer.render(
+            file_path,
+            job["items"],
+            customer=job.get("customer"),
+            rabatt_mode=rabatt.get("mode"),
+            rabatt_value=rabatt.get("value") or 0.0,
+            invoice_date=job.get("date"),
+            invoice_id=job.get("invoice_id"),
+            invoice_number=job.get("invoice_number"),
+        )
+        return file_path, None
+    except Exception as e:
+        return file_path, f"{type(e).__name__}: {e}"
+
+
+def jobs_from_json(paths, out_dir):
+    index = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for invoice in data if isinstance(data, list) else [data]:
+            index += 1
+            name = invoice.get("file_name") or f"Rechnung_{index:05d}.pdf"
+            yield dict(invoice, file_path=os.path.join(out_dir, name))
+
+
+def jobs_from_db(out_dir, date_from=None, date_to=None, customer_id=None):
+    conn = db.get_connection()
+    sql = "SELECT id, invoice_number, customer_id, date, rabatt_mode, rabatt_value FROM invoices WHERE 1=1"
+    params = []
+    if customer_id is not None:
+        sql += " AND customer_id = ?"
+        params.append(customer_id)
+    if date_from:
+        sql += " AND date >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND date <= ?"
+        params.append(date_to)
+    sql += " ORDER BY id"
+
+    for invoice_id, number, cust_id, invoice_date, rabatt_mode, rabatt_value in conn.execute(sql, params).fetchall():
+        lines = conn.execute("""
+            SELECT product_id, name, quantity, price, tax_rate
+            FROM invoice_lines
+            WHERE invoice_id = ?
+            ORDER BY position
+        """, (invoice_id,)).fetchall()
+        yield {
+            "file_path": os.path.join(out_dir, f"Rechnung_{invoice_id}.pdf"),
+            "customer": {"id": cust_id},
+            "date": invoice_date,
+            "rabatt": {"mode": rabatt_mode, "value": rabatt_value},
+            "invoice_id": invoice_id,
+            "invoice_number": number,
+            "items": [{"product_id": pid, "product": n, "quantity": q, "price": p, "tax_rate": t}
+                      for pid, n, q, p, t in lines],
+        }
+
+
+def render_batch(jobs, workers=None, db_file=None):
+    """Render all jobs in a process pool. Returns (rendered_count, failures, elapsed)."""
+    db_file = os.path.abspath(db_file or db.DB_FILE)
+    jobs = list(jobs)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (workers * 8))
+
+    rendered = 0
+    failures = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_file,)) as pool:
+        for file_path, error in pool.map(_render_job, jobs, chunksize=chunksize):
+            if error:
+                failures.append((file_path, error))
+            else:
+                rendered += 1
+    return rendered, failures, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--json", nargs="+", metavar="FILE", help="JSON files with invoice definitions")
+    source.add_argument("--db", action="store_true", help="render invoices stored in the database")
+    parser.add_argument("--out", required=True, help="output directory for the PDFs")
+    parser.add_argument("--from", dest="date_from", help="(--db) first invoice date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="(--db) last invoice date, YYYY-MM-DD")
+    parser.add_argument("--customer", type=int, help="(--db) only invoices of this customer id")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--db-file", default=db.DB_FILE, help="SQLite database (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    db.DB_FILE = args.db_file
+    db.create_tables()
+    os.makedirs(args.out, exist_ok=True)
+
+    if args.json:
+        jobs = jobs_from_json(args.json, args.out)
+    else:
+        jobs = jobs_from_db(args.out, args.date_from, args.date_to, args.customer)
+
+    rendered, failures, elapsed = render_batch(jobs, args.workers, args.db_file)
+    db.close_connections()
+
+    rate = rendered / elapsed if elapsed > 0 else 0.0
+    print(f"{rendered} Rechnungen in {elapsed:.2f} s erstellt ({rate:.1f} Rechnungen/s), {len(failures)} Fehler")
+    for file_path, error in failures:
+        print(f"  FEHLER {file_path}: {error}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: per-query latency of a simple product lookup with a fresh
+sqlite3 connection per query (old behaviour) vs. the pooled connection
+from database.db.
+
+    python benchmarks/bench_db_connection.py [--queries 5000] [--products 5000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db  # noqa: E402
+
+LOOKUP_SQL = "SELECT id, name, price FROM products WHERE id = ?"
+
+
+def seed(db_file, products):
+    db.DB_FILE = db_file
+    db.create_tables()
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO products (name, price) VALUES (?, ?)",
+            ((f"Produkt {i}", i * 0.5) for i in range(products)),
+        )
+
+
+def bench_fresh_connection(db_file, queries, products):
+    start = time.perf_counter()
+    for i in range(queries):
+        conn = sqlite3.connect(db_file)
+        c = conn.cursor()
+        c.execute(LOOKUP_SQL, (i % products + 1,))
+        c.fetchone()
+        conn.close()
+    return (time.perf_counter() - start) / queries
+
+
+def bench_pooled_connection(db_file, queries, products):
+    start = time.perf_counter()
+    for i in range(queries):
+        db.get_connection(db_file).execute(LOOKUP_SQL, (i % products + 1,)).fetchone()
+    return (time.perf_counter() - start) / queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        seed(db_file, args.products)
+
+        before = bench_fresh_connection(db_file, args.queries, args.products)
+        after = bench_pooled_connection(db_file, args.queries, args.products)
+        db.close_connections()
+
+    print(f"fresh connection per query: {before * 1e6:8.1f} µs/query")
+    print(f"pooled connection:          {after * 1e6:8.1f} µs/query")
+    print(f"speed-up:                   {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
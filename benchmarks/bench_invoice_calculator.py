@@ -0,0 +1,66 @@
+"""
+Benchmark of the invoice calculation engine on very long invoices.
+
+Compares the old float loop (sum of qty * price, then * 0.19) with
+models.invoice_calculator, including the cost of building the
+__slots__ InvoiceLine objects.
+
+    python benchmarks/bench_invoice_calculator.py [--lines 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.invoice_calculator import RABATT_AMOUNT, calculate_totals  # noqa: E402
+from models.invoice_line import InvoiceLine  # noqa: E402
+
+
+def float_totals(rows):
+    total_net = 0.0
+    for qty, price, _ in rows:
+        total_net += qty * price
+    tax = total_net * 0.19
+    return total_net, tax, total_net + tax
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rows = [(rng.randint(1, 50), round(rng.uniform(0.5, 500), 2), rng.choice((0.19, 0.07)))
+            for _ in range(args.lines)]
+
+    start = time.perf_counter()
+    float_totals(rows)
+    float_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    lines = [InvoiceLine(i, qty, price, tax_rate=rate) for i, (qty, price, rate) in enumerate(rows)]
+    build_ms = (time.perf_counter() - start) * 1000
+
+    del lines
+    tracemalloc.start()
+    lines = [InvoiceLine(i, qty, price, tax_rate=rate) for i, (qty, price, rate) in enumerate(rows)]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    totals = calculate_totals(lines, RABATT_AMOUNT, 100)
+    calc_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{args.lines} lines")
+    print(f"float loop (old, single rate):  {float_ms:8.1f} ms")
+    print(f"build InvoiceLine objects:      {build_ms:8.1f} ms  ({peak / args.lines:.0f} bytes/line)")
+    print(f"calculate_totals (exact cents): {calc_ms:8.1f} ms")
+    print(f"net {totals.net}  tax {totals.tax}  gross {totals.gross}")
+
+
+if __name__ == "__main__":
+    main()
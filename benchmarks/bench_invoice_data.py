@@ -0,0 +1,85 @@
+"""
+Benchmark: loading the embedded invoice data from a large PDF.
+
+Builds an invoice of roughly --size-mb megabytes (an incompressible logo
+inflates the file) and compares the old approach, reading the whole file
+and searching for the markers, with pdf.invoice_data.read_invoice_data,
+which only touches the tail, the xref and a few objects.
+
+    python benchmarks/bench_invoice_data.py [--size-mb 50] [--repeat 20]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from database import db  # noqa: E402
+from pdf.invoice_data import LEGACY_END, LEGACY_START, read_invoice_data  # noqa: E402
+from pdf.invoice_renderer import InvoiceRenderer  # noqa: E402
+
+
+def build_pdf(path, size_mb):
+    # reportlab stores the image ASCII85-encoded, about 5/4 of the raw size
+    side = int((size_mb * 1024 * 1024 * 4 / 5 / 3) ** 0.5)
+    logo = io.BytesIO()
+    Image.frombytes("RGB", (side, side), os.urandom(side * side * 3)).save(logo, "PNG")
+
+    renderer = InvoiceRenderer()
+    renderer.set_logo_bytes(logo.getvalue())
+    items = [{"product": f"Produkt {i}", "quantity": 1, "price": 9.99} for i in range(50)]
+    renderer.render(path, items, customer={"id": 1})
+
+
+def read_markers(path):
+    with open(path, "rb") as f:
+        content = f.read()
+    start = content.find(LEGACY_START)
+    end = content.find(LEGACY_END)
+    return content[start + len(LEGACY_START):end]
+
+
+def timed(func, path, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(path)
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_FILE = os.path.join(tmp, "bench.db")
+        db.create_tables()
+        path = os.path.join(tmp, "large.pdf")
+        build_pdf(path, args.size_mb)
+
+        payload = read_invoice_data(path)
+        legacy_path = os.path.join(tmp, "legacy.pdf")
+        with open(path, "rb") as src, open(legacy_path, "wb") as dst:
+            dst.write(src.read() + b"\n" + LEGACY_START + payload + LEGACY_END)
+        db.close_connections()
+
+        size = os.path.getsize(path) / 1024 / 1024
+        full_ms, _ = timed(read_markers, legacy_path, args.repeat)
+        legacy_ms, _ = timed(read_invoice_data, legacy_path, args.repeat)
+        embedded_ms, result = timed(read_invoice_data, path, args.repeat)
+        assert result == payload
+
+    print(f"PDF size: {size:.1f} MB, payload {len(payload)} bytes")
+    print(f"read whole file + find markers: {full_ms:8.2f} ms")
+    print(f"markers via mmap tail:          {legacy_ms:8.2f} ms")
+    print(f"embedded file via xref:         {embedded_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: invoice PDFs with the footer drawn inline on every page vs.
+recorded once per document as a form XObject (the renderer's default for
+invoices of InvoiceRenderer.FORMS_FROM_PAGE pages and more).
+
+Reports bytes per PDF and ms per invoice for both variants, by default for
+invoices of 10, 20 and 200 lines (one, two and eight pages).
+
+    python benchmarks/bench_pdf_forms.py [--invoices 200] [--lines 10 20 200]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from database import db  # noqa: E402
+from pdf.invoice_renderer import InvoiceRenderer  # noqa: E402
+
+
+def seed(db_file):
+    db.DB_FILE = db_file
+    db.create_tables()
+    logo = io.BytesIO()
+    Image.new("RGB", (600, 200), "navy").save(logo, "PNG")
+    with db.transaction() as conn:
+        conn.execute("""
+            INSERT INTO business_info (id, company_name, address, city_id, vat_id, phone, email,
+                                       website, bank_name, iban, bic, account_holder)
+            VALUES (1, 'Muster GmbH', 'Hauptstr. 1', '12345 Musterstadt', 'DE123456789',
+                    '+49 123 4567', 'info@muster.de', 'www.muster.de', 'Musterbank',
+                    'DE02120300000000202051', 'BYLADEM1001', 'Muster GmbH')
+        """)
+        conn.execute("INSERT INTO settings (key, value) VALUES ('logo', ?)", (logo.getvalue(),))
+        conn.execute("INSERT INTO customers (name, city) VALUES ('Beispiel AG', 'Berlin')")
+
+
+def bench(renderer, out_dir, invoices, lines):
+    items = [{"product": f"Produkt {i}", "quantity": i % 7 + 1, "price": 1.25 * (i + 1)} for i in range(lines)]
+    total_bytes = 0
+    start = time.perf_counter()
+    for n in range(invoices):
+        pages = renderer.render(os.path.join(out_dir, f"{n}.pdf"), items, customer={"id": 1})
+    elapsed = time.perf_counter() - start
+    for n in range(invoices):
+        total_bytes += os.path.getsize(os.path.join(out_dir, f"{n}.pdf"))
+    return total_bytes / invoices, elapsed * 1000 / invoices, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 20, 200])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, "bench.db"))
+        bench(InvoiceRenderer(), tmp, 5, max(args.lines))  # warm up fonts, logo and connection
+        for lines in args.lines:
+            inline = bench(InvoiceRenderer(use_forms=False), tmp, args.invoices, lines)
+            forms = bench(InvoiceRenderer(use_forms=True), tmp, args.invoices, lines)
+            print(f"{lines} lines ({inline[2]} page(s)):")
+            print(f"  inline footer: {inline[0]:10.0f} bytes/PDF {inline[1]:8.2f} ms/invoice")
+            print(f"  form XObject:  {forms[0]:10.0f} bytes/PDF {forms[1]:8.2f} ms/invoice")
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    main()
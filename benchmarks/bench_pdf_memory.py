@@ -0,0 +1,57 @@
+"""
+Benchmark: peak Python memory of rendering one invoice PDF, by line count.
+
+The renderer streams its items, but reportlab keeps every page's content
+until save() and the JSON of every line is collected for the embedded
+data, so memory is O(lines). This reports the peak (tracemalloc) and the
+bytes per line, so a regression to materializing the items or the like
+shows up as a jump in the per-line figure.
+
+    python benchmarks/bench_pdf_memory.py [--lines 1000 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pdf_forms import seed  # noqa: E402
+from database import db  # noqa: E402
+from pdf.invoice_renderer import InvoiceRenderer  # noqa: E402
+
+
+def peak_memory(renderer, path, lines):
+    """Peak traced bytes and seconds (with tracing overhead) for one invoice of the given line count."""
+    items = ({"product": f"Produkt {i}", "quantity": i % 7 + 1, "price": 1.25 * (i + 1)} for i in range(lines))
+    start = time.perf_counter()
+    tracemalloc.start()
+    try:
+        renderer.render(path, items, customer={"id": 1})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 20_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, "bench.db"))
+        renderer = InvoiceRenderer()
+        path = os.path.join(tmp, "invoice.pdf")
+        peak_memory(renderer, path, 10)  # warm up fonts, logo and connection
+        for lines in args.lines:
+            peak, seconds = peak_memory(renderer, path, lines)
+            print(f"{lines:8} lines: peak {peak / 2 ** 20:8.1f} MB  {peak / lines:8.0f} bytes/line  "
+                  f"({seconds:.1f} s traced)")
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    main()
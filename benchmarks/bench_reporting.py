@@ -0,0 +1,134 @@
+"""
+Benchmark: revenue reports from the rollup tables vs. aggregating the raw
+invoice lines on every request.
+
+Synthesizes --lines invoice lines (10 per invoice, spread over five years,
+--customers customers and --products products) directly in SQL, folds them
+into the rollups once, saves a few invoices through the repository (the
+incremental path) and times each report for a full year, a quarter with
+ragged edges and a single month.
+
+    python benchmarks/bench_reporting.py [--lines 10000000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db, reporting  # noqa: E402
+from database.invoice_repository import InvoiceRepository  # noqa: E402
+from models.invoice import Invoice  # noqa: E402
+from models.invoice_line import InvoiceLine  # noqa: E402
+
+LINES_PER_INVOICE = 10
+DAYS = 5 * 365
+RANGES = [
+    ("year", "2023-01-01", "2023-12-31"),
+    ("quarter", "2023-04-12", "2023-07-19"),
+    ("month", "2023-06-01", "2023-06-30"),
+]
+
+RAW_REPORTS = {
+    "customer": """
+        SELECT customer_id, COUNT(*), SUM(net), SUM(tax) FROM invoices
+        WHERE date BETWEEN ? AND ? GROUP BY customer_id
+    """,
+    "product": """
+        SELECT l.product_id, SUM(l.quantity), SUM(l.quantity * l.price)
+        FROM invoice_lines l JOIN invoices i ON i.id = l.invoice_id
+        WHERE i.date BETWEEN ? AND ? GROUP BY l.product_id
+    """,
+    "vat": """
+        SELECT l.tax_rate, SUM(l.quantity * l.price)
+        FROM invoice_lines l JOIN invoices i ON i.id = l.invoice_id
+        WHERE i.date BETWEEN ? AND ? GROUP BY l.tax_rate
+    """,
+}
+
+ROLLUP_REPORTS = {
+    "customer": reporting.revenue_by_customer,
+    "product": reporting.revenue_by_product,
+    "vat": reporting.vat_totals,
+}
+
+
+def seed(lines, customers, products):
+    invoices = lines // LINES_PER_INVOICE
+    with db.transaction() as conn:
+        conn.execute(f"""
+            INSERT INTO invoices (id, customer_id, date, total, rabatt_mode, rabatt_value, discount, net, tax)
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {invoices})
+            SELECT i, i % {customers} + 1, date('2021-01-01', '+' || (i * 7919 % {DAYS}) || ' days'),
+                   0, 'none', 0, 0, 0, 0
+            FROM n
+        """)
+        conn.execute(f"""
+            INSERT INTO invoice_lines (invoice_id, position, product_id, name, quantity, price, tax_rate)
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {lines - 1})
+            SELECT i / {LINES_PER_INVOICE} + 1, i % {LINES_PER_INVOICE} + 1, i * 31 % {products} + 1,
+                   'Produkt', i % 5 + 1, (i % 200 + 1) * 0.25, CASE WHEN i % 4 = 0 THEN 0.07 ELSE 0.19 END
+            FROM n
+        """)
+        conn.execute("""
+            INSERT INTO invoice_taxes (invoice_id, tax_rate, net_cents, tax_cents)
+            SELECT invoice_id, tax_rate, CAST(ROUND(SUM(quantity * price) * 100) AS INTEGER),
+                   CAST(ROUND(SUM(quantity * price) * tax_rate * 100) AS INTEGER)
+            FROM invoice_lines GROUP BY invoice_id, tax_rate
+        """)
+        conn.execute("""
+            UPDATE invoices SET
+                net = (SELECT SUM(net_cents) FROM invoice_taxes t WHERE t.invoice_id = invoices.id) / 100.0,
+                tax = (SELECT SUM(tax_cents) FROM invoice_taxes t WHERE t.invoice_id = invoices.id) / 100.0
+        """)
+        conn.execute("UPDATE invoices SET total = net + tax")
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_FILE = os.path.join(tmp, "bench.db")
+        db.create_tables()
+
+        start = time.perf_counter()
+        seed(args.lines, args.customers, args.products)
+        print(f"seeded {args.lines} lines in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        reporting.refresh_rollups()
+        print(f"initial rollup in {time.perf_counter() - start:.1f} s")
+
+        # The incremental path: one invoice saved through the repository
+        invoice = Invoice(1, "2023-06-15")
+        for i in range(LINES_PER_INVOICE):
+            invoice.add_line(InvoiceLine(i + 1, 2, "9.99", "Produkt"))
+        save_ms = timed(lambda: InvoiceRepository.save_invoice(invoice), args.repeat)
+        print(f"save_invoice incl. rollup update: {save_ms:8.2f} ms")
+
+        conn = db.get_connection()
+        print(f"{'report':10} {'range':8} {'raw lines':>12} {'rollups':>10}")
+        for report, raw_sql in RAW_REPORTS.items():
+            for label, date_from, date_to in RANGES:
+                raw_ms = timed(lambda: conn.execute(raw_sql, (date_from, date_to)).fetchall(), max(1, args.repeat // 10))
+                rollup_ms = timed(lambda: ROLLUP_REPORTS[report](date_from, date_to), args.repeat)
+                print(f"{report:10} {label:8} {raw_ms:9.1f} ms {rollup_ms:7.2f} ms")
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    main()
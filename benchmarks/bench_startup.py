@@ -0,0 +1,105 @@
+"""
+Benchmark: application startup, measured the way a user sees it.
+
+Starts main.py --quit-after-startup against a database seeded like the
+suite's (run_suite.seed_database) and reads the startup milestones from
+its trace:
+
+    first_window   process start until the main window's first paint
+    interactive    process start until products, customers and the logo
+                   are loaded and the window reacts to input
+
+Both are measured from the moment the process is spawned, so interpreter
+and import time are included. The result file has the format of
+run_suite.py, so releases can be compared with its compare command.
+Runs on the offscreen Qt platform unless QT_QPA_PLATFORM is set.
+
+    python benchmarks/bench_startup.py [--runs 10] [--quick] [--out startup.json]
+    python benchmarks/run_suite.py compare baseline_startup.json startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db  # noqa: E402
+from run_suite import Env, seed_database, summarize, run_suite_meta  # noqa: E402
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+MILESTONES = {"startup.first_window": "startup_first_window", "startup.interactive": "startup_interactive"}
+TIMEOUT = 60
+
+
+def start_once(workdir, env):
+    """Run the application once; returns {milestone: ms since spawn} and whether reportlab was loaded."""
+    trace = os.path.join(workdir, "trace.jsonl")
+    if os.path.exists(trace):
+        os.remove(trace)
+    spawned = time.time()
+    subprocess.run([sys.executable, MAIN, "--trace", trace, "--quit-after-startup"],
+                   cwd=workdir, env=env, check=True, timeout=TIMEOUT,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    times = {}
+    reportlab_loaded = False
+    with open(trace, encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            if event["name"] in MILESTONES:
+                times[MILESTONES[event["name"]]] = (event["ts"] - spawned) * 1000
+                reportlab_loaded |= event["reportlab_loaded"]
+    missing = set(MILESTONES.values()) - times.keys()
+    if missing:
+        raise RuntimeError(f"no {', '.join(sorted(missing))} event in the trace")
+    return times, reportlab_loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--quick", action="store_true", help="smaller database (smoke test)")
+    parser.add_argument("--out", help="write the results as JSON (run_suite.py format)")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    for name in ("BILLCRAFT_TRACE", "BILLCRAFT_PROFILE"):
+        env.pop(name, None)
+
+    timings = {name: [] for name in MILESTONES.values()}
+    reportlab_loaded = False
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_database(Env(tmp, args.quick))
+        db.close_connections()
+        shutil.move(db.DB_FILE, os.path.join(tmp, "invoices.db"))
+
+        start_once(tmp, env)  # warm-up: file cache, migrations are already applied
+        for _ in range(args.runs):
+            times, loaded = start_once(tmp, env)
+            reportlab_loaded |= loaded
+            for name, ms in times.items():
+                timings[name].append(ms)
+
+    results = {name: summarize(values) for name, values in timings.items()}
+    for name, result in results.items():
+        print(f"{name:28} {result['median_ms']:10.3f} ms  (min {result['min_ms']:.3f}, {result['rounds']} runs)")
+    if reportlab_loaded:
+        print("warning: reportlab was imported during startup")
+
+    if args.out:
+        meta = run_suite_meta(args.quick)
+        meta["runs"] = args.runs
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
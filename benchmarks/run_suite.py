@@ -0,0 +1,381 @@
+"""
+Benchmark suite for the core billing paths.
+
+Seeds a temporary database with synthetic data (fixed random seed) and
+times product CSV import, customer lookups, total calculation, PDF
+rendering of small, medium and huge invoices, loading the embedded invoice
+data, database save/load round trips and loading a stored invoice into the
+invoice table. Results (ms per operation: min, median, mean, stdev) are
+written to a JSON file.
+
+"compare" checks a run against a baseline and exits with status 1 if any
+benchmark's median got slower by more than the threshold.
+
+    python benchmarks/run_suite.py run --out results.json [--quick] [-k pdf]
+    python benchmarks/run_suite.py compare baseline.json results.json [--threshold 0.10]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from database import db  # noqa: E402
+from database.custumer_repository import CustomerRepository  # noqa: E402
+from database.invoice_repository import InvoiceRepository  # noqa: E402
+from database.product_import import import_products_csv  # noqa: E402
+from models.invoice import Invoice  # noqa: E402
+from models.invoice_calculator import RABATT_AMOUNT, calculate_totals  # noqa: E402
+from models.invoice_line import InvoiceLine  # noqa: E402
+from pdf.invoice_data import read_invoice_data  # noqa: E402
+from pdf.invoice_renderer import InvoiceRenderer  # noqa: E402
+
+SEED = 42
+DEFAULT_THRESHOLD = 0.10
+
+CITIES = ["Berlin", "Hamburg", "München", "Köln", "Leipzig", "Dresden", "Bremen", "Essen"]
+WORDS = ["Kabel", "Stecker", "Dose", "Schalter", "Leuchte", "Rohr", "Schraube", "Dübel", "Adapter", "Sensor"]
+
+
+class Env:
+    """Shared state of one suite run: temp dir, seeded database, scale and RNG."""
+
+    def __init__(self, tmp, quick):
+        self.tmp = tmp
+        self.quick = quick
+        self.rng = random.Random(SEED)
+        self.customers = 1000 if quick else 10_000
+        self.products = 1000 if quick else 5000
+        self.renderer = None
+        self.qt_app = None
+
+    def size(self, full, quick):
+        return quick if self.quick else full
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def items(self, count):
+        return [
+            {"product": f"{self.rng.choice(WORDS)} {i}", "product_id": i % self.products + 1,
+             "quantity": self.rng.randint(1, 20), "price": round(self.rng.uniform(0.5, 500), 2),
+             "tax_rate": self.rng.choice((0.19, 0.19, 0.07))}
+            for i in range(count)
+        ]
+
+
+def seed_database(env):
+    db.DB_FILE = env.path("suite.db")
+    db.create_tables()
+    logo = io.BytesIO()
+    Image.new("RGB", (600, 200), "navy").save(logo, "PNG")
+    rng = env.rng
+    with db.transaction() as conn:
+        conn.execute("""
+            INSERT INTO business_info (id, company_name, address, city_id, vat_id, phone, email,
+                                       website, bank_name, iban, bic, account_holder)
+            VALUES (1, 'Muster GmbH', 'Hauptstr. 1', '12345 Musterstadt', 'DE123456789',
+                    '+49 123 4567', 'info@muster.de', 'www.muster.de', 'Musterbank',
+                    'DE02120300000000202051', 'BYLADEM1001', 'Muster GmbH')
+        """)
+        conn.execute("INSERT INTO settings (key, value) VALUES ('logo', ?)", (logo.getvalue(),))
+        conn.executemany(
+            "INSERT INTO customers (name, contact_name, email, city, tax_number) VALUES (?, ?, ?, ?, ?)",
+            ((f"{rng.choice(WORDS)}handel {i} GmbH", f"Kontakt {i}", f"kunde{i}@example.de",
+              rng.choice(CITIES), f"DE{rng.randint(10 ** 8, 10 ** 9 - 1)}") for i in range(env.customers)),
+        )
+        conn.executemany(
+            "INSERT INTO products (name, price) VALUES (?, ?)",
+            ((f"{rng.choice(WORDS)} Typ {i}", round(rng.uniform(0.5, 500), 2)) for i in range(env.products)),
+        )
+
+
+# ----------------------------------------------------------
+# BENCHMARKS
+#
+# A benchmark's setup(env) runs once, untimed, and returns the function to
+# time, or (function, reset) where reset() runs untimed before every call.
+# ops is the number of operations per call; results are per operation.
+# ----------------------------------------------------------
+BENCHMARKS = {}
+
+
+def benchmark(name, ops=1):
+    def register(setup):
+        BENCHMARKS[name] = (setup, ops)
+        return setup
+    return register
+
+
+@benchmark("csv_import_products")
+def _csv_import(env):
+    path = env.path("products.csv")
+    rows = env.size(10_000, 1000)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["Name", "Preis"])
+        for i in range(rows):
+            writer.writerow([f"Import {env.rng.choice(WORDS)} {i}", f"{env.rng.uniform(0.5, 500):.2f}".replace(".", ",")])
+
+    def reset():
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM products WHERE name LIKE 'Import %'")
+
+    return lambda: import_products_csv(path), reset
+
+
+@benchmark("customer_search", ops=100)
+def _customer_search(env):
+    queries = [f"{env.rng.choice(WORDS)[:3]} {env.rng.choice(CITIES)[:2]}" for _ in range(100)]
+
+    def run():
+        for text in queries:
+            CustomerRepository.search_customers(text)
+    return run
+
+
+@benchmark("customer_by_id", ops=1000)
+def _customer_by_id(env):
+    ids = [env.rng.randint(1, env.customers) for _ in range(1000)]
+
+    def run():
+        for customer_id in ids:
+            CustomerRepository.get_customer_by_id(customer_id)
+    return run
+
+
+@benchmark("calculate_totals_10k_lines")
+def _calculate_totals(env):
+    lines = [InvoiceLine(item["product_id"], item["quantity"], item["price"], item["product"], item["tax_rate"])
+             for item in env.items(10_000)]
+    return lambda: calculate_totals(lines, RABATT_AMOUNT, 100)
+
+
+def _render(env, name, lines):
+    items = env.items(lines)
+    path = env.path(f"{name}.pdf")
+    return lambda: env.renderer.render(path, items, customer={"id": 1}, invoice_number="2024-0001")
+
+
+@benchmark("render_pdf_small")
+def _render_small(env):
+    return _render(env, "small", 5)
+
+
+@benchmark("render_pdf_medium")
+def _render_medium(env):
+    return _render(env, "medium", 200)
+
+
+@benchmark("render_pdf_huge")
+def _render_huge(env):
+    return _render(env, "huge", env.size(5000, 1000))
+
+
+@benchmark("load_embedded_json", ops=10)
+def _load_embedded_json(env):
+    path = env.path("load.pdf")
+    env.renderer.render(path, env.items(env.size(5000, 1000)), customer={"id": 1})
+
+    def run():
+        for _ in range(10):
+            json.loads(read_invoice_data(path))
+    return run
+
+
+@benchmark("db_save_load_50_lines")
+def _db_round_trip(env):
+    items = env.items(50)
+
+    def run():
+        invoice = Invoice(env.rng.randint(1, env.customers), "2024-05-31")
+        invoice.lines = [InvoiceLine(i["product_id"], i["quantity"], i["price"], i["product"], i["tax_rate"])
+                         for i in items]
+        InvoiceRepository.save_invoice(invoice)
+        InvoiceRepository.load_invoice(invoice.id)
+    return run
+
+
+@benchmark("load_invoice_table_5000_lines")
+def _load_invoice_table(env):
+    # Stored invoice -> InvoiceTable, as "Rechnung aus Verlauf laden" does (headless)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    from gui.invoice_table import InvoiceTable
+    from pdf.invoice_generator import InvoiceGenerator
+
+    env.qt_app = QApplication.instance() or QApplication([])
+    invoice = Invoice(1, "2024-05-31")
+    invoice.lines = [InvoiceLine(i["product_id"], i["quantity"], i["price"], i["product"], i["tax_rate"])
+                     for i in env.items(5000)]
+    InvoiceRepository.save_invoice(invoice)
+    table = InvoiceTable()
+    generator = InvoiceGenerator()
+
+    def run():
+        generator.load_invoice_from_db(table, invoice.id)
+        env.qt_app.processEvents()  # the coalesced totals update
+    return run
+
+
+# ----------------------------------------------------------
+# RUNNER
+# ----------------------------------------------------------
+def measure(func, reset=None, ops=1, min_time=1.0, min_rounds=5, max_rounds=200):
+    """Call func (after one warm-up) until min_time has passed; returns stats in ms per operation."""
+    if reset:
+        reset()
+    func()
+
+    timings = []
+    spent = 0.0
+    while len(timings) < max_rounds and (len(timings) < min_rounds or spent < min_time):
+        if reset:
+            reset()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        spent += elapsed
+        timings.append(elapsed * 1000 / ops)
+    return summarize(timings, ops)
+
+
+def summarize(timings, ops=1):
+    """Result entry for a list of timings in ms (also used by bench_startup.py)."""
+    return {
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "stdev_ms": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "rounds": len(timings),
+        "ops": ops,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(quick=False, keyword=None, min_time=1.0):
+    """Run all (or the matching) benchmarks; returns the result document."""
+    names = [name for name in BENCHMARKS if not keyword or keyword in name]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = Env(tmp, quick)
+        seed_database(env)
+        env.renderer = InvoiceRenderer()
+        for name in names:
+            setup, ops = BENCHMARKS[name]
+            # Own random stream per benchmark: the same data whichever benchmarks are selected
+            env.rng = random.Random(f"{SEED}:{name}")
+            prepared = setup(env)
+            func, reset = prepared if isinstance(prepared, tuple) else (prepared, None)
+            results[name] = measure(func, reset, ops, min_time)
+            print(f"{name:28} {results[name]['median_ms']:10.3f} ms  (min {results[name]['min_ms']:.3f}, "
+                  f"{results[name]['rounds']} rounds)")
+        db.close_connections()
+
+    return {"meta": run_suite_meta(quick), "results": results}
+
+
+def run_suite_meta(quick):
+    """The "meta" part of a result document: when, where and on which commit it was measured."""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "seed": SEED,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, stat="median_ms"):
+    """
+    Compare two result documents. Returns a list of rows
+    (name, baseline ms, current ms, relative change, status) where status is
+    "regression", "faster", "ok" or "missing"/"new" for unmatched benchmarks.
+    """
+    rows = []
+    base_results = baseline["results"]
+    current_results = current["results"]
+    for name in sorted(base_results.keys() | current_results.keys()):
+        if name not in current_results:
+            rows.append((name, base_results[name][stat], None, None, "missing"))
+            continue
+        if name not in base_results:
+            rows.append((name, None, current_results[name][stat], None, "new"))
+            continue
+        before = base_results[name][stat]
+        after = current_results[name][stat]
+        change = after / before - 1 if before else 0.0
+        status = "regression" if change > threshold else "faster" if change < -threshold else "ok"
+        rows.append((name, before, after, change, status))
+    return rows
+
+
+def _print_comparison(rows, threshold):
+    def ms(value):
+        return f"{value:10.3f}" if value is not None else f"{'-':>10}"
+
+    print(f"{'benchmark':28} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, before, after, change, status in rows:
+        change_text = f"{change:+7.1%}" if change is not None else f"{'':>7}"
+        flag = "" if status == "ok" else status.upper() if status == "regression" else status
+        print(f"{name:28} {ms(before)} {ms(after)} {change_text}  {flag}")
+    regressions = sum(1 for row in rows if row[4] == "regression")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="run the benchmarks and write a JSON result file")
+    run_cmd.add_argument("--out", default="benchmark_results.json")
+    run_cmd.add_argument("--quick", action="store_true", help="smaller data sets (smoke test)")
+    run_cmd.add_argument("-k", dest="keyword", help="only benchmarks whose name contains this text")
+    run_cmd.add_argument("--min-time", type=float, default=1.0, help="seconds per benchmark (default: %(default)s)")
+
+    compare_cmd = commands.add_parser("compare", help="compare two result files")
+    compare_cmd.add_argument("baseline")
+    compare_cmd.add_argument("current")
+    compare_cmd.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                             help="relative slowdown counted as regression (default: %(default)s)")
+    compare_cmd.add_argument("--stat", default="median_ms", choices=["min_ms", "median_ms", "mean_ms"])
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        document = run_suite(args.quick, args.keyword, args.min_time)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        print(f"results written to {args.out}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    regressions = _print_comparison(compare(baseline, current, args.threshold, args.stat), args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
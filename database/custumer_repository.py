@@ -1,53 +1,104 @@
+import re
 import sqlite3
-from database.db import get_connection
+from database.db import get_connection, transaction
+
+SEARCH_LIMIT = 20
 
 class CustomerRepository:
     @staticmethod
     def add_customer(customer_data):
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO customers (
-                name, contact_name, email, phone,
-                address, zip_code, city, country,
-                tax_number, notes
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            customer_data.get("name"),
-            customer_data.get("contact_name"),
-            customer_data.get("email"),
-            customer_data.get("phone"),
-            customer_data.get("address"),
-            customer_data.get("zip_code"),
-            customer_data.get("city"),
-            customer_data.get("country"),
-            customer_data.get("tax_number"),
-            customer_data.get("notes"),
-        ))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO customers (
+                    name, contact_name, email, phone,
+                    address, zip_code, city, country,
+                    tax_number, notes
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                customer_data.get("name"),
+                customer_data.get("contact_name"),
+                customer_data.get("email"),
+                customer_data.get("phone"),
+                customer_data.get("address"),
+                customer_data.get("zip_code"),
+                customer_data.get("city"),
+                customer_data.get("country"),
+                customer_data.get("tax_number"),
+                customer_data.get("notes"),
+            ))
 
     @staticmethod
     def get_all_customers():
-        conn = get_connection()
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
+        c = get_connection().cursor()
+        c.row_factory = sqlite3.Row
         c.execute("""
             SELECT id, name, contact_name, email, phone, city, country
             FROM customers
             ORDER BY id DESC
         """)
-        rows = c.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        return [dict(row) for row in c.fetchall()]
 
     @staticmethod
     def get_customer_by_id(customer_id):
-        conn = get_connection()
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
+        c = get_connection().cursor()
+        c.row_factory = sqlite3.Row
         c.execute("SELECT * FROM customers WHERE id = ?", (customer_id,))
         row = c.fetchone()
-        conn.close()
         return dict(row) if row else None
+
+    @staticmethod
+    def get_customers_for_combo(order_by_name=True, limit=None):
+        """(id, name) pairs for the customer combo box, sorted by name or ID."""
+        order = "name COLLATE NOCASE ASC" if order_by_name else "id ASC"
+        sql = f"SELECT id, name FROM customers ORDER BY {order}"
+        if limit is not None:
+            return get_connection().execute(sql + " LIMIT ?", (limit,)).fetchall()
+        return get_connection().execute(sql).fetchall()
+
+    @staticmethod
+    def search_customers(text, limit=SEARCH_LIMIT):
+        """
+        Type-ahead search over name, contact, city, e-mail and tax number.
+
+        Every word of text is matched as a prefix (FTS5, best matches
+        first). A purely numeric text also matches the customer ID.
+        Returns dicts with id, name and city.
+        """
+        words = re.findall(r"\w+", text)
+        if not words:
+            return []
+
+        conn = get_connection()
+        c = conn.cursor()
+        c.row_factory = sqlite3.Row
+
+        results = []
+        if text.strip().isdigit():
+            c.execute("SELECT id, name, city FROM customers WHERE id = ?", (int(text),))
+            results.extend(dict(row) for row in c.fetchall())
+
+        has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='customers_fts'"
+        ).fetchone()
+        if has_fts:
+            match = " ".join(f'"{word}"*' for word in words)
+            c.execute("""
+                SELECT c.id, c.name, c.city
+                FROM customers_fts f JOIN customers c ON c.id = f.rowid
+                WHERE customers_fts MATCH ?
+                ORDER BY bm25(customers_fts, 10.0, 5.0, 2.0, 1.0, 1.0)
+                LIMIT ?
+            """, (match, limit))
+        else:
+            pattern = f"%{text.strip()}%"
+            c.execute("""
+                SELECT id, name, city FROM customers
+                WHERE name LIKE ? OR contact_name LIKE ? OR city LIKE ? OR email LIKE ? OR tax_number LIKE ?
+                ORDER BY name COLLATE NOCASE
+                LIMIT ?
+            """, (pattern, pattern, pattern, pattern, pattern, limit))
+
+        seen = {r["id"] for r in results}
+        results.extend(dict(row) for row in c.fetchall() if row["id"] not in seen)
+        return results[:limit]
@@ -1,90 +1,147 @@
+import os
 import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from utils.instrumentation import traced_connection
 
 DB_FILE = "invoices.db"
 
-def get_connection():
-    return sqlite3.connect(DB_FILE)
+# Connection tuning applied once per pooled connection.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -20000),       # ~20 MB page cache
+    ("mmap_size", 268435456),     # 256 MB memory-mapped I/O
+    ("temp_store", "MEMORY"),
+)
+STATEMENT_CACHE_SIZE = 256
 
-def create_tables():
-    conn = get_connection()
-    c = conn.cursor()
-
-    # Customers (final version)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS customers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            contact_name TEXT,
-            email TEXT,
-            phone TEXT,
-            address TEXT,
-            zip_code TEXT,
-            city TEXT,
-            country TEXT,
-            tax_number TEXT,
-            notes TEXT
-        )
-    ''')
-
-    # Products
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        price REAL NOT NULL,
-        tax_rate REAL DEFAULT 0.19
-    )
-    ''')
-
-    # Invoices
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS invoices (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        customer_id INTEGER NOT NULL,
-        date TEXT NOT NULL,
-        total REAL NOT NULL,
-        FOREIGN KEY(customer_id) REFERENCES customers(id)
-    )
-    ''')
-
-    # Invoice lines
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS invoice_lines (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        invoice_id INTEGER NOT NULL,
-        product_id INTEGER NOT NULL,
-        quantity INTEGER NOT NULL,
-        price REAL NOT NULL,
-        FOREIGN KEY(invoice_id) REFERENCES invoices(id),
-        FOREIGN KEY(product_id) REFERENCES products(id)
+_local = threading.local()
+_pools = weakref.WeakSet()      # live _Pool of every thread, for close_connections()
+_pools_lock = threading.Lock()
+
+
+class _Pool:
+    """
+    The pooled connections of one thread, by database file.
+
+    Only referenced from the thread's _local, so it goes away with the
+    thread; its finalizer then closes the connections, and the weak
+    registry forgets it.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.connections = {}
+        weakref.finalize(self, _close_all, self.connections)
+
+
+def _close_all(connections):
+    for conn in list(connections.values()):
+        conn.close()
+    connections.clear()
+
+
+def _open_connection(db_file):
+    conn = sqlite3.connect(
+        db_file,
+        isolation_level=None,  # transactions are managed explicitly by transaction()
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
     )
-    ''')
-
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value BLOB
-        )
-    ''')
-
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS business_info (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            company_name TEXT,
-            address TEXT,
-            city_id TEXT,
-            vat_id TEXT,
-            phone TEXT,
-            fax TEXT,
-            email TEXT,
-            website TEXT,
-            bank_name TEXT,
-            iban TEXT,
-            bic TEXT,
-            account_holder TEXT
-        )
-       
-    ''')
-
-    conn.commit()
-    conn.close()
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    # Records every statement when tracing is on (utils.instrumentation), else conn itself
+    return traced_connection(conn)
+
+
+def _is_open(conn):
+    try:
+        conn.total_changes
+    except sqlite3.ProgrammingError:
+        return False
+    return True
+
+
+def get_connection(db_file=None):
+    """
+    Return the pooled connection for the current thread and database file.
+
+    Connections are opened lazily, configured once (WAL, pragmas, statement
+    cache) and reused for the lifetime of the thread. Callers must not close
+    them; use close_connections() on shutdown instead.
+    """
+    db_file = db_file or DB_FILE
+    pool = getattr(_local, "pool", None)
+    if pool is None or pool.pid != os.getpid():
+        # Fresh thread, or a forked worker that must not reuse the parent's handles
+        pool = _local.pool = _Pool()
+        with _pools_lock:
+            _pools.add(pool)
+
+    conn = pool.connections.get(db_file)
+    if conn is not None and not _is_open(conn):
+        conn = None  # closed behind the pool's back; open a new one
+    if conn is None:
+        conn = pool.connections[db_file] = _open_connection(db_file)
+    return conn
+
+
+@contextmanager
+def transaction(db_file=None, immediate=False):
+    """
+    Run a block inside a transaction on the pooled connection.
+
+    Commits on success and rolls back on any exception. Nested use is
+    supported through savepoints. With immediate=True the write lock is
+    taken up front (BEGIN IMMEDIATE).
+    """
+    conn = get_connection(db_file)
+    if conn.in_transaction:
+        depth = getattr(_local, "depth", 0)
+        name = f"sp_{depth}"
+        _local.depth = depth + 1
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            conn.execute(f"RELEASE {name}")
+        finally:
+            _local.depth = depth
+        return
+
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def close_connections(db_file=None):
+    """
+    Close the pooled connections of all threads of this process (all
+    files, or only db_file). A thread that asks for a connection again
+    afterwards gets a new one.
+    """
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [pool for pool in _pools if pool.pid == pid]
+    for pool in pools:
+        for path, conn in list(pool.connections.items()):
+            if db_file is None or path == db_file:
+                del pool.connections[path]
+                conn.close()
+
+
+def create_tables():
+    """Create the schema or upgrade it to the latest migration."""
+    from database.migrations import migrate
+    migrate()
@@ -0,0 +1,130 @@
+import re
+import string
+from datetime import date
+from database.db import get_connection, transaction
+
+# Format of the invoice number, configurable in the settings table. Fields:
+#   {number}  running number (format spec allowed, e.g. {number:05d})
+#   {year}    year of the invoice date; if used, numbering restarts every year
+# Examples: "{year}-{number:04d}" -> 2024-0001, "RE{number:06d}" -> RE000001
+DEFAULT_FORMAT = "{year}-{number:04d}"
+FORMAT_SETTING = "invoice_number_format"
+
+
+def get_number_format(db_file=None):
+    row = get_connection(db_file).execute(
+        "SELECT value FROM settings WHERE key = ?", (FORMAT_SETTING,)
+    ).fetchone()
+    return row[0] if row and row[0] else DEFAULT_FORMAT
+
+
+def set_number_format(fmt, db_file=None):
+    """Store a new number format; raises ValueError if it cannot be used."""
+    # Checked under the write lock, so no number is issued between check and switch
+    with transaction(db_file, immediate=True) as conn:
+        validate_format(fmt, db_file)
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (FORMAT_SETTING, fmt))
+
+
+def validate_format(fmt, db_file=None):
+    """
+    Raise ValueError if fmt is malformed or would render a number that has
+    already been issued: the counters keep running when the format changes,
+    so e.g. a literal "2024-{number:04d}" after "{year}-{number:04d}" would
+    start again at 2024-0001.
+    """
+    if "{number" not in fmt:
+        raise ValueError("Das Format muss {number} enthalten.")
+    try:
+        fmt.format(number=1, year=2000)
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Ungültiges Format: {e}") from None
+
+    conn = get_connection(db_file)
+    counters = dict(conn.execute("SELECT scope, last_value FROM invoice_number_counters"))
+    pattern = _format_pattern(fmt)
+    for (issued,) in conn.execute("SELECT invoice_number FROM invoices WHERE invoice_number IS NOT NULL"):
+        match = pattern.fullmatch(issued)
+        if not match:
+            continue
+        number = int(match["number"])
+        year = int(match.groupdict().get("year") or 2000)
+        if (number > counters.get(counter_scope(fmt, date(year, 1, 1)), 0)
+                and fmt.format(number=number, year=year) == issued):
+            raise ValueError(f"Mit diesem Format würde die Rechnungsnummer {issued} ein zweites Mal vergeben.")
+
+
+def _format_pattern(fmt):
+    """Regex matching what fmt can render, capturing the first number and year fields."""
+    parts = []
+    seen = set()
+    for literal, field, _spec, _conversion in string.Formatter().parse(fmt):
+        parts.append(re.escape(literal))
+        if field is None:
+            continue
+        name = "year" if field.startswith("year") else "number"
+        digits = r"[1-9]\d{3}" if name == "year" else r"\s*\d+"
+        parts.append(f"(?:{digits})" if name in seen else f"(?P<{name}>{digits})")
+        seen.add(name)
+    return re.compile("".join(parts))
+
+
+def counter_scope(fmt, invoice_date):
+    """Counter a number comes from: one per year for yearly formats, a single one otherwise."""
+    return str(invoice_date.year) if "{year" in fmt else ""
+
+
+class NumberBlock:
+    """A run of consecutive numbers reserved in one transaction."""
+    __slots__ = ("fmt", "year", "first", "last")
+
+    def __init__(self, fmt, year, first, last):
+        self.fmt = fmt
+        self.year = year
+        self.first = first
+        self.last = last
+
+    def __len__(self):
+        return self.last - self.first + 1
+
+    def __iter__(self):
+        for number in range(self.first, self.last + 1):
+            yield self.format(number)
+
+    def format(self, number):
+        return self.fmt.format(number=number, year=self.year)
+
+    def __repr__(self):
+        return f"NumberBlock({self.format(self.first)} .. {self.format(self.last)})"
+
+
+def reserve_numbers(count=1, invoice_date=None, db_file=None):
+    """
+    Atomically reserve count consecutive invoice numbers and return them as a
+    NumberBlock.
+
+    The counter row is bumped by count in a single BEGIN IMMEDIATE statement,
+    so concurrent processes never receive the same number, and a batch run
+    takes the write lock once per block instead of once per invoice. Numbers
+    of a block that end up unused are gaps, not reused.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    invoice_date = invoice_date or date.today()
+    if isinstance(invoice_date, str):
+        invoice_date = date.fromisoformat(invoice_date)
+
+    with transaction(db_file, immediate=True) as conn:
+        fmt = get_number_format(db_file)
+        last = conn.execute("""
+            INSERT INTO invoice_number_counters (scope, last_value) VALUES (?, ?)
+            ON CONFLICT(scope) DO UPDATE SET last_value = last_value + excluded.last_value
+            RETURNING last_value
+        """, (counter_scope(fmt, invoice_date), count)).fetchone()[0]
+    return NumberBlock(fmt, invoice_date.year, last - count + 1, last)
+
+
+def next_invoice_number(invoice_date=None, db_file=None):
+    """Allocate a single invoice number, formatted."""
+    block = reserve_numbers(1, invoice_date, db_file)
+    return block.format(block.first)
@@ -0,0 +1,156 @@
+from datetime import date
+from database.db import get_connection, transaction
+from database.invoice_numbers import next_invoice_number
+from database.reporting import refresh_rollups
+from models.invoice import Invoice
+from utils.instrumentation import timed
+from models.invoice_line import InvoiceLine
+
+
+class InvoiceRepository:
+    @staticmethod
+    @timed("db.save_invoice")
+    def save_invoice(invoice, file_path=None):
+        """
+        Insert the invoice (see insert_invoice) in one BEGIN IMMEDIATE
+        transaction, then fold it into the revenue rollups.
+        Returns the new invoice id (also set as invoice.id).
+        """
+        with transaction(immediate=True):
+            invoice_id = InvoiceRepository.insert_invoice(invoice, file_path)
+        # Separately: the invoice is recorded as pending rollup on insert, so this need
+        # not hold the write lock taken for the invoice number
+        refresh_rollups()
+        return invoice_id
+
+    @staticmethod
+    def reserve_invoice_id():
+        """
+        Reserve the next invoice id before the invoice is inserted (for a PDF
+        that has to carry it). Bumps the AUTOINCREMENT counter, so the id is
+        never handed out twice; one that ends up unused is a gap.
+        """
+        with transaction(immediate=True) as conn:
+            row = conn.execute("""
+                UPDATE sqlite_sequence SET seq = MAX(seq, (SELECT COALESCE(MAX(id), 0) FROM invoices)) + 1
+                WHERE name = 'invoices' RETURNING seq
+            """).fetchone()
+            if row is None:  # no invoice inserted yet
+                row = conn.execute("""
+                    INSERT INTO sqlite_sequence (name, seq)
+                    SELECT 'invoices', COALESCE(MAX(id), 0) + 1 FROM invoices RETURNING seq
+                """).fetchone()
+        return row[0]
+
+    @staticmethod
+    def insert_invoice(invoice, file_path=None):
+        """
+        Insert the invoice header, its lines and per-rate taxes. The caller
+        owns the transaction; open it with immediate=True, so allocating the
+        number does not have to upgrade a read lock to a write lock.
+        Totals are calculated here, so the stored values always match the lines.
+        Without a number yet, the invoice gets the next one (rolled back with the rest on failure),
+        without an id (see reserve_invoice_id) the next free one.
+        Returns the new invoice id (also set as invoice.id).
+        """
+        totals = invoice.calculate()
+        invoice_date = invoice.date.isoformat() if isinstance(invoice.date, date) else invoice.date
+
+        conn = get_connection()
+        number = invoice.number or next_invoice_number(invoice_date)
+        cursor = conn.execute("""
+            INSERT INTO invoices (id, customer_id, date, total, rabatt_mode, rabatt_value,
+                                  discount, net, tax, file_path, invoice_number)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            invoice.id,
+            invoice.customer_id,
+            invoice_date,
+            float(totals.gross),
+            invoice.rabatt_mode,
+            float(invoice.rabatt_value or 0),
+            float(totals.discount),
+            float(totals.net),
+            float(totals.tax),
+            file_path,
+            number,
+        ))
+        invoice_id = cursor.lastrowid
+        conn.executemany("""
+            INSERT INTO invoice_lines (invoice_id, position, product_id, name, quantity, price, tax_rate)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            (invoice_id, position, line.product_id, line.name, line.quantity,
+             float(line.price), float(line.tax_rate))
+            for position, line in enumerate(invoice.lines, 1)
+        ))
+        conn.executemany(
+            "INSERT INTO invoice_taxes (invoice_id, tax_rate, net_cents, tax_cents) VALUES (?, ?, ?, ?)",
+            [(invoice_id, float(rate), net, tax) for rate, (net, tax) in totals.by_rate.items()],
+        )
+
+        invoice.id = invoice_id
+        invoice.number = number
+        return invoice_id
+
+    @staticmethod
+    def set_file_path(invoice_id, file_path):
+        with transaction() as conn:
+            conn.execute("UPDATE invoices SET file_path = ? WHERE id = ?", (file_path, invoice_id))
+
+    @staticmethod
+    @timed("db.load_invoice")
+    def load_invoice(invoice_id):
+        """Invoice with its lines (in original order), or None."""
+        conn = get_connection()
+        row = conn.execute("""
+            SELECT customer_id, date, total, rabatt_mode, rabatt_value, file_path, invoice_number
+            FROM invoices WHERE id = ?
+        """, (invoice_id,)).fetchone()
+        if not row:
+            return None
+
+        customer_id, invoice_date, total, rabatt_mode, rabatt_value, file_path, number = row
+        invoice = Invoice(customer_id, invoice_date, total)
+        invoice.id = invoice_id
+        invoice.number = number
+        invoice.file_path = file_path
+        invoice.set_rabatt(rabatt_mode, rabatt_value)
+        invoice.lines = [
+            InvoiceLine(product_id, quantity, price, name, tax_rate)
+            for product_id, name, quantity, price, tax_rate in conn.execute("""
+                SELECT product_id, name, quantity, price, tax_rate
+                FROM invoice_lines WHERE invoice_id = ?
+                ORDER BY position
+            """, (invoice_id,))
+        ]
+        return invoice
+
+    @staticmethod
+    def get_invoices(customer_id=None, date_from=None, date_to=None, limit=None):
+        """Invoice headers (newest first) as dicts, optionally filtered by customer and date range."""
+        sql = """
+            SELECT i.id, i.invoice_number, i.date, i.customer_id, c.name, i.net, i.total, i.file_path
+            FROM invoices i LEFT JOIN customers c ON c.id = i.customer_id
+            WHERE 1=1
+        """
+        params = []
+        if customer_id is not None:
+            sql += " AND i.customer_id = ?"
+            params.append(customer_id)
+        if date_from:
+            sql += " AND i.date >= ?"
+            params.append(date_from)
+        if date_to:
+            sql += " AND i.date <= ?"
+            params.append(date_to)
+        sql += " ORDER BY i.date DESC, i.id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return [
+            {"id": inv_id, "number": number, "date": inv_date, "customer_id": cust_id, "customer_name": name or "",
+             "net": net, "total": total, "file_path": file_path}
+            for inv_id, number, inv_date, cust_id, name, net, total, file_path in get_connection().execute(sql, params)
+        ]
@@ -0,0 +1,434 @@
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from database.db import get_connection, transaction
+
+# ----------------------------------------------------------
+# Ordered schema migrations.
+#
+# Each step runs exactly once, inside its own transaction, and is recorded
+# in the schema_version table. A step that returns False could not run with
+# this SQLite build; it is not recorded and is tried again on the next
+# migrate(). Never edit a released step; append a new one instead.
+# ----------------------------------------------------------
+
+
+def _initial_schema(c):
+    # Customers (final version)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            contact_name TEXT,
+            email TEXT,
+            phone TEXT,
+            address TEXT,
+            zip_code TEXT,
+            city TEXT,
+            country TEXT,
+            tax_number TEXT,
+            notes TEXT
+        )
+    ''')
+
+    # Products
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        price REAL NOT NULL,
+        tax_rate REAL DEFAULT 0.19
+    )
+    ''')
+
+    # Invoices
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS invoices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        total REAL NOT NULL,
+        FOREIGN KEY(customer_id) REFERENCES customers(id)
+    )
+    ''')
+
+    # Invoice lines
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS invoice_lines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        invoice_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        price REAL NOT NULL,
+        FOREIGN KEY(invoice_id) REFERENCES invoices(id),
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value BLOB
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS business_info (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            company_name TEXT,
+            address TEXT,
+            city_id TEXT,
+            vat_id TEXT,
+            phone TEXT,
+            fax TEXT,
+            email TEXT,
+            website TEXT,
+            bank_name TEXT,
+            iban TEXT,
+            bic TEXT,
+            account_holder TEXT
+        )
+    ''')
+
+
+def _unique_product_names(c):
+    # Older databases may contain case-variants of the same product; keep the
+    # oldest row and point any invoice lines at it before adding the constraint.
+    c.execute('''
+        CREATE TEMP TABLE product_duplicates AS
+        SELECT p.id AS dup_id, k.keep_id
+        FROM products p
+        JOIN (SELECT MIN(id) AS keep_id, name FROM products GROUP BY name COLLATE NOCASE) k
+          ON p.name = k.name COLLATE NOCASE AND p.id <> k.keep_id
+    ''')
+    c.execute('''
+        UPDATE invoice_lines
+        SET product_id = (SELECT keep_id FROM product_duplicates WHERE dup_id = product_id)
+        WHERE product_id IN (SELECT dup_id FROM product_duplicates)
+    ''')
+    c.execute("DELETE FROM products WHERE id IN (SELECT dup_id FROM product_duplicates)")
+    c.execute("DROP TABLE product_duplicates")
+
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_products_name_nocase ON products(name COLLATE NOCASE)")
+
+
+def _lookup_indexes(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_customers_name_nocase ON customers(name COLLATE NOCASE)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_invoices_customer_date ON invoices(customer_id, date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_invoice_lines_invoice ON invoice_lines(invoice_id)")
+
+
+def fts5_available(c):
+    options = {row[0] for row in c.execute("PRAGMA compile_options")}
+    if "ENABLE_FTS5" in options:
+        return True
+    try:
+        c.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        c.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except Exception:
+        return False
+
+
+def _customer_search_index(c):
+    # Without FTS5 CustomerRepository.search_customers falls back to LIKE
+    # until a later start finds FTS5 and builds the index
+    if not fts5_available(c):
+        return False
+
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+            name, contact_name, city, email, tax_number,
+            content='customers', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO customers_fts(rowid, name, contact_name, city, email, tax_number)
+            VALUES (new.id, new.name, new.contact_name, new.city, new.email, new.tax_number);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+            INSERT INTO customers_fts(customers_fts, rowid, name, contact_name, city, email, tax_number)
+            VALUES ('delete', old.id, old.name, old.contact_name, old.city, old.email, old.tax_number);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE ON customers BEGIN
+            INSERT INTO customers_fts(customers_fts, rowid, name, contact_name, city, email, tax_number)
+            VALUES ('delete', old.id, old.name, old.contact_name, old.city, old.email, old.tax_number);
+            INSERT INTO customers_fts(rowid, name, contact_name, city, email, tax_number)
+            VALUES (new.id, new.name, new.contact_name, new.city, new.email, new.tax_number);
+        END
+    ''')
+    c.execute("INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')")
+
+
+def _invoice_persistence(c):
+    # Invoices keep the discount settings and the computed totals
+    c.execute("ALTER TABLE invoices ADD COLUMN rabatt_mode TEXT")
+    c.execute("ALTER TABLE invoices ADD COLUMN rabatt_value REAL NOT NULL DEFAULT 0")
+    c.execute("ALTER TABLE invoices ADD COLUMN discount REAL NOT NULL DEFAULT 0")
+    c.execute("ALTER TABLE invoices ADD COLUMN net REAL NOT NULL DEFAULT 0")
+    c.execute("ALTER TABLE invoices ADD COLUMN tax REAL NOT NULL DEFAULT 0")
+    c.execute("ALTER TABLE invoices ADD COLUMN file_path TEXT")
+
+    # Lines keep name and tax rate as invoiced; product_id becomes optional
+    # (free-text positions, deleted products). SQLite cannot drop NOT NULL,
+    # so the table is rebuilt.
+    c.execute('''
+        CREATE TABLE invoice_lines_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_id INTEGER NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            product_id INTEGER,
+            name TEXT NOT NULL DEFAULT '',
+            quantity INTEGER NOT NULL,
+            price REAL NOT NULL,
+            tax_rate REAL NOT NULL DEFAULT 0.19,
+            FOREIGN KEY(invoice_id) REFERENCES invoices(id),
+            FOREIGN KEY(product_id) REFERENCES products(id)
+        )
+    ''')
+    c.execute('''
+        INSERT INTO invoice_lines_new (id, invoice_id, position, product_id, name, quantity, price, tax_rate)
+        SELECT l.id, l.invoice_id, l.id, l.product_id, COALESCE(p.name, ''), l.quantity, l.price,
+               COALESCE(p.tax_rate, 0.19)
+        FROM invoice_lines l LEFT JOIN products p ON p.id = l.product_id
+    ''')
+    c.execute("DROP TABLE invoice_lines")
+    c.execute("ALTER TABLE invoice_lines_new RENAME TO invoice_lines")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_invoice_lines_invoice ON invoice_lines(invoice_id, position)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_invoice_lines_product ON invoice_lines(product_id)")
+
+
+# Frozen copy of the invoice calculation as of step 6 (models.invoice_calculator),
+# so the backfill keeps producing the same numbers when the live code changes.
+
+def _v6_cents(amount):
+    if isinstance(amount, float):
+        return round(amount * 100)
+    if isinstance(amount, int):
+        return amount * 100
+    return _v6_round(Decimal(amount) * 100)
+
+
+def _v6_round(value):
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _v6_taxes_by_rate(lines, rabatt_mode, rabatt_value):
+    """{rate: (net_cents after discount, tax_cents)} of (quantity, price, tax_rate) rows."""
+    net_by_rate = {}
+    for quantity, price, tax_rate in lines:
+        rate = Decimal(str(tax_rate))
+        net_by_rate[rate] = net_by_rate.get(rate, 0) + int(quantity) * _v6_cents(price)
+
+    subtotal = sum(net_by_rate.values())
+    discount = 0
+    if rabatt_mode and rabatt_value and subtotal > 0:
+        if "Rabattbetrag" in rabatt_mode:
+            discount = _v6_cents(rabatt_value)
+        elif "Zielbetrag" in rabatt_mode:
+            gross = sum(net * (1 + rate) for rate, net in net_by_rate.items())
+            if gross > 0:
+                discount = subtotal - _v6_round(Decimal(_v6_cents(rabatt_value)) * subtotal / gross)
+        discount = max(0, min(discount, subtotal))
+
+    # Discount spread over the rates by the largest remainder method
+    shares = dict.fromkeys(net_by_rate, 0)
+    if discount:
+        remainders = []
+        for rate, net in net_by_rate.items():
+            shares[rate], remainder = divmod(discount * net, subtotal)
+            remainders.append((remainder, rate))
+        for _, rate in sorted(remainders, reverse=True)[:discount - sum(shares.values())]:
+            shares[rate] += 1
+
+    by_rate = {}
+    for rate, net in net_by_rate.items():
+        net -= shares[rate]
+        by_rate[rate] = (net, _v6_round(net * rate))
+    return by_rate
+
+
+def _revenue_rollups(c):
+    # Net and VAT per invoice and tax rate, after the discount (as printed)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS invoice_taxes (
+            invoice_id INTEGER NOT NULL,
+            tax_rate REAL NOT NULL,
+            net_cents INTEGER NOT NULL,
+            tax_cents INTEGER NOT NULL,
+            PRIMARY KEY (invoice_id, tax_rate)
+        ) WITHOUT ROWID
+    ''')
+    for invoice_id, rabatt_mode, rabatt_value in c.execute(
+        "SELECT id, rabatt_mode, rabatt_value FROM invoices"
+    ).fetchall():
+        lines = c.execute(
+            "SELECT quantity, price, tax_rate FROM invoice_lines WHERE invoice_id = ?", (invoice_id,)
+        ).fetchall()
+        by_rate = _v6_taxes_by_rate(lines, rabatt_mode, rabatt_value)
+        c.executemany(
+            "INSERT INTO invoice_taxes (invoice_id, tax_rate, net_cents, tax_cents) VALUES (?, ?, ?, ?)",
+            [(invoice_id, float(rate), net, tax) for rate, (net, tax) in by_rate.items()],
+        )
+
+    # Rollups per day and per month ("YYYY-MM-DD" / "YYYY-MM"), filled by database.reporting
+    for period in ("day", "month"):
+        grain = "daily" if period == "day" else "monthly"
+        c.execute(f'''
+            CREATE TABLE IF NOT EXISTS revenue_customer_{grain} (
+                {period} TEXT NOT NULL,
+                customer_id INTEGER NOT NULL,
+                invoice_count INTEGER NOT NULL,
+                net_cents INTEGER NOT NULL,
+                tax_cents INTEGER NOT NULL,
+                PRIMARY KEY ({period}, customer_id)
+            ) WITHOUT ROWID
+        ''')
+        c.execute(f'''
+            CREATE TABLE IF NOT EXISTS revenue_product_{grain} (
+                {period} TEXT NOT NULL,
+                product_key INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                net_cents INTEGER NOT NULL,
+                PRIMARY KEY ({period}, product_key)
+            ) WITHOUT ROWID
+        ''')
+        c.execute(f'''
+            CREATE TABLE IF NOT EXISTS vat_{grain} (
+                {period} TEXT NOT NULL,
+                tax_rate REAL NOT NULL,
+                net_cents INTEGER NOT NULL,
+                tax_cents INTEGER NOT NULL,
+                PRIMARY KEY ({period}, tax_rate)
+            ) WITHOUT ROWID
+        ''')
+
+    # Invoices up to last_invoice_id are contained in the rollups
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_invoice_id INTEGER NOT NULL
+        )
+    ''')
+    c.execute("INSERT OR IGNORE INTO rollup_state (id, last_invoice_id) VALUES (1, 0)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices(date)")
+
+
+# database.invoice_numbers.DEFAULT_FORMAT as of step 7
+_V7_NUMBER_FORMAT = "{year}-{number:04d}"
+
+
+def _invoice_numbers(c):
+    # One counter per scope: the year for yearly formats, "" for continuous numbering
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS invoice_number_counters (
+            scope TEXT PRIMARY KEY,
+            last_value INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    c.execute("ALTER TABLE invoices ADD COLUMN invoice_number TEXT")
+
+    # Existing invoices are numbered per year in date order, as the default format would have done
+    counters = {}
+    numbers = []
+    for invoice_id, invoice_date in c.execute("SELECT id, date FROM invoices ORDER BY date, id").fetchall():
+        year = invoice_date[:4]
+        counters[year] = counters.get(year, 0) + 1
+        numbers.append((_V7_NUMBER_FORMAT.format(number=counters[year], year=year), invoice_id))
+    c.executemany("UPDATE invoices SET invoice_number = ? WHERE id = ?", numbers)
+    c.executemany("INSERT INTO invoice_number_counters (scope, last_value) VALUES (?, ?)", counters.items())
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_number ON invoices(invoice_number)")
+
+
+def _rollup_pending(c):
+    # Invoices not yet folded into the rollups, replacing the id watermark of
+    # rollup_state: ids reserved before rendering commit out of order, so an
+    # invoice could end up below the watermark without being rolled up. The
+    # trigger records every invoice in the transaction that inserts it.
+    c.execute("CREATE TABLE IF NOT EXISTS rollup_pending (invoice_id INTEGER PRIMARY KEY)")
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS invoices_rollup_pending AFTER INSERT ON invoices
+        BEGIN
+            INSERT OR IGNORE INTO rollup_pending (invoice_id) VALUES (NEW.id);
+        END
+    ''')
+    c.execute("DROP TABLE rollup_state")
+
+    # Invoices the watermark skipped cannot be told apart: aggregate all of them again
+    for table in ("revenue_customer", "revenue_product", "vat"):
+        for grain in ("daily", "monthly"):
+            c.execute(f"DELETE FROM {table}_{grain}")
+    c.execute("INSERT INTO rollup_pending (invoice_id) SELECT id FROM invoices")
+
+
+def _retry_customer_search_index(c):
+    # Step 4 used to be recorded even when it skipped the index for lack of
+    # FTS5, so it was never built later. Build it now, or un-record step 4
+    # so migrate() keeps retrying it.
+    if c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='customers_fts'").fetchone():
+        return
+    if _customer_search_index(c) is False:
+        c.execute("DELETE FROM schema_version WHERE version = 4")
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "unique case-insensitive product names", _unique_product_names),
+    (3, "lookup indexes for customers, invoices and invoice lines", _lookup_indexes),
+    (4, "full-text search index for customers", _customer_search_index),
+    (5, "persist invoice totals, line names and tax rates", _invoice_persistence),
+    (6, "per-rate invoice taxes and revenue rollup tables", _revenue_rollups),
+    (7, "invoice number counters", _invoice_numbers),
+    (8, "pending invoices instead of a rollup watermark", _rollup_pending),
+    (9, "retry the customer search index skipped without FTS5", _retry_customer_search_index),
+]
+
+
+def current_version(db_file=None):
+    conn = get_connection(db_file)
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(db_file=None, target=None):
+    """
+    Apply all pending migrations (up to target, if given) in order.
+    Returns the schema version the database is at afterwards.
+    """
+    get_connection(db_file).execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+
+    applied = {row[0] for row in get_connection(db_file).execute("SELECT version FROM schema_version")}
+
+    for version, description, step in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        if version in applied:
+            continue
+        with transaction(db_file, immediate=True) as conn:
+            # Re-check under the write lock in case another process migrated first
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                continue
+            if step(conn.cursor()) is False:
+                continue
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().isoformat(timespec="seconds")),
+            )
+
+    return current_version(db_file)
@@ -0,0 +1,150 @@
+import csv
+import re
+import string
+import time
+from itertools import islice
+from database.db import transaction
+
+CHUNK_SIZE = 5000
+
+INSERT_IGNORE_SQL = """
+    INSERT INTO products (name, price) VALUES (?, ?)
+    ON CONFLICT(name COLLATE NOCASE) DO NOTHING
+"""
+
+UPSERT_SQL = """
+    INSERT INTO products (name, price) VALUES (?, ?)
+    ON CONFLICT(name COLLATE NOCASE) DO UPDATE SET price = excluded.price
+    WHERE products.price <> excluded.price
+"""
+
+_THOUSANDS_DOTS = re.compile(r"^-?\d{1,3}(\.\d{3})+$")
+# Case folding of SQLite's NOCASE collation (ASCII letters only)
+_NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class ImportResult:
+    """Counters of a finished product import."""
+
+    def __init__(self):
+        self.added = 0
+        self.updated = 0
+        self.skipped = 0     # duplicates, unchanged prices and invalid rows
+        self.invalid = 0     # rows that could not be parsed at all
+        self.duplicates = 0  # repeats of a name seen earlier in the same file
+        self.rows = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (f"ImportResult(added={self.added}, updated={self.updated}, skipped={self.skipped}, "
+                f"duplicates={self.duplicates}, rows={self.rows}, {self.rows_per_second:.0f} rows/s)")
+
+
+def detect_delimiter(sample):
+    """Guess the CSV delimiter from the first line (German exports use ';')."""
+    first_line = sample.splitlines()[0] if sample else ""
+    counts = {d: first_line.count(d) for d in (";", "\t", ",")}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else ","
+
+
+def parse_price(text, decimal_comma=False):
+    """
+    Parse a price such as '19.99', '19,99', '1.234,56' or '1,234.56 €'.
+    Raises ValueError for anything that is not a number.
+    """
+    text = text.strip().replace("€", "").replace(" ", "").replace(" ", "")
+    if "," in text and "." in text:
+        # Whichever separator comes last is the decimal separator
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    elif "," in text:
+        text = text.replace(",", ".")
+    elif decimal_comma and _THOUSANDS_DOTS.match(text):
+        text = text.replace(".", "")
+    return float(text)
+
+
+def iter_product_rows(file_path, result, encoding="utf-8-sig"):
+    """
+    Stream (name, price) tuples from a CSV file without loading it into memory.
+    Rows that cannot be parsed are counted on result and skipped.
+    """
+    with open(file_path, newline="", encoding=encoding) as csvfile:
+        delimiter = detect_delimiter(csvfile.readline())
+        csvfile.seek(0)
+        decimal_comma = delimiter == ";"
+
+        for row in csv.reader(csvfile, delimiter=delimiter):
+            result.rows += 1
+            while row and not row[-1].strip():
+                row.pop()
+            if len(row) != 2:
+                result.invalid += 1
+                continue
+            name = row[0].strip().strip('"')
+            try:
+                price = parse_price(row[1], decimal_comma)
+            except ValueError:
+                # Header lines end up here as well
+                result.invalid += 1
+                continue
+            if not name:
+                result.invalid += 1
+                continue
+            yield name, price
+
+
+def first_per_name(rows, result):
+    """
+    Drop rows whose name (compared like the NOCASE index) already occurred
+    earlier in the file, counting them on result. Keeps one set entry per
+    distinct name, not the rows.
+    """
+    seen = set()
+    for name, price in rows:
+        key = name.translate(_NOCASE)
+        if key in seen:
+            result.duplicates += 1
+            continue
+        seen.add(key)
+        yield name, price
+
+
+def import_products_csv(file_path, upsert_prices=False, chunk_size=CHUNK_SIZE, db_file=None):
+    """
+    Import products (name, price) from a CSV file in one transaction.
+
+    Rows are inserted in chunked executemany batches. Existing products
+    (matched case-insensitively by name) are skipped, or get their price
+    updated when upsert_prices is True. A name repeated within the file
+    counts as a duplicate; its first row is the one imported.
+    """
+    result = ImportResult()
+    sql = UPSERT_SQL if upsert_prices else INSERT_IGNORE_SQL
+    start = time.perf_counter()
+
+    with transaction(db_file) as conn:
+        max_id_before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM products").fetchone()[0]
+        changes_before = conn.total_changes
+
+        rows = first_per_name(iter_product_rows(file_path, result), result)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            conn.executemany(sql, chunk)
+
+        changes = conn.total_changes - changes_before
+        result.added = conn.execute("SELECT COUNT(*) FROM products WHERE id > ?", (max_id_before,)).fetchone()[0]
+        result.updated = changes - result.added
+
+    result.skipped = result.rows - result.added - result.updated
+    result.elapsed = time.perf_counter() - start
+    return result
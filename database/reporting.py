@@ -0,0 +1,255 @@
+from datetime import date, timedelta
+from database.db import get_connection, transaction
+from models.invoice_line import from_cents
+
+# Pseudo product keys in the product rollups
+FREE_TEXT_PRODUCT = 0   # lines without product_id
+DISCOUNT_PRODUCT = -1   # invoice discounts (negative net)
+
+FIRST_DAY = "0001-01-01"
+LAST_DAY = "9999-12-31"
+
+# ----------------------------------------------------------
+# Rollup definitions.
+#
+# Each rollup has a daily and a monthly table. "source" aggregates the raw
+# invoices listed in rollup_pending with date in [?, ?]; {period} is replaced
+# by the day or month expression. The same source feeds refresh_rollups() and
+# the not yet rolled-up tail in the report queries.
+#
+# rollup_pending is filled by a trigger in the transaction that inserts the
+# invoice, not derived from an id watermark: write_invoice reserves its id
+# before rendering, so ids do not commit in order. Both only ever read the
+# few pending invoices, so "+i.date" keeps SQLite from using the date index.
+# ----------------------------------------------------------
+ROLLUPS = {
+    "customer": {
+        "table": "revenue_customer",
+        "keys": ("customer_id",),
+        "values": ("invoice_count", "net_cents", "tax_cents"),
+        "source": """
+            SELECT {period}, i.customer_id, COUNT(*),
+                   SUM(CAST(ROUND(i.net * 100) AS INTEGER)), SUM(CAST(ROUND(i.tax * 100) AS INTEGER))
+            FROM invoices i
+            WHERE i.id IN (SELECT invoice_id FROM rollup_pending) AND +i.date BETWEEN ? AND ?
+            GROUP BY 1, 2
+        """,
+    },
+    "product": {
+        "table": "revenue_product",
+        "keys": ("product_key",),
+        "values": ("quantity", "net_cents"),
+        "source": f"""
+            SELECT {{period}}, COALESCE(l.product_id, {FREE_TEXT_PRODUCT}), SUM(l.quantity),
+                   SUM(CAST(ROUND(l.quantity * l.price * 100) AS INTEGER))
+            FROM invoice_lines l JOIN invoices i ON i.id = l.invoice_id
+            WHERE l.invoice_id IN (SELECT invoice_id FROM rollup_pending) AND +i.date BETWEEN ? AND ?
+            GROUP BY 1, 2
+            UNION ALL
+            SELECT {{period}}, {DISCOUNT_PRODUCT}, 0, -SUM(CAST(ROUND(i.discount * 100) AS INTEGER))
+            FROM invoices i
+            WHERE i.id IN (SELECT invoice_id FROM rollup_pending) AND +i.date BETWEEN ? AND ? AND i.discount > 0
+            GROUP BY 1
+        """,
+        "source_params": 2,
+    },
+    "vat": {
+        "table": "vat",
+        "keys": ("tax_rate",),
+        "values": ("net_cents", "tax_cents"),
+        "source": """
+            SELECT {period}, t.tax_rate, SUM(t.net_cents), SUM(t.tax_cents)
+            FROM invoice_taxes t JOIN invoices i ON i.id = t.invoice_id
+            WHERE t.invoice_id IN (SELECT invoice_id FROM rollup_pending) AND +i.date BETWEEN ? AND ?
+            GROUP BY 1, 2
+        """,
+    },
+}
+
+PERIODS = (("daily", "day", "i.date"), ("monthly", "month", "substr(i.date, 1, 7)"))
+
+
+def _source(rollup, period_expr, date_from=FIRST_DAY, date_to=LAST_DAY):
+    sql = rollup["source"].format(period=period_expr)
+    return sql, (date_from, date_to) * rollup.get("source_params", 1)
+
+
+# ----------------------------------------------------------
+# MAINTENANCE
+# ----------------------------------------------------------
+def refresh_rollups(db_file=None):
+    """
+    Fold all pending invoices into the rollup tables.
+
+    Called after every saved invoice (InvoiceRepository.save_invoice,
+    InvoiceGenerator.write_invoice), so normally only the new invoice is
+    added. An invoice whose refresh never ran is picked up by the next one.
+    Returns the number of invoices folded.
+    """
+    with transaction(db_file, immediate=True) as conn:
+        pending = conn.execute("SELECT COUNT(*) FROM rollup_pending").fetchone()[0]
+        if not pending:
+            return 0
+
+        for rollup in ROLLUPS.values():
+            columns = rollup["keys"] + rollup["values"]
+            updates = ", ".join(f"{v} = {v} + excluded.{v}" for v in rollup["values"])
+            for grain, period, period_expr in PERIODS:
+                sql, params = _source(rollup, period_expr)
+                conn.execute(f"""
+                    INSERT INTO {rollup['table']}_{grain} ({period}, {', '.join(columns)})
+                    SELECT * FROM ({sql}) WHERE true
+                    ON CONFLICT({period}, {', '.join(rollup['keys'])}) DO UPDATE SET {updates}
+                """, params)
+
+        conn.execute("DELETE FROM rollup_pending")
+        return pending
+
+
+def rebuild_rollups(db_file=None):
+    """Empty all rollups and aggregate every invoice again."""
+    with transaction(db_file, immediate=True) as conn:
+        for rollup in ROLLUPS.values():
+            for grain, _, _ in PERIODS:
+                conn.execute(f"DELETE FROM {rollup['table']}_{grain}")
+        conn.execute("INSERT OR IGNORE INTO rollup_pending (invoice_id) SELECT id FROM invoices")
+        return refresh_rollups(db_file)
+
+
+# ----------------------------------------------------------
+# QUERIES
+# ----------------------------------------------------------
+def _month(d):
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def _next_month(d):
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _split_range(date_from, date_to):
+    """
+    Split [date_from, date_to] into whole months (read from the monthly
+    tables) and the remaining days at both ends (read from the daily tables).
+    Returns ((first_month, last_month) or None, [(day_from, day_to), ...]).
+    """
+    start = date.fromisoformat(date_from or FIRST_DAY)
+    end = date.fromisoformat(date_to or LAST_DAY)
+    first_full = start if start.day == 1 else _next_month(start)
+    if end == date.max or (end + timedelta(days=1)).day == 1:
+        last_full = end
+    else:
+        last_full = end.replace(day=1) - timedelta(days=1)
+
+    if first_full > last_full:
+        return None, [(start.isoformat(), end.isoformat())]
+
+    days = []
+    if start < first_full:
+        days.append((start.isoformat(), (first_full - timedelta(days=1)).isoformat()))
+    if last_full < end:
+        days.append(((last_full + timedelta(days=1)).isoformat(), end.isoformat()))
+    return (_month(first_full), _month(last_full)), days
+
+
+def _aggregate(name, date_from=None, date_to=None, group_by=None, where="", params=(), db_file=None):
+    """
+    Sum a rollup over a date range: whole months from the monthly table,
+    edge days from the daily table, plus invoices not yet rolled up.
+    group_by is a key column or "period" (month); where filters on key columns.
+    Returns rows of (group, *values).
+    """
+    rollup = ROLLUPS[name]
+    columns = rollup["keys"] + rollup["values"]
+    months, days = _split_range(date_from, date_to)
+    conn = get_connection(db_file)
+
+    parts = []
+    part_params = []
+    if months:
+        parts.append(f"SELECT month AS period, {', '.join(columns)} FROM {rollup['table']}_monthly "
+                     f"WHERE month BETWEEN ? AND ?")
+        part_params.extend(months)
+    for day_from, day_to in days:
+        parts.append(f"SELECT substr(day, 1, 7) AS period, {', '.join(columns)} FROM {rollup['table']}_daily "
+                     f"WHERE day BETWEEN ? AND ?")
+        part_params.extend((day_from, day_to))
+
+    # Tail: invoices written since the last refresh (normally none)
+    sql, tail_params = _source(rollup, "substr(i.date, 1, 7)", date_from or FIRST_DAY, date_to or LAST_DAY)
+    parts.append(f"SELECT * FROM ({sql})")
+    part_params.extend(tail_params)
+
+    # Column names come from the first (rollup table) select
+    sums = ", ".join(f"SUM({v})" for v in rollup["values"])
+    group = group_by or rollup["keys"][0]
+    return conn.execute(f"""
+        SELECT {group}, {sums}
+        FROM ({" UNION ALL ".join(parts)})
+        WHERE 1=1 {where}
+        GROUP BY {group}
+    """, (*part_params, *params)).fetchall()
+
+
+def revenue_by_customer(date_from=None, date_to=None, db_file=None):
+    """
+    Revenue per customer (after discounts), largest first.
+    Returns dicts with customer_id, name, invoice_count, net, tax and gross.
+    """
+    rows = _aggregate("customer", date_from, date_to, db_file=db_file)
+    names = _names(get_connection(db_file), "customers", [r[0] for r in rows])
+    result = [
+        {"customer_id": cid, "name": names.get(cid, ""), "invoice_count": count,
+         "net": from_cents(net), "tax": from_cents(tax), "gross": from_cents(net + tax)}
+        for cid, count, net, tax in rows
+    ]
+    return sorted(result, key=lambda r: r["net"], reverse=True)
+
+
+def revenue_by_product(date_from=None, date_to=None, db_file=None):
+    """
+    Net revenue per product (line sums before the invoice discount), largest first.
+    Discounts appear as their own entry "Rabatt", lines without product as "Sonstige".
+    Returns dicts with product_id, name, quantity and net.
+    """
+    rows = _aggregate("product", date_from, date_to, db_file=db_file)
+    names = _names(get_connection(db_file), "products", [r[0] for r in rows if r[0] > 0])
+    names[FREE_TEXT_PRODUCT] = "Sonstige"
+    names[DISCOUNT_PRODUCT] = "Rabatt"
+    result = [
+        {"product_id": key if key > 0 else None, "name": names.get(key, ""), "quantity": qty, "net": from_cents(net)}
+        for key, qty, net in rows
+    ]
+    return sorted(result, key=lambda r: r["net"], reverse=True)
+
+
+def revenue_by_month(date_from=None, date_to=None, customer_id=None, db_file=None):
+    """Revenue per month ("YYYY-MM"), optionally for one customer. Returns dicts with month, net, tax, gross."""
+    where, params = ("AND customer_id = ?", (customer_id,)) if customer_id is not None else ("", ())
+    rows = _aggregate("customer", date_from, date_to, group_by="period", where=where, params=params,
+                      db_file=db_file)
+    return [
+        {"month": month, "invoice_count": count, "net": from_cents(net), "tax": from_cents(tax),
+         "gross": from_cents(net + tax)}
+        for month, count, net, tax in sorted(rows)
+    ]
+
+
+def vat_totals(date_from=None, date_to=None, db_file=None):
+    """Net and VAT per tax rate as invoiced (for the VAT return). Returns {rate: (net, tax)}."""
+    return {
+        rate: (from_cents(net), from_cents(tax))
+        for rate, net, tax in sorted(_aggregate("vat", date_from, date_to, db_file=db_file), reverse=True)
+    }
+
+
+def _names(conn, table, ids):
+    if not ids:
+        return {}
+    names = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        names.update(conn.execute(
+            f"SELECT id, name FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+        ).fetchall())
+    return names
@@ -10,6 +10,7 @@ class AppMenuBar(QMenuBar):
     new_invoice = Signal()
     save_invoice = Signal()
     load_invoice = Signal()
+    load_invoice_from_db = Signal()
     exit_app = Signal()
     refresh_products = Signal()
     import_products = Signal()
@@ -38,6 +39,10 @@ class AppMenuBar(QMenuBar):
         load_invoice_action.triggered.connect(self.load_invoice.emit)
         file_menu.addAction(load_invoice_action)
 
+        load_db_action = QAction("Rechnung aus Verlauf laden...", self)
+        load_db_action.triggered.connect(self.load_invoice_from_db.emit)
+        file_menu.addAction(load_db_action)
+
         file_menu.addSeparator()
 
         exit_action = QAction("Beenden", self)
@@ -2,7 +2,9 @@ from PySide6.QtWidgets import (
     QWidget, QLabel, QLineEdit, QVBoxLayout, QPushButton, QMessageBox, QFormLayout
 )
 from PySide6.QtCore import Qt
-from database.db import get_connection
+from database.db import get_connection, transaction
+from database.invoice_numbers import get_number_format, set_number_format
+from pdf.render_context import invalidate_render_context
 
 
 class BusinessInfoWindow(QWidget):
@@ -27,6 +29,9 @@ class BusinessInfoWindow(QWidget):
         self.iban = QLineEdit()
         self.bic = QLineEdit()
         self.account_holder = QLineEdit()
+        self.number_format = QLineEdit()
+        self.number_format.setToolTip("{number} = laufende Nummer, {year} = Jahr (Zählung beginnt jedes Jahr neu).\n"
+                                      "Beispiele: {year}-{number:04d} → 2024-0001, RE{number:06d} → RE000001")
 
         form.addRow("Firmenname:", self.company_name)
         form.addRow("Adresse:", self.address)
@@ -40,6 +45,7 @@ class BusinessInfoWindow(QWidget):
         form.addRow("IBAN:", self.iban)
         form.addRow("BIC:", self.bic)
         form.addRow("Kontoinhaber:", self.account_holder)
+        form.addRow("Rechnungsnummer-Format:", self.number_format)
 
         layout.addLayout(form)
 
@@ -53,11 +59,7 @@ class BusinessInfoWindow(QWidget):
     # LOAD EXISTING DATA
     # -----------------------------
     def load_data(self):
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("SELECT * FROM business_info WHERE id = 1")
-        row = c.fetchone()
-        conn.close()
+        row = get_connection().execute("SELECT * FROM business_info WHERE id = 1").fetchone()
 
         if row:
             (_, company_name, address, city_id, vat_id, phone, fax, email,
@@ -76,35 +78,39 @@ class BusinessInfoWindow(QWidget):
             self.bic.setText(bic or "")
             self.account_holder.setText(account_holder or "")
 
+        self.number_format.setText(get_number_format())
+
     # -----------------------------
     # SAVE DATA
     # -----------------------------
     def save_data(self):
-        conn = get_connection()
-        c = conn.cursor()
-
-        c.execute("""
-            INSERT OR REPLACE INTO business_info (
-                id, company_name, address, city_id, vat_id, phone, fax, email,
-                website, bank_name, iban, bic, account_holder
-            )
-            VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            self.company_name.text(),
-            self.address.text(),
-            self.city_id.text(),
-            self.vat_id.text(),
-            self.phone.text(),
-            self.fax.text(),
-            self.email.text(),
-            self.website.text(),
-            self.bank_name.text(),
-            self.iban.text(),
-            self.bic.text(),
-            self.account_holder.text()
-        ))
-
-        conn.commit()
-        conn.close()
+        try:
+            set_number_format(self.number_format.text().strip())
+        except ValueError as e:
+            QMessageBox.warning(self, "Rechnungsnummer-Format", str(e))
+            return
+
+        with transaction() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO business_info (
+                    id, company_name, address, city_id, vat_id, phone, fax, email,
+                    website, bank_name, iban, bic, account_holder
+                )
+                VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                self.company_name.text(),
+                self.address.text(),
+                self.city_id.text(),
+                self.vat_id.text(),
+                self.phone.text(),
+                self.fax.text(),
+                self.email.text(),
+                self.website.text(),
+                self.bank_name.text(),
+                self.iban.text(),
+                self.bic.text(),
+                self.account_holder.text()
+            ))
+        invalidate_render_context()
 
         QMessageBox.information(self, "Gespeichert", "Firmendaten erfolgreich gespeichert!")
@@ -0,0 +1,59 @@
+from PySide6.QtWidgets import QCompleter
+from PySide6.QtGui import QStandardItemModel, QStandardItem
+from PySide6.QtCore import Qt, Signal, QTimer, QModelIndex
+from database.custumer_repository import CustomerRepository, SEARCH_LIMIT
+
+
+class CustomerCompleter(QCompleter):
+    """
+    Type-ahead completer for the customer combo box.
+
+    Each edit (debounced) asks the FTS index for the best SEARCH_LIMIT
+    matches, so no customer list has to be held in memory. Emits
+    customer_chosen(id) when a suggestion is picked.
+    """
+    customer_chosen = Signal(int)
+
+    DEBOUNCE_MS = 120
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._model = QStandardItemModel(self)
+        self.setModel(self._model)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setMaxVisibleItems(12)
+
+        self._pending_text = ""
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self._run_search)
+
+        self.activated[QModelIndex].connect(self._on_activated)
+
+    def search(self, text):
+        """Schedule a search for text (called on every keystroke)."""
+        self._pending_text = text
+        self._timer.start()
+
+    def _run_search(self):
+        self.update_matches(self._pending_text)
+        if self._model.rowCount() and self.widget() and self.widget().hasFocus():
+            self.complete()
+
+    def update_matches(self, text):
+        self._model.clear()
+        for customer in CustomerRepository.search_customers(text, SEARCH_LIMIT):
+            label = f"{customer['id']} – {customer['name']}"
+            if customer.get("city"):
+                label += f" ({customer['city']})"
+            item = QStandardItem(label)
+            item.setData(customer["id"], Qt.UserRole)
+            self._model.appendRow(item)
+
+    def _on_activated(self, index):
+        customer_id = index.data(Qt.UserRole)
+        if customer_id is not None:
+            # Queued: the line edit first puts the completion text in, the selection then shows the item text
+            QTimer.singleShot(0, lambda: self.customer_chosen.emit(customer_id))
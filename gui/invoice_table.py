@@ -1,69 +1,439 @@
+from bisect import bisect_left
+from collections import Counter
 from PySide6.QtWidgets import (
-    QTableWidget, QTableWidgetItem, QSpinBox, QDoubleSpinBox, QAbstractScrollArea,
-    QWidget, QHBoxLayout, QLabel, QAbstractItemView, QHeaderView, QSizePolicy
+    QTableView, QSpinBox, QDoubleSpinBox, QAbstractScrollArea, QAbstractItemView,
+    QHeaderView, QStyledItemDelegate
 )
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QFontMetrics
-from .widgets import HoverDeleteButton
-
+from PySide6.QtCore import Qt, Signal, QAbstractTableModel, QModelIndex, QRect, QEvent, QTimer
+from PySide6.QtGui import QFontMetrics, QColor
+from models.invoice_line import InvoiceLine, DEFAULT_TAX_RATE, to_cents
+from models.invoice_calculator import TotalsAccumulator
+
+COL_PRODUCT, COL_QUANTITY, COL_PRICE, COL_SUM = range(4)
+
+
+class InvoiceTableModel(QAbstractTableModel):
+    """
+    Invoice positions as a table model backed by a list of InvoiceLine.
+
+    Every line gets a stable key when it is added (line_key(row)). Keys
+    are handed out in increasing order and rows are only appended, so the
+    keys list stays sorted and a key's current row is a binary search
+    (O(log n)); nothing has to be renumbered when a row is removed. The
+    removal itself is O(n) for shifting the list entries behind it (a
+    memmove), plus O(k) for the k lines sharing its name. The product
+    id -> key and lowercase name -> keys indexes (the latter for lines
+    without a product, e.g. from old invoices) make adding an existing
+    product or propagating a price change a lookup instead of a scan over
+    all rows. Running net sums per tax rate are updated by the delta of
+    every change, so the totals never require a pass over all lines either.
+    """
+    HEADERS = ["Produkt", "Menge", "Einzelpreis (€)", "Summe (€)"]
+
+    totals_changed = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lines = []
+        self._keys = []               # stable key per row, parallel to _lines and ascending
+        self._key_by_product = {}
+        self._keys_by_name = {}       # lowercase name -> keys (more than one only if products share a name)
+        self._next_key = 0
+        self._totals = TotalsAccumulator()
+
+    # ---- Qt model interface ----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in (COL_QUANTITY, COL_PRICE):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        line = self._lines[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == COL_PRODUCT:
+                return line.name
+            if column == COL_QUANTITY:
+                return str(line.quantity)
+            if column == COL_PRICE:
+                return f"{line.price:.2f}"
+            if column == COL_SUM:
+                return f"{line.net:.2f}"
+        elif role == Qt.EditRole:
+            if column == COL_QUANTITY:
+                return line.quantity
+            if column == COL_PRICE:
+                return float(line.price)
+        elif role == Qt.ToolTipRole and column == COL_PRODUCT:
+            return line.name
+        elif role == Qt.TextAlignmentRole:
+            if column in (COL_PRODUCT, COL_SUM):
+                return int(Qt.AlignLeft | Qt.AlignVCenter)
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        if index.column() == COL_QUANTITY:
+            return self.set_quantity(index.row(), value)
+        if index.column() == COL_PRICE:
+            return self.set_price(index.row(), value)
+        return False
+
+    # ---- Line operations ----
+    def line(self, row):
+        return self._lines[row]
+
+    def lines(self):
+        return list(self._lines)
+
+    def totals(self, rabatt_mode=None, rabatt_value=0):
+        """Current InvoiceTotals, computed from the running sums (independent of the row count)."""
+        return self._totals.result(rabatt_mode, rabatt_value)
+
+    def line_key(self, row):
+        """Stable key of the line in row; it stays valid while other lines come and go."""
+        return self._keys[row]
+
+    def row_of(self, key):
+        """Current row of the line with this key, or -1 once it was removed."""
+        row = bisect_left(self._keys, key)
+        return row if row < len(self._keys) and self._keys[row] == key else -1
+
+    def find_row(self, name):
+        """Row of the (first) line with this name (case-insensitive), or -1."""
+        keys = self._keys_by_name.get(name.lower())
+        return self.row_of(keys[0]) if keys else -1
+
+    def find_product_row(self, product_id):
+        """Row of the line of this product (products.id), or -1."""
+        key = self._key_by_product.get(product_id)
+        return -1 if key is None else self.row_of(key)
+
+    def _merge_row(self, line):
+        """Row a new line is merged into: the same product, else a line of the same name without a product."""
+        if line.product_id is not None:
+            row = self.find_product_row(line.product_id)
+            if row != -1:
+                return row
+        for key in self._keys_by_name.get(line.name.lower(), ()):
+            row = self.row_of(key)
+            if line.product_id is None or self._lines[row].product_id is None:
+                return row
+        return -1  # no line of this name, or only ones of other products
+
+    def _append(self, line):
+        key = self._next_key
+        self._next_key += 1
+        self._lines.append(line)
+        self._keys.append(key)
+        if line.product_id is not None:
+            self._key_by_product[line.product_id] = key
+        self._keys_by_name.setdefault(line.name.lower(), []).append(key)
+
+    def _merge(self, row, line):
+        """Add line's quantity to the line in row; that line takes over line's product id if it had none."""
+        existing = self._lines[row]
+        if existing.product_id is None and line.product_id is not None:
+            existing.product_id = line.product_id
+            self._key_by_product[line.product_id] = self._keys[row]
+        return existing
+
+    def _reset_lines(self):
+        self._lines = []
+        self._keys = []
+        self._key_by_product = {}
+        self._keys_by_name = {}
+        self._totals.clear()
+
+    def add_line(self, line):
+        """Append a line, or add its quantity to an existing line of the same product. Returns the row."""
+        row = self._merge_row(line)
+        if row != -1:
+            existing = self._merge(row, line)
+            self.set_quantity(row, existing.quantity + line.quantity)
+            return row
+
+        row = len(self._lines)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._append(line)
+        self._totals.add_line(line)
+        self.endInsertRows()
+        self.totals_changed.emit()
+        return row
+
+    def set_lines(self, lines):
+        """
+        Replace all lines in one model reset (one view update, one
+        totals_changed). Lines of the same product are merged as add_line
+        would. The model takes ownership of the InvoiceLine objects.
+        """
+        self.beginResetModel()
+        self._reset_lines()
+        for line in lines:
+            row = self._merge_row(line)
+            if row != -1:
+                existing = self._merge(row, line)
+                existing.quantity += line.quantity
+                self._totals.add(line.quantity * existing.price_cents, existing.tax_rate)
+            else:
+                self._append(line)
+                self._totals.add_line(line)
+        self.endResetModel()
+        self.totals_changed.emit()
+
+    def set_quantity(self, row, quantity):
+        quantity = max(1, int(quantity))
+        line = self._lines[row]
+        if line.quantity == quantity:
+            return False
+        self._totals.add((quantity - line.quantity) * line.price_cents, line.tax_rate)
+        line.quantity = quantity
+        self._emit_row_changed(row)
+        return True
+
+    def set_price(self, row, price):
+        price_cents = to_cents(price)
+        line = self._lines[row]
+        if line.price_cents == price_cents:
+            return False
+        self._totals.add(line.quantity * (price_cents - line.price_cents), line.tax_rate)
+        line.price_cents = price_cents
+        self._emit_row_changed(row)
+        return True
+
+    def remove_row(self, row):
+        if not 0 <= row < len(self._lines):
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        line = self._lines.pop(row)
+        key = self._keys.pop(row)
+        if self._key_by_product.get(line.product_id) == key:
+            del self._key_by_product[line.product_id]
+        name_keys = self._keys_by_name[line.name.lower()]
+        name_keys.remove(key)
+        if not name_keys:
+            del self._keys_by_name[line.name.lower()]
+        self._totals.remove(line.net_cents, line.tax_rate)
+        self.endRemoveRows()
+        self.totals_changed.emit()
+
+    def remove_key(self, key):
+        """Remove the line with this key (see line_key); does nothing if it is gone already."""
+        row = self.row_of(key)
+        if row != -1:
+            self.remove_row(row)
+
+    def clear(self):
+        self.beginResetModel()
+        self._reset_lines()
+        self.endResetModel()
+        self.totals_changed.emit()
+
+    def _emit_row_changed(self, row):
+        self.dataChanged.emit(self.index(row, COL_QUANTITY), self.index(row, COL_SUM))
+        self.totals_changed.emit()
+
+
+class InvoiceItemDelegate(QStyledItemDelegate):
+    """Spin box editors for quantity and price, and the hover delete cross in the sum column."""
+
+    BUTTON_SIZE = 22
+
+    def _delete_rect(self, rect):
+        return QRect(rect.right() - 5 - self.BUTTON_SIZE, rect.center().y() - self.BUTTON_SIZE // 2 + 1,
+                     self.BUTTON_SIZE, self.BUTTON_SIZE)
+
+    def createEditor(self, parent, option, index):
+        if index.column() == COL_QUANTITY:
+            editor = QSpinBox(parent)
+            editor.setMinimum(1)
+            editor.setMaximum(10_000_000)
+            return editor
+        if index.column() == COL_PRICE:
+            editor = QDoubleSpinBox(parent)
+            editor.setDecimals(2)
+            editor.setMinimum(0)
+            editor.setMaximum(float("inf"))
+            return editor
+        return None
+
+    def setEditorData(self, editor, index):
+        editor.setValue(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value(), Qt.EditRole)
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+
+        # Delete cross right-aligned in the sum cell of the hovered row
+        view = self.parent()
+        if index.column() == COL_SUM and view is not None and getattr(view, "hovered_row", -1) == index.row():
+            painter.save()
+            font = painter.font()
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(QColor("red"))
+            painter.drawText(self._delete_rect(option.rect), Qt.AlignCenter, "✕")
+            painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (index.column() == COL_SUM and event.type() == QEvent.MouseButtonRelease
+                and event.button() == Qt.LeftButton
+                and self._delete_rect(option.rect).contains(event.position().toPoint())):
+            self.parent().delete_row(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)
+
+
+class InvoiceTable(QTableView):
+    RESIZE_DEBOUNCE_MS = 100
+    TEXT_WIDTH_CACHE_SIZE = 20_000
 
-class InvoiceTable(QTableWidget):
     def __init__(self):
-        super().__init__(0, 4)
-
-        self.setHorizontalHeaderLabels(["Produkt", "Menge", "Einzelpreis (€)", "Summe (€)"])
+        super().__init__()
+
+        # Measured name widths (per text, for the current font) and how many
+        # lines have each width, so the widest name is known without a pass
+        # over all rows
+        self._metrics = None
+        self._text_widths = {}
+        self._width_counts = Counter()
+        self._widest = 0
+
+        self.invoice_model = InvoiceTableModel(self)
+        self.setModel(self.invoice_model)
+        self.setItemDelegate(InvoiceItemDelegate(self))
+        self.invoice_model.totals_changed.connect(self.schedule_totals_update)
+        self._totals_update_pending = False
 
         # Initial resize modes (later switched to Interactive)
         self.horizontalHeader().setSectionResizeMode(0, QHeaderView.Interactive)
-        self.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        self.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        self.horizontalHeader().setSectionResizeMode(1, QHeaderView.Interactive)
+        self.horizontalHeader().setSectionResizeMode(2, QHeaderView.Interactive)
         self.horizontalHeader().setSectionResizeMode(3, QHeaderView.Interactive)
+        self.setColumnWidth(1, 110)
+        self.setColumnWidth(2, 130)
+        self.setColumnWidth(3, 130)
 
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
-
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
 
         self.setSizeAdjustPolicy(QAbstractScrollArea.AdjustToContentsOnFirstShow)
         self.setMinimumWidth(800)
 
         self.verticalHeader().setVisible(False)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(30)
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setEditTriggers(
+            QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked
+            | QAbstractItemView.EditKeyPressed | QAbstractItemView.AnyKeyPressed
+        )
         self.setMouseTracking(True)
-        self.cellEntered.connect(self.on_table_hover)
+        self.entered.connect(self.on_table_hover)
 
-        self.setWordWrap(True)
+        self.setWordWrap(False)
+        self.setTextElideMode(Qt.ElideRight)
 
-        self._sum_labels = {}
-        self._delete_buttons = {}
+        self.hovered_row = -1
+        self.parent_window = None
 
         # Default max width for product column (updated on window resize)
         self._product_max_width = 250
 
+        # Keep the widest name up to date as lines come and go
+        self.invoice_model.rowsInserted.connect(self._on_rows_inserted)
+        self.invoice_model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        self.invoice_model.modelReset.connect(self._on_model_reset)
+
+        # Column sizing runs once at the end of a resize burst, not per resize event
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(self.RESIZE_DEBOUNCE_MS)
+        self._resize_timer.timeout.connect(self.adjust_product_column_width)
+
+    def rowCount(self):
+        return self.invoice_model.rowCount()
+
     # ---------------------------------------------------------
     # CALCULATE TEXT WIDTH (PIXELS)
     # ---------------------------------------------------------
     def calculate_text_width(self, text: str) -> int:
-        metrics = QFontMetrics(self.font())
-        return metrics.horizontalAdvance(text) + 20  # padding
+        width = self._text_widths.get(text)
+        if width is None:
+            if self._metrics is None:
+                self._metrics = QFontMetrics(self.font())
+            if len(self._text_widths) >= self.TEXT_WIDTH_CACHE_SIZE:
+                self._text_widths.clear()
+            width = self._text_widths[text] = self._metrics.horizontalAdvance(text) + 20  # padding
+        return width
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self._metrics = None
+            self._text_widths = {}
+            self._on_model_reset()
+            self.adjust_product_column_width()
+
+    # ---------------------------------------------------------
+    # WIDEST PRODUCT NAME (kept up to date on insert / remove)
+    # ---------------------------------------------------------
+    def _on_rows_inserted(self, parent, first, last):
+        for row in range(first, last + 1):
+            width = self.calculate_text_width(self.invoice_model.line(row).name)
+            self._width_counts[width] += 1
+            self._widest = max(self._widest, width)
+
+        # Only new names can widen the product column (capped to max width)
+        width = min(self._widest, self._product_max_width)
+        if width > self.columnWidth(0):
+            self.setColumnWidth(0, width)
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        for row in range(first, last + 1):
+            width = self.calculate_text_width(self.invoice_model.line(row).name)
+            self._width_counts[width] -= 1
+            if not self._width_counts[width]:
+                del self._width_counts[width]
+        if self._widest not in self._width_counts:
+            # The distinct widths are a few hundred at most, whatever the row count
+            self._widest = max(self._width_counts, default=0)
+
+    def _on_model_reset(self):
+        self._width_counts = Counter(
+            self.calculate_text_width(line.name) for line in self.invoice_model.lines()
+        )
+        self._widest = max(self._width_counts, default=0)
 
     # ---------------------------------------------------------
     # ADJUST PRODUCT COLUMN WIDTH (clamped to max width)
     # ---------------------------------------------------------
     def adjust_product_column_width(self):
-        widest = 0
-
-        for row in range(self.rowCount()):
-            item = self.item(row, 0)
-            if item:
-                w = self.calculate_text_width(item.text())
-                widest = max(widest, w)
-
-        # Apply max width protection
-        self.setColumnWidth(0, min(widest, self._product_max_width))
+        self.setColumnWidth(0, min(self._widest, self._product_max_width))
 
     # ---------------------------------------------------------
-    # RESIZE EVENT → updates max width + fixes table live
+    # RESIZE EVENT → updates max width, column follows when resizing stops
     # ---------------------------------------------------------
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -79,165 +449,68 @@ class InvoiceTable(QTableWidget):
 
         self._product_max_width = max(150, viewport_width - used_by_other_cols)
 
-        # Re-apply the limit
-        self.adjust_product_column_width()
+        # Re-apply the limit once the resize burst is over
+        self._resize_timer.start()
 
     # --------------------------
     # ADD PRODUCT
     # --------------------------
-    def add_product(self, name, price):
-        # Check for duplicates
-        for row in range(self.rowCount()):
-            if self.item(row, 0).text().lower() == name.lower():
-                qty_widget = self.cellWidget(row, 1)
-                qty_widget.setValue(qty_widget.value() + 1)
-                self.update_totals()
-                return
-
-        # Add new row
-        row = self.rowCount()
-        self.insertRow(row)
-
-        # PRODUCT NAME (with wrapping)
-        product_item = QTableWidgetItem(name)
-        product_item.setFlags(product_item.flags() & ~Qt.ItemIsEditable)
-        product_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-        product_item.setToolTip(name)
-        product_item.setFont(self.font())
-        product_item.setSizeHint(product_item.sizeHint())
-        self.setItem(row, 0, product_item)
-
-        # Resize to fit content first
-        self.resizeColumnToContents(0)
-
-        # Then cap to max width
-        self.setColumnWidth(0, min(self.columnWidth(0), self._product_max_width))
-
-        # --------------------------
-        # QUANTITY
-        qty_widget = QSpinBox()
-        qty_widget.setValue(1)
-        qty_widget.setMinimum(1)
-
-        qty_widget.setMinimumWidth(100)
-        qty_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-
-        qty_widget.valueChanged.connect(lambda _: self.update_row_sum(row)) 
-        self.setCellWidget(row, 1, qty_widget)
-
-        # Single price
-        price_widget = QDoubleSpinBox() 
-        price_widget.setDecimals(2)
-        price_widget.setMinimum(0)
-        price_widget.setMaximum(float("inf"))
-        price_widget.setValue(price)
-
-        price_widget.setMinimumWidth(100)
-        price_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-
-        price_widget.valueChanged.connect(lambda _: self.update_row_sum(row))
-        self.setCellWidget(row, 2, price_widget)
-
-        # Sum + delete button
-        container = QWidget()
-        layout = QHBoxLayout(container)
-        layout.setContentsMargins(5, 0, 5, 0)
-        layout.setSpacing(5)
-
-        sum_label = QLabel(f"{price:.2f}")
-        sum_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-
-        delete_btn = HoverDeleteButton()
-        delete_btn.clicked.connect(lambda _, btn=delete_btn: self.delete_row(self.get_button_row(btn)))
-
-        layout.addWidget(sum_label)
-        layout.addStretch()
-        layout.addWidget(delete_btn, alignment=Qt.AlignRight | Qt.AlignVCenter)
-        self.setCellWidget(row, 3, container)
-
-        self._sum_labels[row] = sum_label
-        self._delete_buttons[row] = delete_btn
-
-        self.resizeRowsToContents()
-        self.resizeColumnsToContents()
-
-        # Reapply max width constraint after auto-resize
-        self.setColumnWidth(0, min(self.columnWidth(0), self._product_max_width))
-
-        # Set all columns interactive afterwards
-        header = self.horizontalHeader()
-        for col in range(self.columnCount()):
-            header.setSectionResizeMode(col, QHeaderView.Interactive)
-
-        self.viewport().update()
-        self.update_totals()
-
-    def get_button_row(self, btn):
-        for row in range(self.rowCount()):
-            widget = self.cellWidget(row, 3)
-            if widget:
-                layout = widget.layout()
-                if layout.itemAt(layout.count() - 1).widget() == btn:
-                    return row
-        return -1
+    def add_product(self, name, price, tax_rate=DEFAULT_TAX_RATE, product_id=None, quantity=1):
+        """Add a position, or raise the quantity if the product is already on the invoice."""
+        return self.invoice_model.add_line(InvoiceLine(product_id, quantity, price, name, tax_rate))
+
+    def set_lines(self, lines):
+        """Replace the table content with lines (InvoiceLine objects) in a single pass."""
+        self.setUpdatesEnabled(False)
+        try:
+            self.hovered_row = -1
+            self.invoice_model.set_lines(lines)
+            self.adjust_product_column_width()
+        finally:
+            self.setUpdatesEnabled(True)
 
     def delete_row(self, row_index):
         if row_index == -1:
             return
-        self.removeRow(row_index)
-        if row_index in self._sum_labels:
-            del self._sum_labels[row_index]
-        if row_index in self._delete_buttons:
-            del self._delete_buttons[row_index]
-        self._rebuild_refs()
-        self.update_totals()
-
-    def _rebuild_refs(self):
-        """Fix references after deletion."""
-        new_sums = {}
-        new_btns = {}
-        for row in range(self.rowCount()):
-            widget = self.cellWidget(row, 3)
-            if widget:
-                layout = widget.layout()
-                new_sums[row] = layout.itemAt(0).widget()
-                new_btns[row] = layout.itemAt(layout.count() - 1).widget()
-        self._sum_labels = new_sums
-        self._delete_buttons = new_btns
-
-    def update_row_sum(self, row):
-        """Recalculate a single row when quantity or price changes."""
-        qty_widget = self.cellWidget(row, 1)
-        price_widget = self.cellWidget(row, 2)
-        sum_label = self._sum_labels.get(row)
-
-        total = qty_widget.value() * price_widget.value()
-        sum_label.setText(f"{total:.2f}")
-        self.update_totals()
+        self.invoice_model.remove_row(row_index)
+        self.hovered_row = -1
+
+    def clear_lines(self):
+        self.invoice_model.clear()
+
+    def get_lines(self):
+        """Return the table content as InvoiceLine objects (input for the calculation engine)."""
+        return self.invoice_model.lines()
+
+    def schedule_totals_update(self):
+        """Coalesce label updates: however many rows change, repaint the totals once per event-loop tick."""
+        if self._totals_update_pending:
+            return
+        self._totals_update_pending = True
+        QTimer.singleShot(0, self.update_totals)
 
     def update_totals(self):
-        """Sum all rows."""
-        netto = 0.0
-        for row, label in self._sum_labels.items():
-            try:
-                netto += float(label.text())
-            except ValueError:
-                pass
-        mwst = netto * 0.19
-        brutto = netto + mwst
+        """Show the model's running totals in the summary labels."""
+        self._totals_update_pending = False
+        totals = self.invoice_model.totals()
 
         if hasattr(self.parent_window, 'sum_netto_label'):
-            self.parent_window.sum_netto_label.setText(f"Zwischensumme (Netto): {netto:.2f} €")
+            self.parent_window.sum_netto_label.setText(f"Zwischensumme (Netto): {totals.net:.2f} €")
         if hasattr(self.parent_window, 'sum_tax_label'):
-            self.parent_window.sum_tax_label.setText(f"MwSt (19%): {mwst:.2f} €")
+            self.parent_window.sum_tax_label.setText(f"{totals.tax_label()}: {totals.tax:.2f} €")
         if hasattr(self.parent_window, 'sum_brutto_label'):
-            self.parent_window.sum_brutto_label.setText(f"Gesamtsumme (Brutto): {brutto:.2f} €")
+            self.parent_window.sum_brutto_label.setText(f"Gesamtsumme (Brutto): {totals.gross:.2f} €")
 
-
-    def on_table_hover(self, row, column):
-        # Hide all buttons first
-        for btn in self._delete_buttons.values():
-            btn.hide()
-        # Show only hovered row button
-        if row in self._delete_buttons:
-            self._delete_buttons[row].show()
+    def on_table_hover(self, index):
+        row = index.row()
+        if row == self.hovered_row:
+            return
+        previous, self.hovered_row = self.hovered_row, row
+        # Repaint only the sum cells whose delete cross appears or disappears
+        for r in (previous, row):
+            if r >= 0:
+                self.update(self.invoice_model.index(r, COL_SUM))
+
+    def leaveEvent(self, event):
+        self.on_table_hover(QModelIndex())
+        super().leaveEvent(event)
@@ -1,22 +1,40 @@
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QFileDialog,
-    QListWidget, QListWidgetItem, QPushButton, QLabel, QCheckBox, QScrollArea,
-    QLineEdit, QMessageBox, QButtonGroup, QRadioButton, QComboBox, QDoubleSpinBox
+    QListView, QPushButton, QLabel, QCheckBox, QScrollArea,
+    QLineEdit, QMessageBox, QInputDialog, QButtonGroup, QRadioButton, QComboBox, QDoubleSpinBox,
+    QProgressBar
 )
-from PySide6.QtCore import Qt
-from .product_list import ProductListItem
+from PySide6.QtCore import Qt, Signal, QThreadPool, QTimer
+from .product_list import ProductListModel, ProductItemDelegate
 from .invoice_table import InvoiceTable
 from .app_menu_bar import AppMenuBar
+from .render_worker import RenderQueue
+from .startup_loader import StartupLoader
 from pdf.invoice_generator import InvoiceGenerator
-from database.db import get_connection
+from utils.instrumentation import timed
+from pdf.render_context import invalidate_render_context
+from database.db import transaction
+from database.product_import import import_products_csv
+from database.invoice_repository import InvoiceRepository
 from gui.custumer_window import CustomerWindow
+from gui.customer_completer import CustomerCompleter
+from database.custumer_repository import CustomerRepository
 from gui.business_info_window import BusinessInfoWindow
-import csv
 
 
 class MainWindow(QMainWindow):
+    """
+    Startup is split so the window shows at once: the constructor only
+    builds widgets, the data is read in the background after the first
+    paint (see start_loading), and reportlab is imported on the first save.
+    """
+    first_painted = Signal()
+    ready = Signal()            # products, customers and logo are loaded
+
     def __init__(self):
         super().__init__()
+        self._painted = False
+        self._loader = None
         self.setWindowTitle("Lokales Rechnungsprogramm")
         self.setGeometry(200, 200, 950, 550)
 
@@ -29,8 +47,21 @@ class MainWindow(QMainWindow):
         left_layout = QVBoxLayout()
         left_layout.addWidget(QLabel("Produkte:"))
 
-        self.product_list = QListWidget()
-        self.product_list.itemDoubleClicked.connect(self.add_product_to_table)
+        self.product_model = ProductListModel(self)
+        self.product_model.price_changed.connect(self.update_product_price)
+
+        # The model is attached once its first batch is loaded (on_initial_data)
+        self.product_list = QListView()
+        self.product_list.setUniformItemSizes(True)
+        self.product_list.setMouseTracking(True)
+        self.product_list.viewport().setAttribute(Qt.WA_Hover)
+        self.product_list.setEditTriggers(QListView.NoEditTriggers)
+
+        self.product_delegate = ProductItemDelegate(self.product_list)
+        self.product_delegate.delete_requested.connect(self.delete_product)
+        self.product_list.setItemDelegate(self.product_delegate)
+
+        self.product_list.doubleClicked.connect(self.add_product_to_table)
         left_layout.addWidget(self.product_list)
 
         left_layout.addWidget(QLabel("Neues Produkt hinzufügen:"))
@@ -96,7 +127,18 @@ class MainWindow(QMainWindow):
         sort_buttons_layout.addWidget(self.sort_by_name)
 
         self.customer_combo = QComboBox()
-        self.customer_combo.setPlaceholderText("Kunde auswählen...")
+        self.customer_combo.setEditable(True)
+        self.customer_combo.setInsertPolicy(QComboBox.NoInsert)
+        self.customer_combo.lineEdit().setPlaceholderText("Kunde suchen (Name, Ort, E-Mail, Steuernr.)...")
+
+        # Type-ahead search over all customers; the drop-down itself only lists the first COMBO_LIMIT.
+        # Attached to the line edit: QComboBox.setCompleter would look the completion text up with
+        # findText() after customer_chosen and reset the index when it is not an item text
+        self.customer_completer = CustomerCompleter(self)
+        self.customer_combo.lineEdit().setCompleter(self.customer_completer)
+        self.customer_combo.lineEdit().textEdited.connect(self.customer_completer.search)
+        self.customer_completer.customer_chosen.connect(self.select_customer_in_combobox)
+        self._customer_rows = {}
 
         customer_select_layout.addLayout(sort_buttons_layout)
         customer_select_layout.addWidget(self.customer_combo)
@@ -131,8 +173,9 @@ class MainWindow(QMainWindow):
         right_layout.addLayout(rabatt_layout)
 
         # Connect sorting and selection
-        self.sort_by_id.toggled.connect(self.load_customers)
-        self.sort_by_name.toggled.connect(self.load_customers)
+        # Toggling one radio button also toggles the other, so one connection is enough.
+        # The lambda drops toggled(bool), which the @timed wrapper would pass on
+        self.sort_by_name.toggled.connect(lambda: self.load_customers())
         self.customer_combo.currentIndexChanged.connect(self.on_customer_selected)
 
         # Combine layouts
@@ -144,13 +187,61 @@ class MainWindow(QMainWindow):
         self.setMenuBar(self.menu_bar)
         self._connect_menu_signals()
 
-        # ---- Load data ----
-        self.load_products()
-        self.load_customers()
-
         # ---- Invoice Generator ----
         self.invoice_generator = InvoiceGenerator()
-        self._load_logo_from_db()
+
+        # ---- Background saving (status bar shows progress) ----
+        self.render_queue = RenderQueue(self.invoice_generator, self)
+        self.render_queue.progress.connect(self.on_save_progress)
+        self.render_queue.finished.connect(self.on_save_finished)
+        self.render_queue.failed.connect(self.on_save_failed)
+        self.render_queue.cancelled.connect(self.on_save_cancelled)
+        self.render_queue.pending_changed.connect(self.on_saves_pending)
+
+        self.save_status_label = QLabel()
+        self.save_progress = QProgressBar()
+        self.save_progress.setMaximumWidth(200)
+        self.save_cancel_button = QPushButton("Abbrechen")
+        self.save_cancel_button.clicked.connect(self.cancel_saves)
+        for widget in (self.save_status_label, self.save_progress, self.save_cancel_button):
+            self.statusBar().addPermanentWidget(widget)
+        self.on_saves_pending(0)
+
+    # -------------------------------------------------------------
+    # STARTUP
+    # -------------------------------------------------------------
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.first_painted.emit()
+            # Queued, so it runs once this first frame is finished
+            QTimer.singleShot(0, self.start_loading)
+
+    def start_loading(self):
+        """Read products, customers and the logo in a pool thread; on_initial_data fills the widgets."""
+        self._loader = StartupLoader(not self.sort_by_id.isChecked(), self.COMBO_LIMIT)
+        self._loader.signals.loaded.connect(self.on_initial_data)
+        self._loader.signals.failed.connect(self.on_initial_data_failed)
+        QThreadPool.globalInstance().start(self._loader)
+
+    def on_initial_data(self, products, customers):
+        order_by_name = self._loader.order_by_name
+        self._loader = None
+        self.product_model.reload(products)
+        self.product_list.setModel(self.product_model)
+        # Switching the sort order meanwhile already reloaded the combo box
+        if order_by_name != self.sort_by_id.isChecked():
+            self._fill_customer_combo(customers)
+        self.ready.emit()
+
+    def on_initial_data_failed(self, message):
+        self._loader = None
+        self.statusBar().showMessage(f"Daten konnten nicht im Hintergrund geladen werden: {message}", 10000)
+        self.load_products()
+        self.product_list.setModel(self.product_model)
+        self.load_customers()
+        self.ready.emit()
 
     # -------------------------------------------------------------
     # MENU SIGNAL CONNECTIONS
@@ -159,6 +250,7 @@ class MainWindow(QMainWindow):
         self.menu_bar.new_invoice.connect(self.new_invoice)
         self.menu_bar.save_invoice.connect(self.save_invoice)
         self.menu_bar.load_invoice.connect(self.load_invoice)
+        self.menu_bar.load_invoice_from_db.connect(self.load_invoice_from_db)
         self.menu_bar.exit_app.connect(self.close)
         self.menu_bar.refresh_products.connect(self.load_products)
         self.menu_bar.import_products.connect(self.import_products)
@@ -172,10 +264,9 @@ class MainWindow(QMainWindow):
     # MENU ACTION HANDLERS
     # -------------------------------------------------------------
     def new_invoice(self):
-        self.table.clearContents()
-        self.table.setRowCount(0)
-        self.table.update_totals()
+        self.table.clear_lines()
 
+    @timed("gui.save_invoice")
     def save_invoice(self):
         if not hasattr(self, 'selected_customer') or self.selected_customer is None:
             QMessageBox.warning(self, "Fehler", "Bitte zuerst Kunde auswählen.")
@@ -187,22 +278,43 @@ class MainWindow(QMainWindow):
             rabatt_mode = self.rabatt_mode_combo.currentText()
             rabatt_value = self.rabatt_value_spin.value()
 
-        self.invoice_generator.generate_invoice(
-            table = self.table, 
-            customer = self.selected_customer,
-            parent = self,
-            rabatt_mode = rabatt_mode,
-            rabatt_value = rabatt_value
-        )
+        # Freeze the table now; rendering and writing happen in the background
+        snapshot = self.invoice_generator.snapshot(self.table, self.selected_customer, rabatt_mode, rabatt_value)
+        file_path = self.invoice_generator.choose_save_path(self)
+        if file_path:
+            self.render_queue.submit(snapshot, file_path)
 
+    @timed("gui.load_invoice")
     def load_invoice(self):
         self.invoice_generator.load_invoice(self.table, self)
+        self._apply_loaded_invoice()
+
+    HISTORY_LIMIT = 200
+
+    @timed("gui.load_invoice_from_db")
+    def load_invoice_from_db(self):
+        """Pick one of the most recent stored invoices and open it."""
+        invoices = InvoiceRepository.get_invoices(limit=self.HISTORY_LIMIT)
+        if not invoices:
+            QMessageBox.information(self, "Verlauf", "Es sind noch keine Rechnungen gespeichert.")
+            return
 
+        labels = [
+            f"{inv['number'] or inv['id']} – {inv['date']} – {inv['customer_name'] or inv['customer_id']} – {inv['total']:.2f} €"
+            for inv in invoices
+        ]
+        label, ok = QInputDialog.getItem(self, "Rechnung aus Verlauf laden", "Rechnung:", labels, 0, False)
+        if not ok:
+            return
+        invoice_id = invoices[labels.index(label)]["id"]
+        if self.invoice_generator.load_invoice_from_db(self.table, invoice_id):
+            self._apply_loaded_invoice()
+
+    def _apply_loaded_invoice(self):
         # Remove any "Rabatt" line from the table (should not be treated as a product)
         for row in range(self.table.rowCount() - 1, -1, -1):
-            item = self.table.item(row, 0)
-            if item and "rabatt" in item.text().lower():
-                self.table.removeRow(row)
+            if "rabatt" in self.table.invoice_model.line(row).name.lower():
+                self.table.delete_row(row)
 
         # Select the correct customer (if available)
         if getattr(self.invoice_generator, "loaded_customer", None):
@@ -217,6 +329,40 @@ class MainWindow(QMainWindow):
             self.rabatt_mode_combo.setCurrentText("Rabattbetrag (€)")
             self.rabatt_value_spin.setValue(0.00)
 
+    # -------------------------------------------------------------
+    # BACKGROUND SAVING
+    # -------------------------------------------------------------
+    def on_saves_pending(self, count):
+        for widget in (self.save_status_label, self.save_progress, self.save_cancel_button):
+            widget.setVisible(count > 0)
+        if count:
+            queued = f" ({count - 1} in Warteschlange)" if count > 1 else ""
+            self.save_status_label.setText(f"Rechnung wird gespeichert...{queued}")
+            self.save_progress.setRange(0, 0)  # busy until the first progress report
+
+    def on_save_progress(self, task_id, done, total):
+        self.save_progress.setRange(0, total)
+        self.save_progress.setValue(done)
+
+    def on_save_finished(self, task_id, file_path, invoice_id):
+        self.statusBar().showMessage(f"Rechnung gespeichert unter: {file_path}", 10000)
+
+    def on_save_failed(self, task_id, message):
+        QMessageBox.critical(self, "Fehler beim Speichern", f"Die Rechnung konnte nicht gespeichert werden:\n{message}")
+
+    def on_save_cancelled(self, task_id):
+        self.statusBar().showMessage("Speichern abgebrochen.", 5000)
+
+    def cancel_saves(self):
+        self.render_queue.cancel()
+
+    def closeEvent(self, event):
+        # Queued invoices are still written before the window closes
+        if self.render_queue.pending():
+            self.statusBar().showMessage("Warte auf ausstehende Rechnungen...")
+            self.render_queue.wait()
+        super().closeEvent(event)
+
     def open_customer_window(self):
         self.customer_window = CustomerWindow()
         self.customer_window.show()
@@ -230,24 +376,13 @@ class MainWindow(QMainWindow):
     # -------------------------------------------------------------
     # PRODUCT MANAGEMENT
     # -------------------------------------------------------------
+    @timed("gui.load_products")
     def load_products(self):
-        self.product_list.clear()
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("SELECT id, name, price FROM products ORDER BY id DESC")
-        self.products = c.fetchall()
-        conn.close()
-
-        for prod in self.products:
-            product_id, name, price = prod
-            item = QListWidgetItem()
-            widget = ProductListItem(name, price, self.delete_product)
-            widget.price_changed.connect(self.update_product_price)
-            item.setSizeHint(widget.sizeHint())
-            self.product_list.addItem(item)
-            self.product_list.setItemWidget(item, widget)
-
-    def delete_product(self, name):
+        """Reset the product list; rows are fetched lazily as the list scrolls."""
+        self.product_model.reload()
+
+    @timed("gui.delete_product")
+    def delete_product(self, product_id, name):
         confirm = QMessageBox.question(
             self, "Löschen bestätigen",
             f"Soll das Produkt '{name}' wirklich gelöscht werden?",
@@ -256,13 +391,11 @@ class MainWindow(QMainWindow):
         if confirm == QMessageBox.No:
             return
 
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("DELETE FROM products WHERE LOWER(name)=LOWER(?)", (name,))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
         self.load_products()
 
+    @timed("gui.add_product")
     def add_product(self):
         name = self.name_input.text().strip()
         price_text = self.price_input.text().strip()
@@ -275,65 +408,61 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Fehler", "Preis muss eine Zahl sein.")
             return
 
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM products WHERE LOWER(name)=LOWER(?)", (name,))
-        if c.fetchone()[0] > 0:
+        with transaction() as conn:
+            c = conn.execute("SELECT COUNT(*) FROM products WHERE name = ? COLLATE NOCASE", (name,))
+            duplicate = c.fetchone()[0] > 0
+            if not duplicate:
+                conn.execute("INSERT INTO products (name, price) VALUES (?, ?)", (name, price))
+
+        if duplicate:
             QMessageBox.warning(self, "Duplikat", f"'{name}' existiert bereits.")
-            conn.close()
             return
 
-        c.execute("INSERT INTO products (name, price) VALUES (?, ?)", (name, price))
-        conn.commit()
-        conn.close()
-
         self.name_input.clear()
         self.price_input.clear()
         self.load_products()
 
-    def update_product_price(self, name, new_price):
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("UPDATE products SET price=? WHERE LOWER(name)=LOWER(?)", (new_price, name.lower()))
-        conn.commit()
-        conn.close()
-
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, 0)
-            if item and item.text().lower() == name.lower():
-                price_widget = self.table.cellWidget(row, 2)
-                if price_widget:
-                    price_widget.setValue(new_price)
-                    break
-        self.table.update_totals()
-
-    def add_product_to_table(self, item):
-        row_index = self.product_list.row(item)
-        product_id, name, price = self.products[row_index]
-        self.table.add_product(name, price)
+    @timed("gui.update_product_price")
+    def update_product_price(self, product_id, new_price):
+        with transaction() as conn:
+            conn.execute("UPDATE products SET price = ? WHERE id = ?", (new_price, product_id))
 
-    def load_customers(self):
-        """Loads customers into the combo box, sorted by ID or Name."""
-        conn = get_connection()
-        c = conn.cursor()
+        row = self.table.invoice_model.find_product_row(product_id)
+        if row != -1:
+            self.table.invoice_model.set_price(row, new_price)
 
-        if self.sort_by_id.isChecked():
-            c.execute("SELECT id, name FROM customers ORDER BY id ASC")
-        else:
-            c.execute("SELECT id, name FROM customers ORDER BY name COLLATE NOCASE ASC")
+    @timed("gui.add_product_to_table")
+    def add_product_to_table(self, index):
+        # Through the index, so it stays right if the list is ever sorted or filtered by a proxy
+        product_id, name, price, tax_rate = ProductListModel.product_of(index)
+        self.table.add_product(name, price, tax_rate, product_id)
 
-        customers = c.fetchall()
-        conn.close()
+    COMBO_LIMIT = 500
 
+    @timed("gui.load_customers")
+    def load_customers(self):
+        """Loads the first COMBO_LIMIT customers into the combo box, sorted by ID or Name."""
+        customers = CustomerRepository.get_customers_for_combo(
+            order_by_name=not self.sort_by_id.isChecked(), limit=self.COMBO_LIMIT
+        )
+        self._fill_customer_combo(customers)
+
+    def _fill_customer_combo(self, customers):
         self.customer_combo.blockSignals(True)
         self.customer_combo.clear()
+        self._customer_rows = {}
 
         for cust_id, name in customers:
-            display_text = f"{cust_id} – {name}"
-            self.customer_combo.addItem(display_text, userData={"id": cust_id, "name": name})
+            self._add_customer_item(cust_id, name)
 
+        self.customer_combo.setCurrentIndex(-1)
         self.customer_combo.blockSignals(False)
 
+    def _add_customer_item(self, cust_id, name):
+        self._customer_rows[cust_id] = self.customer_combo.count()
+        self.customer_combo.addItem(f"{cust_id} – {name}", userData={"id": cust_id, "name": name})
+        return self._customer_rows[cust_id]
+
     def on_customer_selected(self, index):
         """Triggered when a customer is selected."""
         data = self.customer_combo.itemData(index)
@@ -348,6 +477,7 @@ class MainWindow(QMainWindow):
         else:
             self.selected_customer = None
 
+    @timed("gui.choose_logo")
     def choose_logo(self):
         """Let the user choose an image and store it in DB as bytes."""
         file_path, _ = QFileDialog.getOpenFileName(self, "Logo auswählen", "", "Bilder (*.png *.jpg *.jpeg *.bmp)")
@@ -357,37 +487,27 @@ class MainWindow(QMainWindow):
         with open(file_path, "rb") as f:
             image_data = f.read()
 
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('logo', ?)", (image_data,))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('logo', ?)", (image_data,))
 
-        self.invoice_generator.set_logo_bytes(image_data)
+        invalidate_render_context()
         QMessageBox.information(self, "Gespeichert", "Das Logo wurde in der Datenbank gespeichert.")
 
-    def _load_logo_from_db(self):
-        """Load logo bytes from DB into memory on startup."""
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("SELECT value FROM settings WHERE key='logo'")
-        row = c.fetchone()
-        conn.close()
-
-        if row and row[0]:
-            self.invoice_generator.set_logo_bytes(row[0])
-
     def select_customer_in_combobox(self, customer_id: int):
-        """Selects the customer with the given ID in the combo box."""
-        for index in range(self.customer_combo.count()):
-            data = self.customer_combo.itemData(index)
-            if data and data.get("id") == customer_id:
-                self.customer_combo.setCurrentIndex(index)
-                # Trigger the selection so self.selected_customer is updated
-                self.on_customer_selected(index)
+        """Selects the customer with the given ID in the combo box (adding it if it is not listed yet)."""
+        index = self._customer_rows.get(customer_id)
+        if index is None:
+            customer = CustomerRepository.get_customer_by_id(customer_id)
+            if customer is None:
+                QMessageBox.warning(self, "Kunde nicht gefunden", f"Kunde mit ID {customer_id} wurde nicht gefunden.")
                 return
-        # If no matching ID is found
-        QMessageBox.warning(self, "Kunde nicht gefunden", f"Kunde mit ID {customer_id} wurde nicht gefunden.")
+            self.customer_combo.blockSignals(True)
+            index = self._add_customer_item(customer["id"], customer["name"])
+            self.customer_combo.blockSignals(False)
+
+        self.customer_combo.setCurrentIndex(index)
+        # Trigger the selection so self.selected_customer is updated
+        self.on_customer_selected(index)
 
     def apply_rabatt(self, rabatt_data: dict):
         """Applies the loaded discount data from the invoice file."""
@@ -401,6 +521,7 @@ class MainWindow(QMainWindow):
         self.rabatt_mode_combo.setCurrentText("Rabattbetrag (€)")
         self.rabatt_value_spin.setValue(rabatt_data.get("value", 0.00))
 
+    @timed("gui.import_products_from_csv")
     def import_products_from_csv(self):
         """Import products (name, price) from a CSV file."""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -412,37 +533,23 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
 
-        added_count = 0
+        confirm = QMessageBox.question(
+            self, "Preise aktualisieren",
+            "Sollen die Preise bereits vorhandener Produkte aus der Datei übernommen werden?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+
         try:
-            conn = get_connection()
-            c = conn.cursor()
-
-            with open(file_path, newline='', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile)
-                for row in reader:
-                    if len(row) != 2:
-                        continue
-                    name, price_str = row
-                    name = name.strip().strip('"')
-                    try:
-                        price = float(price_str)
-                    except ValueError:
-                        continue
-
-                    # Skip duplicates
-                    c.execute("SELECT COUNT(*) FROM products WHERE LOWER(name)=LOWER(?)", (name,))
-                    if c.fetchone()[0] == 0:
-                        c.execute("INSERT INTO products (name, price) VALUES (?, ?)", (name, price))
-                        added_count += 1
-
-            conn.commit()
-            conn.close()
+            result = import_products_csv(file_path, upsert_prices=(confirm == QMessageBox.Yes))
 
             self.load_products()
             QMessageBox.information(
                 self,
                 "Import abgeschlossen",
-                f"{added_count} Produkte wurden erfolgreich hinzugefügt."
+                f"{result.added} Produkte hinzugefügt, {result.updated} aktualisiert, "
+                f"{result.skipped} übersprungen"
+                + (f" (davon {result.duplicates} doppelt in der Datei)" if result.duplicates else "") + ".\n"
+                f"({result.rows} Zeilen in {result.elapsed:.2f} s, {result.rows_per_second:,.0f} Zeilen/s)"
             )
 
         except Exception as e:
@@ -1,60 +1,196 @@
-from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QLineEdit
-from PySide6.QtCore import Qt, Signal
-from .widgets import HoverDeleteButton
-
-class ProductListItem(QWidget):
-    """Custom widget for product list with editable right-aligned price and delete button."""
-    price_changed = Signal(str, float)
-
-    def __init__(self, name, price, delete_callback):
-        super().__init__()
-        self.name = name
-        self.price = price
-        self.delete_callback = delete_callback
-
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(8, 0, 8, 0)
-        layout.setSpacing(8)
-
-        # Left: Product name
-        self.name_label = QLabel(self.name)
-        layout.addWidget(self.name_label, alignment=Qt.AlignVCenter | Qt.AlignLeft)
-
-        # Center: Editable price field (right-aligned)
-        layout.addStretch()
-        self.price_input = QLineEdit(f"{self.price:.2f}")
-        self.price_input.setFixedWidth(80)
-        self.price_input.setAlignment(Qt.AlignRight)
-        layout.addWidget(self.price_input, alignment=Qt.AlignVCenter | Qt.AlignRight)
-
-        # Right: Delete button
-        self.delete_btn = HoverDeleteButton()
-        self.delete_btn.setFixedSize(22, 22)
-        self.delete_btn.hide()
-        layout.addWidget(self.delete_btn, alignment=Qt.AlignVCenter | Qt.AlignRight)
-
-        self.price_input.editingFinished.connect(self.on_price_changed)
-        self.delete_btn.clicked.connect(self.handle_delete)
-
-    def enterEvent(self, event):
-        self.delete_btn.show()
-        super().enterEvent(event)
-
-    def leaveEvent(self, event):
-        self.delete_btn.hide()
-        super().leaveEvent(event)
-
-    def handle_delete(self):
-        self.delete_callback(self.name)
-
-    def on_price_changed(self):
-        """Emit signal when price is manually changed."""
+from PySide6.QtWidgets import QStyledItemDelegate, QStyle, QLineEdit
+from PySide6.QtCore import Qt, Signal, QAbstractListModel, QModelIndex, QRect, QSize, QEvent
+from PySide6.QtGui import QColor
+from database.db import get_connection
+
+
+class ProductListModel(QAbstractListModel):
+    """
+    Product catalog as a list model.
+
+    Rows are fetched lazily from the database in batches (keyset paging on
+    products.id), so startup time and memory do not depend on the size of
+    the catalog. Each row is a plain (id, name, price, tax_rate) tuple.
+    """
+    IdRole = Qt.UserRole + 1
+    PriceRole = Qt.UserRole + 2
+    TaxRateRole = Qt.UserRole + 3
+
+    BATCH_SIZE = 200
+
+    price_changed = Signal(int, float)  # product id, new price
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._exhausted = False
+
+    def reload(self, first_batch=None):
+        """
+        Drop all fetched rows; the view fetches the first batch again. A
+        first_batch read elsewhere (fetch_products(), e.g. in a background
+        thread at startup) is used as is instead.
+        """
+        self.beginResetModel()
+        self._rows = list(first_batch or ())
+        self._exhausted = first_batch is not None and len(self._rows) < self.BATCH_SIZE
+        self.endResetModel()
+
+    @classmethod
+    def fetch_products(cls, before_id=None):
+        """One batch of (id, name, price, tax_rate) rows, newest first, with ids below before_id."""
+        if before_id is not None:
+            return get_connection().execute(
+                "SELECT id, name, price, tax_rate FROM products WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (before_id, cls.BATCH_SIZE)
+            ).fetchall()
+        return get_connection().execute(
+            "SELECT id, name, price, tax_rate FROM products ORDER BY id DESC LIMIT ?",
+            (cls.BATCH_SIZE,)
+        ).fetchall()
+
+    # ---- Qt model interface ----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        batch = self.fetch_products(self._rows[-1][0] if self._rows else None)
+        if len(batch) < self.BATCH_SIZE:
+            self._exhausted = True
+        if not batch:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        self._rows.extend(batch)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        product_id, name, price, tax_rate = self._rows[index.row()]
+        if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+            return name
+        if role == Qt.EditRole:
+            return f"{price:.2f}"
+        if role == self.IdRole:
+            return product_id
+        if role == self.PriceRole:
+            return price
+        if role == self.TaxRateRole:
+            return tax_rate
+        return None
+
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Edit the price of a product; emits price_changed(product_id, price) when it changes."""
+        if role != Qt.EditRole or not index.isValid():
+            return False
         try:
-            new_price = float(self.price_input.text().replace(",", "."))
+            new_price = float(str(value).replace(",", "."))
         except ValueError:
-            self.price_input.setText(f"{self.price:.2f}")
-            return
+            return False
+
+        product_id, name, price, tax_rate = self._rows[index.row()]
+        if abs(new_price - price) <= 1e-9:
+            return False
+
+        self._rows[index.row()] = (product_id, name, new_price, tax_rate)
+        self.dataChanged.emit(index, index, [Qt.EditRole, self.PriceRole])
+        self.price_changed.emit(product_id, new_price)
+        return True
+
+    def product_at(self, row):
+        """Return the (id, name, price, tax_rate) tuple of a row of this model (not of a proxy)."""
+        return self._rows[row]
+
+    @classmethod
+    def product_of(cls, index):
+        """(id, name, price, tax_rate) of an index of this model or of a sorting/filtering proxy over it."""
+        return (index.data(cls.IdRole), index.data(Qt.DisplayRole),
+                index.data(cls.PriceRole), index.data(cls.TaxRateRole))
+
+
+class ProductItemDelegate(QStyledItemDelegate):
+    """
+    Paints name and right-aligned price. The price editor is only created
+    while editing (click on the price), the red delete cross is only painted
+    for the hovered row.
+    """
+    delete_requested = Signal(int, str)  # product id, name (for the confirmation)
+
+    ROW_HEIGHT = 30
+    PRICE_WIDTH = 80
+    BUTTON_SIZE = 22
+    MARGIN = 8
+
+    def _delete_rect(self, rect):
+        return QRect(rect.right() - self.MARGIN - self.BUTTON_SIZE,
+                     rect.center().y() - self.BUTTON_SIZE // 2 + 1,
+                     self.BUTTON_SIZE, self.BUTTON_SIZE)
+
+    def _price_rect(self, rect):
+        delete_rect = self._delete_rect(rect)
+        return QRect(delete_rect.left() - self.MARGIN - self.PRICE_WIDTH,
+                     rect.top() + 4, self.PRICE_WIDTH, rect.height() - 8)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else None
+        if style:
+            style.drawPrimitive(QStyle.PE_PanelItemViewItem, option, painter, option.widget)
+
+        painter.save()
+        selected = option.state & QStyle.State_Selected
+        painter.setPen(option.palette.highlightedText().color() if selected else option.palette.text().color())
+
+        price_rect = self._price_rect(option.rect)
+        name_rect = QRect(option.rect.left() + self.MARGIN, option.rect.top(),
+                          price_rect.left() - option.rect.left() - 2 * self.MARGIN, option.rect.height())
+        name = option.fontMetrics.elidedText(index.data(Qt.DisplayRole), Qt.ElideRight, name_rect.width())
+        painter.drawText(name_rect, Qt.AlignVCenter | Qt.AlignLeft, name)
+        painter.drawText(price_rect.adjusted(0, 0, -4, 0), Qt.AlignVCenter | Qt.AlignRight,
+                         f"{index.data(ProductListModel.PriceRole):.2f}")
+
+        if option.state & QStyle.State_MouseOver:
+            font = painter.font()
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(QColor("red"))
+            painter.drawText(self._delete_rect(option.rect), Qt.AlignCenter, "✕")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            pos = event.position().toPoint()
+            if self._delete_rect(option.rect).contains(pos):
+                self.delete_requested.emit(index.data(ProductListModel.IdRole), index.data(Qt.DisplayRole))
+                return True
+            if self._price_rect(option.rect).contains(pos) and self.parent() is not None:
+                self.parent().edit(index)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+    # ---- Inline price editor ----
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.setAlignment(Qt.AlignRight)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.EditRole))
+        editor.selectAll()
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.EditRole)
 
-        if abs(new_price - self.price) > 1e-9:
-            self.price = new_price
-            self.price_changed.emit(self.name, new_price)
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(self._price_rect(option.rect))
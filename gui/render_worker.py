@@ -0,0 +1,127 @@
+import threading
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+# Progress is reported every PROGRESS_STEP lines (and for the last one), not per line
+PROGRESS_STEP = 50
+
+
+class RenderCancelled(Exception):
+    pass
+
+
+class RenderSignals(QObject):
+    """Signals of one RenderTask (a QRunnable is no QObject). Delivered queued to the GUI thread."""
+    progress = Signal(int, int, int)    # task id, lines done, lines total
+    finished = Signal(int, str, int)    # task id, file path, invoice id
+    failed = Signal(int, str)           # task id, error message
+    cancelled = Signal(int)             # task id
+
+
+class RenderTask(QRunnable):
+    """Saves one invoice snapshot and writes its PDF in a pool thread."""
+
+    def __init__(self, task_id, generator, snapshot, file_path):
+        super().__init__()
+        self.setAutoDelete(False)  # RenderQueue keeps it until it is done (and may tryTake it)
+        self.task_id = task_id
+        self.generator = generator
+        self.snapshot = snapshot
+        self.file_path = file_path
+        self.signals = RenderSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _progress(self, done, total):
+        if self._cancel.is_set():
+            raise RenderCancelled()
+        if done % PROGRESS_STEP == 0 or done == total:
+            self.signals.progress.emit(self.task_id, done, total)
+
+    def run(self):
+        if self._cancel.is_set():
+            self.signals.cancelled.emit(self.task_id)
+            return
+        try:
+            invoice_id = self.generator.write_invoice(self.snapshot, self.file_path, self._progress)
+        except RenderCancelled:
+            # Raised while rendering to the temporary file; nothing was stored
+            self.signals.cancelled.emit(self.task_id)
+        except Exception as e:
+            self.signals.failed.emit(self.task_id, f"{type(e).__name__}: {e}")
+        else:
+            self.signals.finished.emit(self.task_id, self.file_path, invoice_id)
+
+
+class RenderQueue(QObject):
+    """
+    Background queue for saving invoices from the GUI.
+
+    Saves run one after another in a single pool thread: they share one
+    renderer and all write to the same database, and rendering is
+    CPU-bound under the GIL anyway. Submitting returns at once, so the
+    user can keep editing and queue further saves.
+    """
+    progress = Signal(int, int, int)
+    finished = Signal(int, str, int)
+    failed = Signal(int, str)
+    cancelled = Signal(int)
+    pending_changed = Signal(int)   # number of queued or running saves
+
+    def __init__(self, generator, parent=None):
+        super().__init__(parent)
+        self.generator = generator
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        # Keep the thread (and with it its pooled database connection) for the whole session
+        self.pool.setExpiryTimeout(-1)
+        self._tasks = {}
+        self._next_id = 1
+
+    def submit(self, snapshot, file_path):
+        """Queue a save; returns the task id used in the signals."""
+        task = RenderTask(self._next_id, self.generator, snapshot, file_path)
+        self._next_id += 1
+        task.signals.progress.connect(self.progress)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        task.signals.cancelled.connect(self._on_cancelled)
+
+        self._tasks[task.task_id] = task
+        self.pool.start(task)
+        self.pending_changed.emit(len(self._tasks))
+        return task.task_id
+
+    def cancel(self, task_id=None):
+        """Cancel one save, or all of them. Queued ones are dropped, a running one stops at its next line."""
+        for tid in [task_id] if task_id is not None else list(self._tasks):
+            task = self._tasks.get(tid)
+            if task is None:
+                continue
+            task.cancel()
+            if self.pool.tryTake(task):
+                self._on_cancelled(tid)
+
+    def pending(self):
+        return len(self._tasks)
+
+    def wait(self, msecs=-1):
+        """Block until all queued saves are written (used on shutdown). Returns False on timeout."""
+        return self.pool.waitForDone(msecs)
+
+    def _on_finished(self, task_id, file_path, invoice_id):
+        self._done(task_id)
+        self.finished.emit(task_id, file_path, invoice_id)
+
+    def _on_failed(self, task_id, message):
+        self._done(task_id)
+        self.failed.emit(task_id, message)
+
+    def _on_cancelled(self, task_id):
+        self._done(task_id)
+        self.cancelled.emit(task_id)
+
+    def _done(self, task_id):
+        if self._tasks.pop(task_id, None) is not None:
+            self.pending_changed.emit(len(self._tasks))
@@ -0,0 +1,35 @@
+from PySide6.QtCore import QObject, QRunnable, Signal
+from database.custumer_repository import CustomerRepository
+from gui.product_list import ProductListModel
+from pdf.render_context import get_render_context
+
+
+class StartupSignals(QObject):
+    loaded = Signal(object, object)     # first product batch, (id, name) customer rows
+    failed = Signal(str)                # error message
+
+
+class StartupLoader(QRunnable):
+    """
+    Reads what the main window needs after it is shown, in a pool thread:
+    the first batch of the product list, the customers of the combo box and
+    the business info and logo blob for the first invoice. Started after the
+    first paint, so the window appears before any of it is queried.
+    """
+
+    def __init__(self, order_by_name, customer_limit):
+        super().__init__()
+        self.setAutoDelete(False)  # the main window keeps it until its signals are delivered
+        self.order_by_name = order_by_name
+        self.customer_limit = customer_limit
+        self.signals = StartupSignals()
+
+    def run(self):
+        try:
+            products = ProductListModel.fetch_products()
+            customers = CustomerRepository.get_customers_for_combo(self.order_by_name, self.customer_limit)
+            get_render_context().prefetch()
+        except Exception as e:
+            self.signals.failed.emit(f"{type(e).__name__}: {e}")
+        else:
+            self.signals.loaded.emit(products, customers)
@@ -1,10 +1,45 @@
-from PySide6.QtWidgets import QApplication
-from gui.main_window import MainWindow
-from database.db import create_tables
+import time
+STARTED = time.perf_counter()  # startup times in the trace are measured from here
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+from PySide6.QtCore import Qt  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+from gui.main_window import MainWindow  # noqa: E402
+from database.db import create_tables, close_connections  # noqa: E402
+from utils import instrumentation  # noqa: E402
+
+
+def record_startup(name):
+    """Trace event for a startup milestone (see benchmarks/bench_startup.py)."""
+    instrumentation.record(name, (time.perf_counter() - STARTED) * 1000,
+                           reportlab_loaded="reportlab" in sys.modules)
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokales Rechnungsprogramm")
+    parser.add_argument("--trace", metavar="FILE",
+                        help=f"write a JSON-lines timing trace (or set {instrumentation.ENV_TRACE})")
+    parser.add_argument("--profile", metavar="NAME",
+                        help=f"cProfile the first NAME operation, e.g. gui.save_invoice (or set {instrumentation.ENV_PROFILE})")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help="exit as soon as the window is ready (startup measurement)")
+    args, qt_args = parser.parse_known_args()
+
+    # Before the first database connection is opened, so its queries are traced too
+    instrumentation.configure(args.trace or os.environ.get(instrumentation.ENV_TRACE),
+                              args.profile or os.environ.get(instrumentation.ENV_PROFILE))
+
     create_tables()  # Ensure DB tables exist
-    app = QApplication([])
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
+    # Time to first window and time to interactive
+    window.first_painted.connect(lambda: record_startup("startup.first_window"))
+    window.ready.connect(lambda: record_startup("startup.interactive"))
+    if args.quit_after_startup:
+        window.ready.connect(app.quit, Qt.QueuedConnection)
     window.show()
     app.exec()
+    close_connections()
+    instrumentation.disable()
@@ -1,9 +1,67 @@
+from models.invoice_calculator import calculate_totals
+from models.invoice_line import InvoiceLine, from_cents
+
+
 class Invoice:
-    def __init__(self, customer_id, date, total):
+    def __init__(self, customer_id, date, total=0.0):
+        self.id = None  # set once stored (database.invoice_repository)
+        self.number = None  # invoice number as printed, allocated when stored
+        self.file_path = None
         self.customer_id = customer_id
         self.date = date
         self.total = total
         self.lines = []  # List of InvoiceLine objects
+        self.rabatt_mode = None
+        self.rabatt_value = 0.0
 
     def add_line(self, line):
         self.lines.append(line)
+
+    def set_rabatt(self, mode, value):
+        self.rabatt_mode = mode
+        self.rabatt_value = value
+
+    def calculate(self):
+        """Compute the totals (see models.invoice_calculator) and update self.total (gross)."""
+        totals = calculate_totals(self.lines, self.rabatt_mode, self.rabatt_value)
+        self.total = float(totals.gross)
+        return totals
+
+
+class InvoiceSnapshot:
+    """
+    Read-only copy of an invoice at the moment it is saved.
+
+    The invoice table edits its InvoiceLine objects in place, so the GUI takes
+    a snapshot of plain values before handing the invoice to a background
+    worker; the worker renders exactly what was on screen while editing goes on.
+    """
+    __slots__ = ("lines", "invoice_date", "rabatt_mode", "rabatt_value", "_customer")
+
+    def __init__(self, lines, customer=None, rabatt_mode=None, rabatt_value=0.0, invoice_date=None):
+        init = object.__setattr__
+        # (product_id, name, quantity, price_cents, tax_rate) per line
+        init(self, "lines", tuple(
+            (line.product_id, line.name, line.quantity, line.price_cents, line.tax_rate) for line in lines
+        ))
+        init(self, "_customer", dict(customer) if customer else None)
+        init(self, "rabatt_mode", rabatt_mode)
+        init(self, "rabatt_value", rabatt_value)
+        init(self, "invoice_date", invoice_date)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("InvoiceSnapshot is read-only")
+
+    @property
+    def customer(self):
+        return dict(self._customer) if self._customer else None
+
+    def to_invoice(self):
+        """A fresh Invoice with its own line objects."""
+        invoice = Invoice(self._customer["id"] if self._customer else None, self.invoice_date)
+        invoice.lines = [
+            InvoiceLine(product_id, quantity, from_cents(price_cents), name, tax_rate)
+            for product_id, name, quantity, price_cents, tax_rate in self.lines
+        ]
+        invoice.set_rabatt(self.rabatt_mode, self.rabatt_value)
+        return invoice
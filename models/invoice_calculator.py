@@ -0,0 +1,162 @@
+from decimal import Decimal, ROUND_HALF_UP
+from models.invoice_line import from_cents, to_cents
+
+RABATT_AMOUNT = "Rabattbetrag (€)"
+RABATT_TARGET = "Zielbetrag (€ inkl. MwSt)"
+NO_RABATT = "Kein Rabatt"
+
+
+def format_rate(rate):
+    """Render a tax rate like Decimal("0.19") as "19%"."""
+    return f"{(rate * 100).normalize():f}%"
+
+
+def _round_cents(value):
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class InvoiceTotals:
+    """Result of an invoice calculation. All amounts are integer cents."""
+
+    __slots__ = ("subtotal_cents", "discount_cents", "net_cents", "tax_cents", "gross_cents", "by_rate")
+
+    def __init__(self, subtotal_cents, discount_cents, net_cents, tax_cents, by_rate):
+        self.subtotal_cents = subtotal_cents
+        self.discount_cents = discount_cents
+        self.net_cents = net_cents
+        self.tax_cents = tax_cents
+        self.gross_cents = net_cents + tax_cents
+        self.by_rate = by_rate  # {rate: (net_cents after discount, tax_cents)}
+
+    @property
+    def subtotal(self):
+        return from_cents(self.subtotal_cents)
+
+    @property
+    def discount(self):
+        return from_cents(self.discount_cents)
+
+    @property
+    def net(self):
+        return from_cents(self.net_cents)
+
+    @property
+    def tax(self):
+        return from_cents(self.tax_cents)
+
+    @property
+    def gross(self):
+        return from_cents(self.gross_cents)
+
+    def tax_label(self):
+        """'MwSt (19%)' for a single rate, 'MwSt' when several rates are involved."""
+        rates = [rate for rate, (net, _) in self.by_rate.items() if net]
+        if len(rates) == 1:
+            return f"MwSt ({format_rate(rates[0])})"
+        if not rates:
+            return "MwSt (19%)"
+        return "MwSt"
+
+
+class TotalsAccumulator:
+    """
+    Running net sums per tax rate.
+
+    Lines can be added, removed or changed by delta, so callers can keep
+    totals current without walking every line again. result() applies the
+    discount and rounds the tax once per rate.
+    """
+
+    __slots__ = ("net_by_rate",)
+
+    def __init__(self):
+        self.net_by_rate = {}
+
+    def add(self, net_cents, tax_rate):
+        self.net_by_rate[tax_rate] = self.net_by_rate.get(tax_rate, 0) + net_cents
+
+    def remove(self, net_cents, tax_rate):
+        self.add(-net_cents, tax_rate)
+
+    def add_line(self, line):
+        self.add(line.quantity * line.price_cents, line.tax_rate)
+
+    def clear(self):
+        self.net_by_rate.clear()
+
+    @property
+    def subtotal_cents(self):
+        return sum(self.net_by_rate.values())
+
+    def result(self, rabatt_mode=None, rabatt_value=0):
+        subtotal = self.subtotal_cents
+        discount = discount_cents(self.net_by_rate, rabatt_mode, rabatt_value)
+
+        by_rate = {}
+        net_total = 0
+        tax_total = 0
+        for rate, net in _distribute_discount(self.net_by_rate, discount).items():
+            tax = _round_cents(net * rate)
+            by_rate[rate] = (net, tax)
+            net_total += net
+            tax_total += tax
+
+        return InvoiceTotals(subtotal, discount, net_total, tax_total, by_rate)
+
+
+def discount_cents(net_by_rate, rabatt_mode, rabatt_value):
+    """
+    Net discount in cents for the given mode.
+
+    "Rabattbetrag" subtracts a fixed net amount, "Zielbetrag" lowers the
+    invoice so that its gross total matches the given value. The discount
+    never exceeds the subtotal.
+    """
+    subtotal = sum(net_by_rate.values())
+    if not rabatt_mode or not rabatt_value or subtotal <= 0:
+        return 0
+
+    if "Rabattbetrag" in rabatt_mode:
+        discount = to_cents(rabatt_value)
+    elif "Zielbetrag" in rabatt_mode:
+        gross = sum(net * (1 + rate) for rate, net in net_by_rate.items())
+        if gross <= 0:
+            return 0
+        target_net = Decimal(to_cents(rabatt_value)) * subtotal / gross
+        discount = subtotal - _round_cents(target_net)
+    else:
+        return 0
+
+    return max(0, min(discount, subtotal))
+
+
+def _distribute_discount(net_by_rate, discount):
+    """Spread the discount over the tax rates proportionally, exact to the cent."""
+    if not discount:
+        return dict(net_by_rate)
+
+    subtotal = sum(net_by_rate.values())
+    shares = {}
+    remainders = []
+    allocated = 0
+    for rate, net in net_by_rate.items():
+        share, remainder = divmod(discount * net, subtotal)
+        shares[rate] = share
+        allocated += share
+        remainders.append((remainder, rate))
+
+    # Largest remainder method: hand out the leftover cents
+    for _, rate in sorted(remainders, reverse=True)[:discount - allocated]:
+        shares[rate] += 1
+
+    return {rate: net - shares[rate] for rate, net in net_by_rate.items()}
+
+
+def calculate_totals(lines, rabatt_mode=None, rabatt_value=0):
+    """Compute subtotal, discount, VAT and gross of an iterable of InvoiceLine in one pass."""
+    acc = TotalsAccumulator()
+    net_by_rate = acc.net_by_rate
+    for line in lines:
+        rate = line.tax_rate
+        net_by_rate[rate] = net_by_rate.get(rate, 0) + line.quantity * line.price_cents
+    return acc.result(rabatt_mode, rabatt_value)
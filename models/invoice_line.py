@@ -1,5 +1,53 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+DEFAULT_TAX_RATE = Decimal("0.19")
+
+_CENT = Decimal("0.01")
+_rate_cache = {}
+
+
+def to_cents(amount):
+    """Convert a euro amount (float, int, str or Decimal) to integer cents."""
+    if isinstance(amount, float):
+        return round(amount * 100)
+    if isinstance(amount, int):
+        return amount * 100
+    return int((Decimal(amount) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """Convert integer cents back to a Decimal euro amount."""
+    return (Decimal(cents) * _CENT).quantize(_CENT)
+
+
+def to_rate(rate):
+    """Normalise a tax rate (0.19, "0.19", Decimal) to a Decimal, cached per value."""
+    if rate is None:
+        return DEFAULT_TAX_RATE
+    cached = _rate_cache.get(rate)
+    if cached is None:
+        cached = _rate_cache[rate] = Decimal(str(rate))
+    return cached
+
+
 class InvoiceLine:
-    def __init__(self, product_id, quantity, price):
+    __slots__ = ("product_id", "quantity", "price_cents", "name", "tax_rate")
+
+    def __init__(self, product_id, quantity, price, name="", tax_rate=DEFAULT_TAX_RATE):
         self.product_id = product_id
-        self.quantity = quantity
-        self.price = price
+        self.quantity = int(quantity)
+        self.price_cents = to_cents(price)
+        self.name = name
+        self.tax_rate = to_rate(tax_rate)
+
+    @property
+    def price(self):
+        return from_cents(self.price_cents)
+
+    @property
+    def net_cents(self):
+        return self.quantity * self.price_cents
+
+    @property
+    def net(self):
+        return from_cents(self.net_cents)
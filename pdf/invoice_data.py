@@ -0,0 +1,236 @@
+import mmap
+import re
+import zlib
+
+# Name of the embedded file that carries the invoice data (JSON)
+DATA_FILE_NAME = "invoice.json"
+
+# Old invoices: JSON appended after %%EOF between these markers
+LEGACY_START = b"%%INVOICE_JSON_START%%"
+LEGACY_END = b"%%INVOICE_JSON_END%%"
+
+TAIL_SIZE = 1024
+XREF_ENTRY_SIZE = 20
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_ROOT = re.compile(rb"/Root\s+(\d+)\s+\d+\s+R")
+_NAMES = re.compile(rb"/Names\s+(\d+)\s+\d+\s+R")
+_FILESPEC = re.compile(rb"\(" + re.escape(DATA_FILE_NAME.encode()) + rb"\)\s*(\d+)\s+\d+\s+R")
+_EMBEDDED_STREAM = re.compile(rb"/EF\s*<<\s*/F\s+(\d+)\s+\d+\s+R")
+_LENGTH = re.compile(rb"/Length\s+(\d+)")
+_INDIRECT_LENGTH = re.compile(rb"/Length\s+\d+\s+\d+\s+R")
+_EMBEDDED_FILES = re.compile(rb"/EmbeddedFiles\s+(\d+)\s+\d+\s+R")
+_FIRST = re.compile(rb"/First\s+(\d+)")
+_XREF_HEADER = re.compile(rb"xref\s+(\d+)\s+(\d+)\s*?\r?\n")
+_OBJECT = re.compile(rb"(?<![0-9])(\d+)\s+\d+\s+obj\b")
+
+
+def embed_invoice_data(pdf, payload):
+    """
+    Attach payload (JSON bytes) to the canvas as the standard embedded file
+    invoice.json. Call before pdf.save(); the data is written in the same pass.
+    """
+    # Imported here: reading invoice data must not pull in reportlab
+    from reportlab.pdfbase.pdfdoc import PDFArray, PDFDictionary, PDFName, PDFStream, PDFString, PDFZCompress
+
+    doc = pdf._doc
+    stream = PDFStream(
+        PDFDictionary({
+            "Type": PDFName("EmbeddedFile"),
+            "Subtype": "/application#2Fjson",
+            "Params": PDFDictionary({"Size": len(payload)}),
+        }),
+        payload,
+        filters=[PDFZCompress],
+    )
+    filespec = PDFDictionary({
+        "Type": PDFName("Filespec"),
+        "F": PDFString(DATA_FILE_NAME),
+        "UF": PDFString(DATA_FILE_NAME),
+        "AFRelationship": PDFName("Data"),
+        "Desc": PDFString("Rechnungsdaten"),
+        "EF": PDFDictionary({"F": doc.Reference(stream)}),
+    })
+    doc.Catalog.Names = PDFDictionary({
+        "EmbeddedFiles": PDFDictionary({
+            "Names": PDFArray([PDFString(DATA_FILE_NAME), doc.Reference(filespec)]),
+        }),
+    })
+
+
+def read_invoice_data(file_path):
+    """
+    Return the raw JSON bytes stored in an invoice PDF, or None.
+
+    The file is memory-mapped and, for the PDFs this application writes,
+    only its tail, the cross-reference entries and the few objects leading
+    to invoice.json are touched, so the cost does not depend on the size of
+    the PDF. Files that were changed afterwards (incremental updates with
+    /Prev, cross-reference streams, several xref subsections) fail that
+    fast path's checks and are read by scanning all objects instead.
+    Invoices written before the embedded file existed are recognised by
+    their markers.
+    """
+    with open(file_path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return None
+        with data:
+            tail = data[-TAIL_SIZE:]
+            if LEGACY_END in tail:
+                return _read_legacy(data)
+            for objects in (_XrefTable, _ObjectScan):
+                try:
+                    return _read_embedded(data, objects(data, tail))
+                except (ValueError, IndexError, KeyError, zlib.error):
+                    pass
+            # Also covers legacy invoices that were saved again by another program
+            return _read_legacy(data)
+
+
+def _read_legacy(data):
+    end = data.rfind(LEGACY_END)
+    if end == -1:
+        return None
+    start = data.rfind(LEGACY_START, 0, end)
+    if start == -1:
+        return None
+    return data[start + len(LEGACY_START):end]
+
+
+def _read_embedded(data, objects):
+    names = objects.read(_search(_NAMES, objects.read(objects.root)))
+    if not _FILESPEC.search(names):
+        # Other writers keep the EmbeddedFiles name tree in an object of its own
+        names = objects.read(_search(_EMBEDDED_FILES, names))
+    filespec = _search(_FILESPEC, names)
+    stream_number = _search(_EMBEDDED_STREAM, objects.read(filespec))
+
+    # Only the stream dictionary is parsed, the content is sliced by /Length
+    start = objects.offset(stream_number)
+    content_start = data.find(b"stream", start) + len(b"stream")
+    head = data[start:content_start]
+    if data[content_start:content_start + 2] == b"\r\n":
+        content_start += 2
+    else:
+        content_start += 1
+    content = data[content_start:content_start + _search(_LENGTH, head)]
+    if b"/FlateDecode" in head:
+        content = zlib.decompress(content)
+    return content
+
+
+class _XrefTable:
+    """
+    Objects located through a classic cross-reference table as reportlab
+    writes it: one "xref" section, one subsection starting at object 0,
+    fixed 20-byte entries, no /Prev. Anything else raises ValueError.
+    """
+
+    def __init__(self, data, tail):
+        self.data = data
+        trailer = tail[tail.rfind(b"trailer"):]
+        if b"/Prev" in trailer:
+            raise ValueError("incremental update")
+        xref = _search(_STARTXREF, tail[tail.rfind(b"startxref"):])
+        header = _XREF_HEADER.match(data, xref)
+        if not header or header.group(1) != b"0":
+            raise ValueError("no single cross-reference table at startxref")
+        self.count = int(header.group(2))
+        self.entries = header.end()
+        self.root = _search(_ROOT, trailer)
+
+    def offset(self, number):
+        if not 0 < number < self.count:
+            raise ValueError(f"object {number} not in the cross-reference table")
+        entry = self.data[self.entries + number * XREF_ENTRY_SIZE:self.entries + (number + 1) * XREF_ENTRY_SIZE]
+        if entry[17:18] != b"n":
+            raise ValueError(f"object {number} is not in use")
+        offset = int(entry[:10])
+        found = _OBJECT.match(self.data, offset)
+        if not found or int(found.group(1)) != number:
+            raise ValueError(f"cross-reference entry of object {number} is wrong")
+        return offset
+
+    def read(self, number):
+        start = self.offset(number)
+        end = self.data.find(b"endobj", start)
+        if end == -1:
+            raise ValueError("object not terminated")
+        return self.data[start:end]
+
+
+class _ObjectScan:
+    """
+    Objects found by reading the whole file front to back, for PDFs the
+    cross-reference table does not describe plainly. Later definitions win
+    (incremental updates append new versions), objects inside object
+    streams are unpacked, and /Root is taken from the last trailer or
+    cross-reference stream.
+    """
+
+    def __init__(self, data, tail):
+        self.data = data
+        self.offsets = {}    # number -> offset of "n g obj" in data
+        self.packed = {}     # number -> body from an object stream
+        roots = []           # (position, number) of every /Root seen
+        pos = 0
+        while True:
+            found = _OBJECT.search(data, pos)
+            if not found:
+                break
+            number, start = int(found.group(1)), found.start()
+            end = data.find(b"endobj", found.end())
+            if end == -1:
+                break
+            stream = data.find(b"stream", found.end(), end)
+            if stream != -1:
+                # Skip the content by /Length, it may contain anything
+                length = _LENGTH.search(data, found.end(), stream)
+                if length and not _INDIRECT_LENGTH.match(data, length.start()):
+                    end = max(end, data.find(b"endobj", stream + int(length.group(1))))
+                head = data[start:stream]
+                if b"/ObjStm" in head:
+                    self._unpack(head, data[start:end])
+                elif b"/XRef" in head and _ROOT.search(head):
+                    roots.append((start, _search(_ROOT, head)))
+            self.offsets[number] = start
+            self.packed.pop(number, None)
+            pos = end + len(b"endobj")
+
+        for trailer in re.finditer(rb"trailer\s*<<", data):
+            found = _ROOT.search(data, trailer.end(), data.find(b"startxref", trailer.end()))
+            if found:
+                roots.append((trailer.start(), int(found.group(1))))
+        if not roots:
+            raise ValueError("no /Root")
+        self.root = max(roots)[1]
+
+    def _unpack(self, head, obj):
+        stream = obj.find(b"stream") + len(b"stream")
+        stream += 2 if obj[stream:stream + 2] == b"\r\n" else 1
+        content = zlib.decompress(obj[stream:stream + _search(_LENGTH, head)])
+        first = _search(_FIRST, head)
+        pairs = content[:first].split()
+        bodies = [(int(pairs[i]), first + int(pairs[i + 1])) for i in range(0, len(pairs), 2)]
+        for i, (number, start) in enumerate(bodies):
+            end = bodies[i + 1][1] if i + 1 < len(bodies) else len(content)
+            self.packed[number] = content[start:end]
+            self.offsets.pop(number, None)
+
+    def offset(self, number):
+        return self.offsets[number]
+
+    def read(self, number):
+        if number in self.packed:
+            return self.packed[number]
+        start = self.offsets[number]
+        return self.data[start:self.data.find(b"endobj", start)]
+
+
+def _search(pattern, text):
+    match = pattern.search(text)
+    if not match:
+        raise ValueError(f"{pattern.pattern!r} not found")
+    return int(match.group(1))
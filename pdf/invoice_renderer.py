@@ -0,0 +1,413 @@
+import json
+from datetime import date
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.lib import colors
+from database.db import get_connection
+from pdf.render_context import get_render_context
+from pdf.invoice_data import embed_invoice_data
+from models.invoice_line import InvoiceLine, from_cents
+from models.invoice_calculator import TotalsAccumulator, format_rate
+from utils.instrumentation import span, timed
+import os
+import io
+
+# Table layout on A4, shared by all pages
+COL_POSITIONS = [25 * mm, 50 * mm, 110 * mm, 140 * mm, 170 * mm]
+LINE_HEIGHT = 6 * mm
+FOOTER_TOP = 20 * mm + 39 + 6 * mm    # grey footer rule plus some air
+TABLE_BOTTOM = FOOTER_TOP + 8 * mm    # leaves room for the "Übertrag" row
+
+
+class InvoiceRenderer:
+    """
+    Renders invoice PDFs without any Qt dependency.
+
+    Used by the GUI (through InvoiceGenerator) and by the headless batch
+    renderer, where one instance lives in each worker process.
+    """
+
+    FORMS_FROM_PAGE = 3   # see draw_chrome()
+
+    def __init__(self, db_path=None, use_forms=True):
+        self.logo_path = None
+        self.db_path = db_path
+        # Draw the footer of long invoices as a form XObject
+        self.use_forms = use_forms
+        # Business info and the decoded logo are cached here across invoices
+        self.context = get_render_context(db_path)
+
+    def set_logo(self, path):
+        self.logo_path = path
+
+    def set_logo_bytes(self, data):
+        self.context.set_logo_bytes(data)
+
+    # ----------------------------------------------------------
+    # RENDER PDF INVOICE
+    # ----------------------------------------------------------
+    @timed("pdf.render")
+    def render(self, file_path, items, customer=None, rabatt_mode=None, rabatt_value=0.0,
+               business_info=None, invoice_date=None, invoice_id=None, invoice_number=None):
+        """
+        Write the invoice PDF for the given line items to file_path.
+
+        items is an iterable of dicts with "product", "quantity", "price" and
+        optionally "product_id" and "tax_rate". It is consumed once, line by
+        line; pages are broken as they fill up, so a generator works and the
+        items are never materialized. Memory still grows with the line count
+        (roughly 1 KB per line): reportlab keeps every page's content until
+        save(), and the JSON of every line is collected for the embedded data,
+        which is written as one stream. invoice_number is printed in
+        the heading; it and invoice_id (the database row, if the invoice was
+        stored) go into the embedded data.
+        Returns the number of pages written.
+        """
+        invoice_date = invoice_date or date.today()
+        if isinstance(invoice_date, str):
+            invoice_date = date.fromisoformat(invoice_date)
+
+        # One consistent view of business info and logo, even if the GUI invalidates meanwhile
+        context = self.context.snapshot()
+
+        with span("pdf.header"):
+            pdf = canvas.Canvas(file_path, pagesize=A4)
+            width, height = A4
+            invoice_title = f"Rechnung Nr. {invoice_number}" if invoice_number else "Rechnung"
+
+            y = height - 50 * mm
+
+            buissiness = business_info if business_info is not None else context.business_info
+
+            # --- Company Header
+            company_name = buissiness["company_name"]
+            company_address = buissiness["address"]
+            company_city_id = buissiness["city_id"]
+
+            y -= 5 * mm
+
+            # --- Logo and Company Info
+            def draw_letterhead():
+                try:
+                    if context.logo is not None:
+                        self.draw_logo(pdf, context.logo, context.logo_aspect)
+                    elif self.logo_path and os.path.exists(self.logo_path):
+                        iw, ih = ImageReader(self.logo_path).getSize()
+                        self.draw_logo(pdf, self.logo_path, ih / iw)
+                except Exception as e:
+                    print(f"⚠️ Error loading logo: {e}")
+
+                pdf.setFont("Helvetica", 10)
+                pdf.setFillColor(colors.grey)
+                pdf.drawString(25 * mm, y, company_name + " | " + company_address + " | " + company_city_id)
+
+            self.draw_chrome(pdf, "letterhead", draw_letterhead)
+
+            y -= 15 * mm
+
+            # --- Load Customer Data
+            if customer and "id" in customer:
+                full_customer = self.get_customer_by_id(customer["id"])
+            else:
+                full_customer = None
+
+            if full_customer:
+                client_company = full_customer["name"]
+                client_name = full_customer["contact_name"]
+                client_address = full_customer["address"]
+                client_zip = full_customer["zip_code"]
+                client_city = full_customer["city"]
+                client_id = full_customer["id"]
+            else:
+                client_company = ""
+                client_name = ""
+                client_address = ""
+                client_zip = ""
+                client_city = ""
+                client_id = ""
+
+            pdf.setFont("Helvetica-Bold", 11)
+            pdf.drawString(25 * mm, y, client_company)
+            pdf.setFont("Helvetica", 10)
+            pdf.drawString(25 * mm, y - 5 * mm, client_name)
+            pdf.drawString(25 * mm, y - 10 * mm, client_address)
+            pdf.drawString(25 * mm, y - 15 * mm, client_zip)
+            pdf.drawString(25 * mm, y - 20 * mm, client_city)
+            y -= 30 * mm
+
+            customer_number = str(client_id).zfill(12) if client_id else "000000000000"
+
+            pdf.setFont("Helvetica-Bold", 10)
+            pdf.drawString(width - 95 * mm, y, f"Kundennummer: ")
+            pdf.drawString(width - 45 * mm, y, f"Datum:")
+            pdf.setFont("Helvetica", 10)
+            pdf.drawString(width - 95 * mm, y - 5 * mm, f"{customer_number}")
+            pdf.drawString(width - 45 * mm, y - 5 * mm, f"{invoice_date.strftime('%d.%m.%Y')}")
+            y -= 20 * mm
+
+            # --- Header
+            pdf.setFont("Helvetica-Bold", 16)
+            pdf.drawString(25 * mm, y, invoice_title)
+
+            y -= 20 * mm
+
+            # --- Table Header
+            self.draw_chrome(pdf, "table_header", lambda: self.draw_table_header(pdf), y)
+            y -= 13 * mm
+
+        # --- Table Content
+        pdf.setFont("Helvetica", 9)
+        totals = TotalsAccumulator()
+        page = 1
+        payload_items = io.StringIO()
+
+        def next_page(y):
+            """Close the current page with the carry-over and continue on a fresh one."""
+            nonlocal page
+            carry = from_cents(totals.subtotal_cents)
+            self.draw_carry_row(pdf, y - 2 * mm, carry)
+            reuse = page + 1 >= self.FORMS_FROM_PAGE
+            self.draw_chrome(pdf, "footer", lambda: self.draw_footer(pdf, buissiness), reuse=reuse)
+            pdf.showPage()
+            page += 1
+
+            y = height - 25 * mm
+            pdf.setFont("Helvetica-Bold", 10)
+            pdf.drawString(25 * mm, y, invoice_title)
+            pdf.setFont("Helvetica", 9)
+            pdf.drawRightString(width - 25 * mm, y, f"Seite {page}")
+            y -= 15 * mm
+            self.draw_chrome(pdf, "table_header", lambda: self.draw_table_header(pdf), y)
+            y -= 13 * mm
+            self.draw_carry_row(pdf, y, carry)
+            pdf.setFont("Helvetica", 9)
+            return y - LINE_HEIGHT
+
+        count = 0
+        with span("pdf.table") as phase:
+            for count, item in enumerate(items, 1):
+                line = InvoiceLine(item.get("product_id"), item["quantity"], item["price"],
+                                   item["product"], item.get("tax_rate"))
+                if y - LINE_HEIGHT < TABLE_BOTTOM:
+                    y = next_page(y)
+
+                totals.add_line(line)
+                line_sum = line.net
+
+                pdf.drawString(COL_POSITIONS[0], y, str(count))
+                pdf.drawString(COL_POSITIONS[1], y, line.name)
+                pdf.drawRightString(COL_POSITIONS[2] + 15 * mm, y, str(line.quantity))
+                pdf.drawRightString(COL_POSITIONS[3] + 15 * mm, y, f"{line.price:.2f}")
+                pdf.drawRightString(COL_POSITIONS[4] + 15 * mm, y, f"{line_sum:.2f}")
+                y -= LINE_HEIGHT
+
+                # Only the compact JSON text of each line is kept for the embedded data (O(lines))
+                if count > 1:
+                    payload_items.write(", ")
+                payload_items.write(json.dumps({
+                    "product": line.name,
+                    "product_id": line.product_id,
+                    "quantity": line.quantity,
+                    "price": float(line.price),
+                    "tax_rate": float(line.tax_rate),
+                    "sum": float(line_sum)
+                }))
+            phase.set(lines=count, pages=page)
+
+        with span("pdf.totals"):
+            result = totals.result(rabatt_mode, rabatt_value)
+
+            # The totals block has to fit above the footer as a whole
+            totals_height = (4 + 8 + 6 * max(1, len(result.by_rate)) + 6 + 10 + 4) * mm
+            if result.discount_cents:
+                totals_height += LINE_HEIGHT
+            if y - totals_height < FOOTER_TOP:
+                y = next_page(y)
+
+            if result.discount_cents:
+                pdf.setFont("Helvetica-Bold", 9)
+                pdf.drawString(COL_POSITIONS[1], y, "Rabatt")
+                pdf.drawRightString(COL_POSITIONS[4] + 15 * mm, y, f"-{result.discount:.2f}")
+                y -= 6 * mm
+
+            # --- Totals
+            y -= 4 * mm
+            pdf.line(25 * mm, y, width - 25 * mm, y)
+            y -= 8 * mm
+
+            pdf.setFont("Helvetica", 10)
+            pdf.drawRightString(width - 55 * mm, y, "Summe Netto:")
+            pdf.drawRightString(width - 25 * mm, y, f"{result.net:.2f}")
+            y -= 6 * mm
+
+            for rate, (_, tax_cents) in sorted(result.by_rate.items(), reverse=True):
+                pdf.drawRightString(width - 55 * mm, y, f"MwSt ({format_rate(rate)}):")
+                pdf.drawRightString(width - 25 * mm, y, f"{from_cents(tax_cents):.2f}")
+                y -= 6 * mm
+            if not result.by_rate:
+                pdf.drawRightString(width - 55 * mm, y, "MwSt (19%):")
+                pdf.drawRightString(width - 25 * mm, y, "0.00")
+                y -= 6 * mm
+
+            pdf.setFont("Helvetica-Bold", 11)
+            pdf.drawRightString(width - 55 * mm, y, "Gesamtbetrag:")
+            pdf.drawRightString(width - 25 * mm, y, f"{result.gross:.2f}")
+            y -= 10 * mm
+
+            pdf.setFont("Helvetica", 9)
+            pdf.setFillColor(colors.grey)
+            pdf.drawString(25 * mm, y, "Vielen Dank für Ihren Einkauf!")
+            pdf.setFillColor(colors.black)
+
+        with span("pdf.footer"):
+            self.draw_chrome(pdf, "footer", lambda: self.draw_footer(pdf, buissiness),
+                             reuse=page >= self.FORMS_FROM_PAGE)
+            pdf.showPage()
+
+        with span("pdf.embed_data") as phase:
+            json_data = "".join((
+                '{"date": ', json.dumps(invoice_date.isoformat()),
+                ', "items": [', payload_items.getvalue(), ']',
+                ', "rabatt": ', json.dumps({"mode": rabatt_mode, "value": float(result.discount)}),
+                ', "customer": ', json.dumps(customer),
+                ', "invoice_id": ', json.dumps(invoice_id),
+                ', "invoice_number": ', json.dumps(invoice_number), '}'
+            ))
+            payload = json_data.encode("utf-8")
+            embed_invoice_data(pdf, payload)
+            phase.set(bytes=len(payload))
+
+        with span("pdf.save"):
+            pdf.save()
+
+        return page
+
+    def get_customer_by_id(self, customer_id):
+        """Fetch full customer data from the database by ID."""
+        try:
+            row = get_connection(self.db_path).execute("""
+                SELECT id, name, contact_name, address, zip_code, city
+                FROM customers WHERE id = ?
+            """, (customer_id,)).fetchone()
+            if row:
+                return {
+                    "id": row[0],
+                    "name": row[1],
+                    "contact_name": row[2] or "",
+                    "address": row[3] or "",
+                    "zip_code": row[4] or "",
+                    "city": row[5] or ""
+                }
+            return None
+        except Exception as e:
+            print(f"⚠️ Error loading customer: {e}")
+            return None
+
+    def load_bussiness_info(self):
+        return self.context.business_info
+
+    # ----------------------------------------------------------
+    # STATIC PAGE CHROME
+    # ----------------------------------------------------------
+    def draw_chrome(self, pdf, name, draw, y=0, reuse=False):
+        """
+        Draw a part of the page that is the same on every page of the document.
+
+        draw() paints relative to the baseline y = 0 (absolute parts like the
+        footer simply ignore y). With use_forms and reuse the drawing is
+        recorded once per PDF as a form XObject and every later use only
+        references it.
+
+        A form is an extra object of its own (about 600 bytes for the footer)
+        and saves only the repeated, already compressed page content, so the
+        renderer asks for reuse only where it pays: for the footer of invoices
+        with at least FORMS_FROM_PAGE pages (decided when that page starts).
+        Shorter invoices, the letterhead (drawn once) and the small table
+        header stay inline.
+        """
+        if not (self.use_forms and reuse):
+            pdf.saveState()
+            pdf.translate(0, y)
+            draw()
+            pdf.restoreState()
+            return
+
+        if not pdf.hasForm(name):
+            pdf.beginForm(name, lowery=-A4[1], uppery=A4[1])
+            draw()
+            pdf.endForm()
+        pdf.saveState()
+        pdf.translate(0, y)
+        pdf.doForm(name)
+        pdf.restoreState()
+
+    def draw_logo(self, pdf, img_source, aspect):
+        logo_width = 35 * mm
+        margin = 25 * mm
+        logo_height = logo_width * aspect
+        x_pos = A4[0] - logo_width - margin
+        y_pos = A4[1] - logo_height - margin
+        pdf.drawImage(img_source, x_pos, y_pos, width=logo_width, height=logo_height, mask='auto')
+
+    def draw_table_header(self, pdf):
+        """Column titles with the rule below them, baseline at y = 0."""
+        pdf.setFont("Helvetica-Bold", 10)
+        headers = ["Pos", "Produkt", "Menge", "Einzel ( € )", "Gesamt ( € )"]
+        for i, header in enumerate(headers):
+            pdf.drawString(COL_POSITIONS[i], 0, header)
+        pdf.line(25 * mm, -5 * mm, A4[0] - 25 * mm, -5 * mm)
+
+    def draw_carry_row(self, pdf, y, amount):
+        """'Übertrag' row with the running net subtotal, at the end and start of a page."""
+        pdf.setFont("Helvetica-Bold", 9)
+        pdf.drawString(COL_POSITIONS[1], y, "Übertrag")
+        pdf.drawRightString(COL_POSITIONS[4] + 15 * mm, y, f"{amount:.2f}")
+
+    def draw_footer(self, pdf, business_info):
+        """
+        Draw footer with company info in multiple columns, on every page.
+        Adds a grey line above and a black line below.
+        """
+        width, height = A4
+        footer_y = 20 * mm  # bottom of the footer
+        col1_x = 25 * mm
+        col2_x = 75 * mm
+        col3_x = 125 * mm
+        col4_x = 175 * mm
+
+        # --- Grey line above footer
+        pdf.setStrokeColor(colors.grey)
+        pdf.setLineWidth(0.5)
+        pdf.line(25 * mm, footer_y + 39, width - 25 * mm, footer_y + 39)
+
+        pdf.setFont("Helvetica", 8)
+        pdf.setFillColor(colors.grey)
+
+        # --- Column 1
+        pdf.drawString(col1_x, footer_y + 30, business_info["company_name"])
+        pdf.drawString(col1_x, footer_y + 20, business_info["address"])
+        pdf.drawString(col1_x, footer_y + 10, business_info["city_id"])
+        pdf.drawString(col1_x, footer_y, f"Ust-IdNr.: {business_info['vat_id']}")
+
+        # --- Column 2
+        pdf.drawString(col2_x, footer_y + 30, f"Tel.: {business_info['phone']}")
+        pdf.drawString(col2_x, footer_y + 20, f"Fax: {business_info['fax']}")
+        pdf.drawString(col2_x, footer_y + 10, f"E-Mail: {business_info['email']}")
+        pdf.drawString(col2_x, footer_y, f"Web: {business_info['website']}")
+
+        # --- Column 3
+        pdf.drawString(col3_x, footer_y + 30, business_info["bank_name"])
+        pdf.drawString(col3_x, footer_y + 20, f"IBAN: {business_info['iban']}")
+        pdf.drawString(col3_x, footer_y + 10, f"BIC: {business_info['bic']}")
+        pdf.drawString(col3_x, footer_y, f"Kto. Inh.: {business_info['account_holder']}")
+
+        # --- Column 4 (optional)
+        pdf.drawString(col4_x, footer_y + 30, "Powered by YourAppName")
+
+        # --- Black line below footer
+        pdf.setStrokeColor(colors.black)
+        pdf.line(25 * mm, footer_y - 4, width - 25 * mm, footer_y - 4)
+
+        pdf.setFillColor(colors.black)
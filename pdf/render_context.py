@@ -0,0 +1,156 @@
+import io
+import threading
+from database import db
+from database.db import get_connection
+
+BUSINESS_FIELDS = (
+    "company_name", "address", "city_id", "vat_id", "phone", "fax", "email",
+    "website", "bank_name", "iban", "bic", "account_holder",
+)
+
+
+def load_business_info(db_path=None):
+    """Read the business_info row as a dict (empty strings if nothing is saved yet)."""
+    row = get_connection(db_path).execute(
+        f"SELECT {', '.join(BUSINESS_FIELDS)} FROM business_info WHERE id = 1"
+    ).fetchone()
+    if not row:
+        return {field: "" for field in BUSINESS_FIELDS}
+    return {field: value or "" for field, value in zip(BUSINESS_FIELDS, row)}
+
+
+class RenderData:
+    """Business info and decoded logo as one consistent, read-only set (see RenderContext.snapshot())."""
+
+    __slots__ = ("business_info", "logo", "logo_aspect")
+
+    def __init__(self, business_info, logo, logo_aspect):
+        self.business_info = business_info
+        self.logo = logo
+        self.logo_aspect = logo_aspect
+
+
+class RenderContext:
+    """
+    Data every invoice needs that rarely changes: the business info row and
+    the decoded logo with its aspect ratio.
+
+    Everything is loaded on first use and kept until invalidate() is called,
+    which the GUI does after saving new business info or a new logo. A batch
+    worker therefore decodes the logo once, not once per invoice.
+
+    The GUI thread may invalidate while a worker renders, so loading and
+    invalidating are serialized by a lock, and a render works on a
+    snapshot() taken once at its start.
+
+    Decoding the logo needs reportlab, which is only imported then; prefetch()
+    reads the rows without it (the GUI does that in the background at startup).
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._business_info = None
+        self._logo = None
+        self._logo_aspect = None
+        self._logo_loaded = False
+        self._logo_blob = None   # raw logo from the settings table, b"" if there is none
+        self._logo_bytes = None  # explicit override instead of the DB blob
+
+    def invalidate(self):
+        with self._lock:
+            self._business_info = None
+            self._logo_blob = None
+            self._logo = None
+            self._logo_aspect = None
+            self._logo_loaded = False
+
+    def set_logo_bytes(self, data):
+        with self._lock:
+            self._logo_bytes = data
+            self.invalidate()
+
+    def snapshot(self):
+        """Business info and logo as loaded right now; later invalidations do not affect it."""
+        with self._lock:
+            self._load_logo()
+            return RenderData(self.business_info, self._logo, self._logo_aspect)
+
+    @property
+    def business_info(self):
+        with self._lock:
+            if self._business_info is None:
+                self._business_info = load_business_info(self.db_path)
+            return self._business_info
+
+    @property
+    def logo(self):
+        """Decoded logo as an ImageReader, or None."""
+        with self._lock:
+            self._load_logo()
+            return self._logo
+
+    @property
+    def logo_aspect(self):
+        """Height / width of the logo, or None."""
+        with self._lock:
+            self._load_logo()
+            return self._logo_aspect
+
+    def _load_logo(self):
+        # Callers hold self._lock
+        if self._logo_loaded:
+            return
+        self._logo_loaded = True
+
+        data = self._logo_bytes
+        if data is None:
+            data = self._read_logo_blob()
+        if not data:
+            return
+
+        from reportlab.lib.utils import ImageReader
+        try:
+            logo = ImageReader(io.BytesIO(data))
+            iw, ih = logo.getSize()
+            # Decode the pixel data now; reportlab keeps it on the reader for every later drawImage
+            logo.getRGBData()
+        except Exception as e:
+            print(f"⚠️ Error loading logo from bytes: {e}")
+            return
+        self._logo = logo
+        self._logo_aspect = ih / iw
+
+    def _read_logo_blob(self):
+        if self._logo_blob is None:
+            row = get_connection(self.db_path).execute("SELECT value FROM settings WHERE key='logo'").fetchone()
+            self._logo_blob = row[0] if row and row[0] else b""
+        return self._logo_blob
+
+    def prefetch(self):
+        """Read business info and the logo blob, without decoding (and importing reportlab)."""
+        with self._lock:
+            self.business_info
+            self._read_logo_blob()
+
+    def preload(self):
+        """Load everything up front (used by batch workers)."""
+        self.snapshot()
+
+
+_contexts = {}
+
+
+def get_render_context(db_path=None):
+    """Shared RenderContext per database file (per process)."""
+    db_path = db_path or db.DB_FILE
+    context = _contexts.get(db_path)
+    if context is None:
+        context = _contexts.setdefault(db_path, RenderContext(db_path))  # atomic if two threads race
+    return context
+
+
+def invalidate_render_context():
+    """Drop cached business info and logo of all contexts; call after writing either."""
+    for context in list(_contexts.values()):  # a worker may add one meanwhile
+        context.invalidate()
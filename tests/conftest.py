@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The CI runs pytest from inside tests/, so make the project packages importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# GUI tests run headless
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from database import db  # noqa: E402
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point database.db at a fresh, migrated database file for one test."""
+    db_file = str(tmp_path / "test.db")
+    monkeypatch.setattr(db, "DB_FILE", db_file)
+    db.create_tables()
+    yield db_file
+    db.close_connections(db_file)
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
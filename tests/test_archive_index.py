@@ -0,0 +1,76 @@
+import os
+
+from archive_index import index_archive, search
+from pdf.invoice_renderer import InvoiceRenderer
+
+
+def _render(path, customer_id, invoice_date, products):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    items = [{"product": name, "product_id": pid, "quantity": 1, "price": 2.5} for pid, name in products]
+    InvoiceRenderer().render(str(path), items, customer={"id": customer_id}, invoice_date=invoice_date)
+
+
+def test_index_is_incremental_and_searchable(temp_db, tmp_path):
+    archive = tmp_path / "archiv"
+    index = str(tmp_path / "index.db")
+    _render(archive / "2023" / "Rechnung_1.pdf", 1, "2023-11-02", [(10, "Kabel"), (11, "Stecker")])
+    _render(archive / "2024" / "Rechnung_2.pdf", 2, "2024-03-15", [(10, "Kabel")])
+    _render(archive / "2024" / "Rechnung_3.pdf", 1, "2024-06-01", [(12, "Lampe")])
+    (archive / "2024" / "notiz.pdf").write_bytes(b"%PDF-1.4\n%%EOF\n")
+
+    stats = index_archive(str(archive), index, workers=2)
+    assert (stats["scanned"], stats["indexed"], stats["failed"]) == (4, 3, 1)
+
+    assert [r["date"] for r in search(index, customer_id=1)] == ["2024-06-01", "2023-11-02"]
+    assert len(search(index, date_from="2024-01-01", date_to="2024-12-31")) == 2
+    assert {os.path.basename(r["path"]) for r in search(index, product="kab")} == {"Rechnung_1.pdf", "Rechnung_2.pdf"}
+    assert len(search(index, product="12")) == 1
+    assert search(index, customer_id=2)[0]["subtotal"] == 2.5
+
+    # second run: nothing changed
+    stats = index_archive(str(archive), index, workers=2)
+    assert (stats["indexed"], stats["unchanged"]) == (0, 4)
+
+    # one file rewritten, one only touched, one deleted
+    _render(archive / "2024" / "Rechnung_2.pdf", 2, "2024-03-15", [(12, "Lampe")])
+    touched = archive / "2023" / "Rechnung_1.pdf"
+    os.utime(touched, ns=(touched.stat().st_atime_ns, touched.stat().st_mtime_ns + 10**9))
+    os.remove(archive / "2024" / "Rechnung_3.pdf")
+
+    stats = index_archive(str(archive), index, workers=2)
+    assert (stats["indexed"], stats["unchanged"], stats["removed"]) == (1, 2, 1)
+    assert {os.path.basename(r["path"]) for r in search(index, product="Lampe")} == {"Rechnung_2.pdf"}
+
+
+def test_index_is_committed_in_chunks(temp_db, tmp_path, monkeypatch):
+    import archive_index
+
+    archive = tmp_path / "archiv"
+    index = str(tmp_path / "index.db")
+    for n in range(5):
+        _render(archive / f"Rechnung_{n}.pdf", 1, "2024-01-02", [(10, "Kabel")])
+    stored = []
+    store = archive_index._store
+
+    def counting_store(index_file, touched, files, items):
+        stored.append(len(touched) + len(files))
+        store(index_file, touched, files, items)
+
+    monkeypatch.setattr(archive_index, "COMMIT_EVERY", 2)
+    monkeypatch.setattr(archive_index, "_store", counting_store)
+    assert index_archive(str(archive), index, workers=1)["indexed"] == 5
+    assert stored == [2, 2, 1]
+    assert len(search(index, product="Kabel")) == 5
+
+
+def test_product_search_matches_wildcards_literally(temp_db, tmp_path):
+    archive = tmp_path / "archiv"
+    index = str(tmp_path / "index.db")
+    _render(archive / "Rechnung_1.pdf", 1, "2024-01-02", [(10, "Rabatt 10%")])
+    _render(archive / "Rechnung_2.pdf", 1, "2024-01-03", [(11, "Kabel_rot")])
+    _render(archive / "Rechnung_3.pdf", 1, "2024-01-04", [(12, "Kabelrolle 100 m")])
+    index_archive(str(archive), index, workers=1)
+
+    assert [os.path.basename(r["path"]) for r in search(index, product="%")] == ["Rechnung_1.pdf"]
+    assert [os.path.basename(r["path"]) for r in search(index, product="l_r")] == ["Rechnung_2.pdf"]
+    assert search(index, product="Kabel%m") == []
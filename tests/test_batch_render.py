@@ -0,0 +1,43 @@
+import json
+
+from batch_render import jobs_from_json, render_batch
+from database.invoice_numbers import next_invoice_number
+from pdf.invoice_data import read_invoice_data
+
+
+def test_render_batch_from_json(temp_db, tmp_path):
+    invoices = [
+        {"customer": {"id": 1}, "date": "2024-05-31",
+         "items": [{"product": "Kabel", "quantity": 2, "price": 4.5}]},
+        {"items": [{"product": "Stecker", "quantity": 1, "price": 1.0}],
+         "rabatt": {"mode": "Rabattbetrag (€)", "value": 0.5}, "file_name": "custom.pdf"},
+        {"items": [{"product": "kaputt"}]},
+    ]
+    defs = tmp_path / "invoices.json"
+    defs.write_text(json.dumps(invoices), encoding="utf-8")
+    out = tmp_path / "out"
+    out.mkdir()
+
+    rendered, failures, _ = render_batch(jobs_from_json([str(defs)], str(out)), workers=2, db_file=temp_db)
+
+    assert rendered == 2
+    assert [path.endswith("Rechnung_00003.pdf") for path, _ in failures] == [True]
+    assert sorted(p.name for p in out.iterdir()) == ["Rechnung_00001.pdf", "custom.pdf"]
+    assert (out / "custom.pdf").read_bytes().startswith(b"%PDF")
+
+
+def test_json_invoices_take_no_numbers_from_the_counters(temp_db, tmp_path):
+    invoices = [
+        {"customer": {"id": 1}, "date": "2024-05-31", "items": [{"product": "Kabel", "quantity": 1, "price": 1.0}]},
+        {"customer": {"id": 1}, "date": "2024-05-31", "invoice_number": "X1",
+         "items": [{"product": "Kabel", "quantity": 1, "price": 1.0}]},
+    ]
+    defs = tmp_path / "invoices.json"
+    defs.write_text(json.dumps(invoices), encoding="utf-8")
+    out = tmp_path / "out"
+    out.mkdir()
+
+    assert render_batch(jobs_from_json([str(defs)], str(out)), workers=1, db_file=temp_db)[:2] == (2, [])
+    assert json.loads(read_invoice_data(str(out / "Rechnung_00001.pdf")))["invoice_number"] is None
+    assert json.loads(read_invoice_data(str(out / "Rechnung_00002.pdf")))["invoice_number"] == "X1"
+    assert next_invoice_number("2024-06-01") == "2024-0001"
@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import run_suite  # noqa: E402
+
+
+def _doc(**medians):
+    return {"meta": {}, "results": {name: {"median_ms": ms, "min_ms": ms} for name, ms in medians.items()}}
+
+
+def test_compare_flags_regressions_above_threshold():
+    rows = run_suite.compare(_doc(a=10.0, b=10.0, c=10.0, gone=1.0), _doc(a=10.5, b=12.0, c=5.0, added=1.0), 0.10)
+    assert [(row[0], row[4]) for row in rows] == [
+        ("a", "ok"), ("added", "new"), ("b", "regression"), ("c", "faster"), ("gone", "missing"),
+    ]
+
+
+def test_run_and_compare_exit_codes(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_suite.db, "DB_FILE", run_suite.db.DB_FILE)  # run() points it at its temp DB
+    out = tmp_path / "run.json"
+    assert run_suite.main(["run", "--quick", "-k", "calculate", "--min-time", "0", "--out", str(out)]) == 0
+    document = json.loads(out.read_text())
+    assert list(document["results"]) == ["calculate_totals_10k_lines"]
+    assert document["results"]["calculate_totals_10k_lines"]["rounds"] >= 5
+
+    slower = tmp_path / "slower.json"
+    for result in document["results"].values():
+        result["median_ms"] *= 2
+    slower.write_text(json.dumps(document))
+    assert run_suite.main(["compare", str(out), str(out)]) == 0
+    assert run_suite.main(["compare", str(out), str(slower)]) == 1
@@ -0,0 +1,46 @@
+from database.custumer_repository import CustomerRepository
+from database.db import transaction
+
+
+def add(name, **fields):
+    CustomerRepository.add_customer(dict(fields, name=name))
+
+
+def ids(results):
+    return [r["id"] for r in results]
+
+
+def test_prefix_search_over_several_columns(temp_db):
+    add("Müller Bau GmbH", city="Köln", email="info@mueller-bau.de")
+    add("Schmidt & Söhne", contact_name="Anna Müller", city="Berlin")
+    add("Bäckerei Weber", city="Köln", tax_number="DE123456789")
+
+    assert ids(CustomerRepository.search_customers("mül")) == [1, 2]  # name match ranks first
+    assert sorted(ids(CustomerRepository.search_customers("koln"))) == [1, 3]
+    assert ids(CustomerRepository.search_customers("DE1234")) == [3]
+    assert ids(CustomerRepository.search_customers("köln web")) == [3]
+    assert CustomerRepository.search_customers("  ") == []
+
+
+def test_numeric_search_matches_customer_id(temp_db):
+    for i in range(12):
+        add(f"Kunde {i}")
+    assert CustomerRepository.search_customers("12")[0]["id"] == 12
+
+
+def test_index_follows_updates_and_deletes(temp_db):
+    add("Alt GmbH")
+    with transaction() as conn:
+        conn.execute("UPDATE customers SET name = 'Neu GmbH' WHERE id = 1")
+    assert CustomerRepository.search_customers("alt") == []
+    assert ids(CustomerRepository.search_customers("neu")) == [1]
+
+    with transaction() as conn:
+        conn.execute("DELETE FROM customers WHERE id = 1")
+    assert CustomerRepository.search_customers("neu") == []
+
+
+def test_search_limit(temp_db):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO customers (name) VALUES (?)", ((f"Firma {i}",) for i in range(100)))
+    assert len(CustomerRepository.search_customers("firma", limit=7)) == 7
@@ -0,0 +1,83 @@
+import gc
+import sqlite3
+import threading
+
+import pytest
+
+from database.db import close_connections, get_connection, transaction
+
+
+def test_connection_is_pooled_per_thread(temp_db):
+    assert get_connection() is get_connection()
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(get_connection()))
+    t.start()
+    t.join()
+    assert other[0] is not get_connection()
+
+
+def test_connection_uses_wal(temp_db):
+    mode = get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode.lower() == "wal"
+
+
+def test_transaction_commits_and_rolls_back(temp_db):
+    with transaction() as conn:
+        conn.execute("INSERT INTO products (name, price) VALUES ('A', 1.0)")
+
+    with pytest.raises(RuntimeError):
+        with transaction() as conn:
+            conn.execute("INSERT INTO products (name, price) VALUES ('B', 2.0)")
+            raise RuntimeError("boom")
+
+    names = [r[0] for r in get_connection().execute("SELECT name FROM products")]
+    assert names == ["A"]
+
+
+def test_nested_transaction_rolls_back_savepoint_only(temp_db):
+    with transaction() as conn:
+        conn.execute("INSERT INTO products (name, price) VALUES ('outer', 1.0)")
+        with pytest.raises(ValueError):
+            with transaction():
+                conn.execute("INSERT INTO products (name, price) VALUES ('inner', 2.0)")
+                raise ValueError
+
+    names = [r[0] for r in get_connection().execute("SELECT name FROM products")]
+    assert names == ["outer"]
+
+
+def test_connection_is_closed_when_its_thread_ends(temp_db):
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(get_connection()))
+    thread.start()
+    thread.join()
+    gc.collect()
+    with pytest.raises(sqlite3.ProgrammingError):
+        seen[0].execute("SELECT 1")
+
+
+def test_other_threads_reconnect_after_close_connections(temp_db):
+    opened, closed = threading.Event(), threading.Event()
+    results = []
+
+    def worker():
+        get_connection().execute("SELECT 1")
+        opened.set()
+        closed.wait()
+        results.append(get_connection().execute("SELECT 1").fetchone()[0])
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    opened.wait()
+    close_connections()
+    closed.set()
+    thread.join()
+    assert results == [1]
+
+
+def test_closed_connection_is_replaced(temp_db):
+    conn = get_connection()
+    conn.close()
+    assert get_connection() is not conn
+    assert get_connection().execute("SELECT 1").fetchone()[0] == 1
@@ -0,0 +1,74 @@
+import json
+import sqlite3
+
+import pytest
+
+from database import db
+from database.db import get_connection
+from database.invoice_repository import InvoiceRepository
+from models.invoice import Invoice
+from models.invoice_line import InvoiceLine
+from pdf.invoice_renderer import InvoiceRenderer
+from utils import instrumentation
+
+
+@pytest.fixture
+def trace(temp_db, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    instrumentation.configure(str(path))
+    db.close_connections()  # reopened with tracing
+    yield lambda: [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    instrumentation.disable()
+    db.close_connections()
+
+
+def test_disabled_hooks_are_pass_through():
+    conn = sqlite3.connect(":memory:")
+    assert instrumentation.traced_connection(conn) is conn
+    assert instrumentation.span("x") is instrumentation.span("y")
+    assert instrumentation.timed("x")(lambda a, b=1: a + b)(1, b=2) == 3
+
+
+def test_queries_are_traced_with_sql_and_rows(trace):
+    conn = get_connection()
+    conn.executemany("INSERT INTO products (name, price) VALUES (?, ?)", [("A", 1.0), ("B", 2.0), ("C", 3.0)])
+    assert len(conn.execute("SELECT id FROM products WHERE price > ?", (1.5,)).fetchall()) == 2
+    assert conn.execute("SELECT name FROM products WHERE id = 1").fetchone() == ("A",)
+    assert [row for row in conn.execute("SELECT id FROM products")] == [(1,), (2,), (3,)]
+
+    queries = [(e["sql"], e["rows"]) for e in trace() if e["name"] == "db.query"]
+    assert queries == [
+        ("INSERT INTO products (name, price) VALUES (?, ?)", 3),
+        ("SELECT id FROM products WHERE price > ?", 2),
+        ("SELECT name FROM products WHERE id = 1", 1),
+        ("SELECT id FROM products", 3),
+    ]
+
+
+def test_save_and_render_phases(trace, tmp_path):
+    invoice = Invoice(1, "2024-05-31")
+    invoice.add_line(InvoiceLine(None, 2, "4.50", "Kabel"))
+    InvoiceRepository.save_invoice(invoice)
+    InvoiceRenderer().render(str(tmp_path / "x.pdf"), [{"product": "Kabel", "quantity": 2, "price": 4.5}])
+
+    events = trace()
+    names = [e["name"] for e in events if e["name"] != "db.query"]
+    assert names == ["db.save_invoice", "pdf.header", "pdf.table", "pdf.totals", "pdf.footer",
+                     "pdf.embed_data", "pdf.save", "pdf.render"]
+    table = next(e for e in events if e["name"] == "pdf.table")
+    assert (table["lines"], table["pages"]) == (1, 1)
+    assert all(e["ms"] >= 0 for e in events)
+
+
+def test_profile_dumps_a_single_operation(temp_db, tmp_path):
+    trace_file = tmp_path / "trace.jsonl"
+    instrumentation.configure(str(trace_file), profile="pdf.render")
+    try:
+        for name in ("a", "b"):
+            InvoiceRenderer().render(str(tmp_path / f"{name}.pdf"), [{"product": "Kabel", "quantity": 1, "price": 1.0}])
+    finally:
+        instrumentation.disable()
+
+    assert len(list(tmp_path.glob("pdf.render-*.prof"))) == 1
+    renders = [json.loads(line) for line in trace_file.read_text().splitlines() if '"pdf.render"' in line]
+    assert "profile" in renders[0] and "profile" not in renders[1]
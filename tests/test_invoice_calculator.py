@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from models.invoice import Invoice
+from models.invoice_calculator import RABATT_AMOUNT, RABATT_TARGET, calculate_totals
+from models.invoice_line import InvoiceLine
+
+
+def test_totals_are_exact_to_the_cent():
+    # 0.1 + 0.2 style float drift must not show up in the totals
+    lines = [InvoiceLine(None, 1, 0.1), InvoiceLine(None, 1, 0.2), InvoiceLine(None, 3, 19.99)]
+    totals = calculate_totals(lines)
+    assert totals.net == Decimal("60.27")
+    assert totals.tax == Decimal("11.45")  # 11.4513 rounded half up
+    assert totals.gross == Decimal("71.72")
+
+
+def test_tax_is_computed_per_rate():
+    lines = [InvoiceLine(1, 2, "10.00", tax_rate=0.19), InvoiceLine(2, 1, "10.00", tax_rate=0.07)]
+    totals = calculate_totals(lines)
+    assert totals.by_rate[Decimal("0.19")] == (2000, 380)
+    assert totals.by_rate[Decimal("0.07")] == (1000, 70)
+    assert totals.tax == Decimal("4.50")
+    assert totals.tax_label() == "MwSt"
+
+
+def test_fixed_discount_is_capped_at_subtotal():
+    lines = [InvoiceLine(None, 1, 10)]
+    assert calculate_totals(lines, RABATT_AMOUNT, 2.5).net == Decimal("7.50")
+    capped = calculate_totals(lines, RABATT_AMOUNT, 50)
+    assert capped.discount == Decimal("10.00")
+    assert capped.gross == 0
+
+
+def test_target_amount_discount_hits_gross():
+    lines = [InvoiceLine(None, 4, 25)]
+    totals = calculate_totals(lines, RABATT_TARGET, 100)
+    assert totals.net == Decimal("84.03")
+    assert totals.gross == Decimal("100.00")
+
+
+def test_discount_split_over_rates_keeps_cents():
+    lines = [InvoiceLine(None, 1, "3.33", tax_rate=0.19), InvoiceLine(None, 1, "3.33", tax_rate=0.07)]
+    totals = calculate_totals(lines, RABATT_AMOUNT, "0.01")
+    assert totals.discount_cents == 1
+    assert sum(net for net, _ in totals.by_rate.values()) == 665
+
+
+def test_invoice_model_uses_engine():
+    invoice = Invoice(customer_id=1, date="2024-05-31")
+    invoice.add_line(InvoiceLine(1, 2, 9.99))
+    invoice.set_rabatt(RABATT_AMOUNT, 1)
+    totals = invoice.calculate()
+    assert totals.net == Decimal("18.98")
+    assert invoice.total == 22.59
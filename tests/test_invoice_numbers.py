@@ -0,0 +1,141 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from database import db
+from database.db import get_connection, transaction
+from database.invoice_numbers import next_invoice_number, reserve_numbers, set_number_format
+from database.invoice_repository import InvoiceRepository
+from database.migrations import migrate
+from models.invoice import Invoice
+from models.invoice_line import InvoiceLine
+
+
+def test_yearly_numbers_restart_each_year(temp_db):
+    assert [next_invoice_number("2024-03-01") for _ in range(3)] == ["2024-0001", "2024-0002", "2024-0003"]
+    assert next_invoice_number("2025-01-02") == "2025-0001"
+    assert next_invoice_number("2024-12-31") == "2024-0004"
+
+
+def test_prefix_format_counts_continuously(temp_db):
+    set_number_format("RE{number:06d}")
+    assert next_invoice_number("2024-12-31") == "RE000001"
+    assert next_invoice_number("2025-01-01") == "RE000002"
+    with pytest.raises(ValueError):
+        set_number_format("RE-{year}")
+
+
+def test_format_that_reissues_saved_numbers_is_rejected(temp_db):
+    for day in ("2024-05-02", "2024-05-03", "2025-01-02"):
+        invoice = Invoice(1, day)
+        invoice.add_line(InvoiceLine(None, 1, "1.00", "Artikel"))
+        InvoiceRepository.save_invoice(invoice)
+
+    # the continuous counter starts at 1 and would hand out 2024-0001 again
+    with pytest.raises(ValueError, match="2024-0001"):
+        set_number_format("2024-{number:04d}")
+    # yearly counters are already past the saved numbers
+    set_number_format("{year}-{number:05d}")
+    set_number_format("RE{number:06d}")
+    invoice = Invoice(1, "2025-01-03")
+    invoice.add_line(InvoiceLine(None, 1, "1.00", "Artikel"))
+    InvoiceRepository.save_invoice(invoice)
+    assert invoice.number == "RE000001"
+    # renders RE000001 only for a number the counter has already passed
+    set_number_format("RE0000{number:02d}")
+    assert next_invoice_number("2025-01-04") == "RE000002"
+
+
+def test_reserve_block(temp_db):
+    next_invoice_number("2024-01-01")
+    block = reserve_numbers(3, "2024-06-01")
+    assert (block.first, block.last, len(block)) == (2, 4, 3)
+    assert list(block) == ["2024-0002", "2024-0003", "2024-0004"]
+    assert next_invoice_number("2024-06-02") == "2024-0005"
+
+
+def test_failed_save_gives_the_number_back(temp_db):
+    invoice = Invoice(1, "2024-05-31")
+    invoice.add_line(InvoiceLine(None, 1, "1.00", "Artikel"))
+    with pytest.raises(RuntimeError):
+        with transaction():
+            InvoiceRepository.save_invoice(invoice)
+            raise RuntimeError("PDF konnte nicht geschrieben werden")
+
+    invoice.number = None
+    InvoiceRepository.save_invoice(invoice)
+    assert InvoiceRepository.load_invoice(invoice.id).number == "2024-0001"
+
+
+def _reserve_many(db_file):
+    db.DB_FILE = db_file
+    numbers = []
+    for _ in range(20):
+        numbers.extend(reserve_numbers(5, "2024-01-01"))
+    db.close_connections()
+    return numbers
+
+
+def test_concurrent_processes_never_share_numbers(temp_db):
+    db.close_connections()
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(_reserve_many, [temp_db] * 4))
+
+    numbers = [n for result in results for n in result]
+    assert len(numbers) == len(set(numbers)) == 400
+    assert sorted(numbers) == [f"2024-{i:04d}" for i in range(1, 401)]
+
+
+def test_migration_numbers_existing_invoices(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "old.db"))
+    migrate(target=6)
+    with transaction() as conn:
+        conn.executemany("INSERT INTO invoices (customer_id, date, total) VALUES (1, ?, 0)",
+                         [("2024-02-01",), ("2023-12-01",), ("2024-01-15",)])
+    migrate()
+
+    numbers = get_connection().execute("SELECT invoice_number FROM invoices ORDER BY id").fetchall()
+    assert numbers == [("2024-0002",), ("2023-0001",), ("2024-0001",)]
+    assert next_invoice_number("2024-03-01") == "2024-0003"
+    db.close_connections()
+
+
+def test_save_takes_the_write_lock_up_front(temp_db):
+    statements = []
+    get_connection().set_trace_callback(lambda sql: statements.append(" ".join(sql.split())[:30]))
+    invoice = Invoice(1, "2024-05-31")
+    invoice.lines = [InvoiceLine(None, 1, "1.00", "Kabel")]
+    InvoiceRepository.save_invoice(invoice)
+    get_connection().set_trace_callback(None)
+
+    begins = [i for i, sql in enumerate(statements) if sql.startswith("BEGIN")]
+    assert [statements[i] for i in begins] == ["BEGIN IMMEDIATE", "BEGIN IMMEDIATE"]
+    # The rollups are refreshed in their own transaction, after the invoice is committed
+    assert "DELETE FROM rollup_pending" in statements[begins[1]:]
+    assert "DELETE FROM rollup_pending" not in statements[:begins[1]]
+
+
+def test_pdf_from_another_database_is_not_reopened_from_this_one(qapp, temp_db, tmp_path, monkeypatch):
+    from PySide6.QtWidgets import QFileDialog
+    from gui.invoice_table import InvoiceTable
+    from models.invoice import InvoiceSnapshot
+    from pdf.invoice_generator import InvoiceGenerator
+
+    path = str(tmp_path / "Rechnung.pdf")
+    generator = InvoiceGenerator()
+    invoice_id = generator.write_invoice(
+        InvoiceSnapshot([InvoiceLine(None, 2, "3.00", "Kabel")], {"id": 1}, None, 0.0, "2024-05-31"), path)
+    monkeypatch.setattr(QFileDialog, "getOpenFileName", lambda *args: (path, ""))
+    table = InvoiceTable()
+
+    # Same id and date, other number and content: a different invoice
+    with transaction() as conn:
+        conn.execute("UPDATE invoices SET invoice_number = '2024-0099' WHERE id = ?", (invoice_id,))
+        conn.execute("UPDATE invoice_lines SET name = 'Stecker' WHERE invoice_id = ?", (invoice_id,))
+    generator.load_invoice(table)
+    assert [line.name for line in table.get_lines()] == ["Kabel"]
+
+    with transaction() as conn:
+        conn.execute("UPDATE invoices SET invoice_number = '2024-0001' WHERE id = ?", (invoice_id,))
+    generator.load_invoice(table)
+    assert [line.name for line in table.get_lines()] == ["Stecker"]
@@ -0,0 +1,181 @@
+import json
+import re
+import zlib
+
+from pdf.invoice_data import read_invoice_data
+from pdf.invoice_renderer import InvoiceRenderer
+
+
+def _items(count):
+    return [{"product": f"Produkt {i}", "quantity": 1, "price": 1.0} for i in range(count)]
+
+
+def test_short_invoices_draw_their_chrome_inline(temp_db, tmp_path):
+    for count in (1, 20):  # one and two pages
+        InvoiceRenderer().render(str(tmp_path / "forms.pdf"), _items(count))
+        InvoiceRenderer(use_forms=False).render(str(tmp_path / "inline.pdf"), _items(count))
+
+        assert b"/Subtype /Form" not in (tmp_path / "forms.pdf").read_bytes()
+        assert (tmp_path / "forms.pdf").stat().st_size == (tmp_path / "inline.pdf").stat().st_size
+
+
+def test_long_invoice_draws_its_footer_as_a_form(temp_db, tmp_path):
+    InvoiceRenderer().render(str(tmp_path / "forms.pdf"), _items(200))
+    InvoiceRenderer(use_forms=False).render(str(tmp_path / "inline.pdf"), _items(200))
+
+    assert (tmp_path / "forms.pdf").read_bytes().count(b"/Subtype /Form") == 1
+    assert b"/Subtype /Form" not in (tmp_path / "inline.pdf").read_bytes()
+    assert (tmp_path / "forms.pdf").stat().st_size < (tmp_path / "inline.pdf").stat().st_size
+
+
+def _payload(path):
+    return json.loads(read_invoice_data(str(path)))
+
+
+def test_long_invoice_is_paginated_from_a_generator(temp_db, tmp_path):
+    items = ({"product": f"Produkt {i}", "quantity": 1, "price": 1.0} for i in range(200))
+    path = tmp_path / "long.pdf"
+
+    pages = InvoiceRenderer().render(str(path), items)
+
+    content = path.read_bytes()
+    assert pages > 5
+    assert content.count(b"/Type /Page\n") == pages
+    # the footer form is defined once and reused on every page
+    assert content.count(b"/Subtype /Form") == 1
+    data = _payload(path)
+    assert len(data["items"]) == 200
+    assert data["items"][-1]["product"] == "Produkt 199"
+
+
+def test_short_invoice_stays_on_one_page(temp_db, tmp_path):
+    items = [{"product": "Kabel", "quantity": 2, "price": 4.5}]
+    assert InvoiceRenderer().render(str(tmp_path / "short.pdf"), items) == 1
+    assert _payload(tmp_path / "short.pdf")["items"][0]["sum"] == 9.0
+
+
+def test_invoice_number_goes_into_the_data(temp_db, tmp_path):
+    items = [{"product": "Kabel", "quantity": 1, "price": 2.0}]
+    InvoiceRenderer().render(str(tmp_path / "numbered.pdf"), items, invoice_number="2024-0042")
+    InvoiceRenderer().render(str(tmp_path / "draft.pdf"), items)
+
+    assert _payload(tmp_path / "numbered.pdf")["invoice_number"] == "2024-0042"
+    assert _payload(tmp_path / "draft.pdf")["invoice_number"] is None
+
+
+def test_invoice_data_is_an_embedded_file(temp_db, tmp_path):
+    items = [{"product": "Kabel", "quantity": 2, "price": 4.5}]
+    path = tmp_path / "embedded.pdf"
+    InvoiceRenderer().render(str(path), items, customer={"id": 7}, invoice_date="2024-05-31")
+
+    content = path.read_bytes()
+    assert content.rstrip().endswith(b"%%EOF")
+    assert b"/EmbeddedFiles" in content and b"(invoice.json)" in content
+    data = _payload(path)
+    assert data["date"] == "2024-05-31"
+    assert data["customer"] == {"id": 7}
+
+
+def test_legacy_marker_payload_is_still_read(tmp_path):
+    path = tmp_path / "legacy.pdf"
+    path.write_bytes(b"%PDF-1.4\n...\n%%EOF\n\n%%INVOICE_JSON_START%%{\"items\": []}%%INVOICE_JSON_END%%")
+    assert read_invoice_data(str(path)) == b'{"items": []}'
+
+
+def test_pdf_without_invoice_data(tmp_path):
+    path = tmp_path / "other.pdf"
+    path.write_bytes(b"%PDF-1.4\nnothing here\n%%EOF\n")
+    assert read_invoice_data(str(path)) is None
+
+
+def _append_update(content, objects, root):
+    """Incremental update: append objects {number: body} with their own xref section and /Prev."""
+    prev = int(content[content.rindex(b"startxref") + 9:].split()[0])
+    size = max(int(n) for n in re.findall(rb"/Size (\d+)", content))
+    out = bytearray(content)
+    offsets = {}
+    for number, body in sorted(objects.items()):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 1\n0000000000 65535 f \n"
+    for number, offset in sorted(offsets.items()):
+        out += b"%d 1\n%010d 00000 n \n" % (number, offset)
+    size = max(size, max(offsets) + 1)
+    out += b"trailer\n<< /Size %d /Root %d 0 R /Prev %d >>\nstartxref\n%d\n%%%%EOF\n" % (size, root, prev, xref)
+    return bytes(out)
+
+
+def test_incrementally_updated_pdf_returns_the_latest_data(temp_db, tmp_path):
+    path = tmp_path / "updated.pdf"
+    InvoiceRenderer().render(str(path), [{"product": "Kabel", "quantity": 1, "price": 2.0}])
+    content = path.read_bytes()
+    root = int(re.search(rb"/Root (\d+) 0 R", content).group(1))
+    catalog = re.search(rb"%d 0 obj\n(.*?)endobj" % root, content, re.S).group(1).strip()
+
+    # Another program replaces the data, keeping the name tree in an object of its own
+    payload = b'{"items": [], "invoice_number": "2024-0099"}'
+    path.write_bytes(_append_update(content, {
+        root: re.sub(rb"/Names \d+ 0 R", b"/Names 50 0 R", catalog),
+        50: b"<< /EmbeddedFiles 51 0 R >>",
+        51: b"<< /Names [ (invoice.json) 52 0 R ] >>",
+        52: b"<< /Type /Filespec /F (invoice.json) /EF << /F 53 0 R >> >>",
+        53: b"<< /Type /EmbeddedFile /Length %d >>\nstream\n%s\nendstream" % (len(payload), payload),
+    }, root))
+    assert _payload(path)["invoice_number"] == "2024-0099"
+
+    # An update that leaves the data alone still finds the original
+    InvoiceRenderer().render(str(path), [{"product": "Kabel", "quantity": 1, "price": 2.0}], invoice_number="7")
+    content = path.read_bytes()
+    path.write_bytes(_append_update(content, {60: b"<< /Title (Rechnung) >>"}, root))
+    assert _payload(path)["invoice_number"] == "7"
+
+
+def test_pdf_with_an_xref_stream_and_object_streams(tmp_path):
+    payload = b'{"items": [], "invoice_number": "2024-0001"}'
+    packed = [b"<< /Type /Catalog /Names 2 0 R >>", b"<< /EmbeddedFiles << /Names [ (invoice.json) 3 0 R ] >> >>",
+              b"<< /Type /Filespec /F (invoice.json) /EF << /F 4 0 R >> >>"]
+    bodies, header, offset = b"", b"", 0
+    for number, body in enumerate(packed, 1):
+        header += b"%d %d " % (number, offset)
+        bodies += body + b" "
+        offset += len(body) + 1
+    objstm = zlib.compress(header + bodies)
+
+    out = bytearray(b"%PDF-1.5\n")
+    out += b"4 0 obj\n<< /Type /EmbeddedFile /Length %d >>\nstream\n%s\nendstream\nendobj\n" % (len(payload), payload)
+    out += b"5 0 obj\n<< /Type /ObjStm /N 3 /First %d /Filter /FlateDecode /Length %d >>\nstream\n" % (
+        len(header), len(objstm))
+    out += objstm + b"\nendstream\nendobj\n"
+    xref = len(out)
+    out += b"6 0 obj\n<< /Type /XRef /Size 7 /Root 1 0 R /W [1 4 2] /Length 0 >>\nstream\n\nendstream\nendobj\n"
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+    path = tmp_path / "xref_stream.pdf"
+    path.write_bytes(bytes(out))
+    assert _payload(path)["invoice_number"] == "2024-0001"
+
+
+def test_legacy_payload_survives_a_later_save(tmp_path):
+    path = tmp_path / "legacy_resaved.pdf"
+    path.write_bytes(b"%PDF-1.4\n...\n%%EOF\n\n%%INVOICE_JSON_START%%{\"items\": []}%%INVOICE_JSON_END%%"
+                     + b"\n" + b"x" * 2000 + b"\n%%EOF\n")
+    assert read_invoice_data(str(path)) == b'{"items": []}'
+
+
+def test_memory_per_line_is_bounded(temp_db, tmp_path):
+    import tracemalloc
+
+    def peak(count):
+        items = ({"product": f"Produkt {i}", "quantity": 1, "price": 1.25} for i in range(count))
+        tracemalloc.start()
+        try:
+            InvoiceRenderer().render(str(tmp_path / "memory.pdf"), items)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    peak(10)  # warm-up: fonts and module caches
+    small, large = peak(100), peak(1000)
+    # Page streams and the embedded JSON are kept until save(): about 1 KB per line, no more
+    # (benchmarks/bench_pdf_memory.py compares 1k and 20k lines)
+    assert (large - small) / 900 < 2048
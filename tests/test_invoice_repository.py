@@ -0,0 +1,70 @@
+import pytest
+
+from database import db
+from database.db import get_connection, transaction
+from database.invoice_repository import InvoiceRepository
+from database.migrations import migrate
+from models.invoice import Invoice
+from models.invoice_calculator import RABATT_AMOUNT
+from models.invoice_line import InvoiceLine
+
+
+def _invoice(customer_id=1, invoice_date="2024-05-31"):
+    invoice = Invoice(customer_id, invoice_date)
+    invoice.add_line(InvoiceLine(10, 2, "4.50", "Kabel"))
+    invoice.add_line(InvoiceLine(None, 1, "10.00", "Montage", "0.07"))
+    invoice.set_rabatt(RABATT_AMOUNT, 1.0)
+    return invoice
+
+
+def test_save_and_load_round_trip(temp_db):
+    invoice_id = InvoiceRepository.save_invoice(_invoice(), "/tmp/Rechnung.pdf")
+
+    row = get_connection().execute(
+        "SELECT customer_id, date, net, tax, total, discount, file_path FROM invoices WHERE id = ?", (invoice_id,)
+    ).fetchone()
+    assert row[:2] == (1, "2024-05-31")
+    assert row[2:6] == (18.0, pytest.approx(2.28), pytest.approx(20.28), 1.0)
+    assert row[6] == "/tmp/Rechnung.pdf"
+
+    loaded = InvoiceRepository.load_invoice(invoice_id)
+    assert [(l.product_id, l.name, l.quantity, l.price_cents, str(l.tax_rate)) for l in loaded.lines] == [
+        (10, "Kabel", 2, 450, "0.19"),
+        (None, "Montage", 1, 1000, "0.07"),
+    ]
+    assert (loaded.rabatt_mode, loaded.rabatt_value) == (RABATT_AMOUNT, 1.0)
+    assert loaded.calculate().gross_cents == 2028
+    assert InvoiceRepository.load_invoice(invoice_id + 1) is None
+
+
+def test_header_and_lines_are_written_atomically(temp_db):
+    with pytest.raises(RuntimeError):
+        with transaction():
+            InvoiceRepository.save_invoice(_invoice())
+            raise RuntimeError("PDF konnte nicht geschrieben werden")
+
+    assert get_connection().execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 0
+    assert get_connection().execute("SELECT COUNT(*) FROM invoice_lines").fetchone()[0] == 0
+
+
+def test_invoice_history_filters(temp_db):
+    for customer_id, invoice_date in [(1, "2024-01-10"), (2, "2024-02-10"), (1, "2024-03-10")]:
+        InvoiceRepository.save_invoice(_invoice(customer_id, invoice_date))
+
+    assert [i["date"] for i in InvoiceRepository.get_invoices(customer_id=1)] == ["2024-03-10", "2024-01-10"]
+    assert [i["date"] for i in InvoiceRepository.get_invoices(date_from="2024-02-01", date_to="2024-02-28")] == ["2024-02-10"]
+    assert len(InvoiceRepository.get_invoices(limit=2)) == 2
+
+
+def test_migration_keeps_existing_invoice_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "old.db"))
+    migrate(target=4)
+    with transaction() as conn:
+        conn.execute("INSERT INTO products (id, name, price, tax_rate) VALUES (5, 'Kabel', 4.5, 0.07)")
+        conn.execute("INSERT INTO invoices (id, customer_id, date, total) VALUES (1, 1, '2023-01-01', 9.63)")
+        conn.execute("INSERT INTO invoice_lines (invoice_id, product_id, quantity, price) VALUES (1, 5, 2, 4.5)")
+    migrate()
+
+    loaded = InvoiceRepository.load_invoice(1)
+    assert [(l.product_id, l.name, l.quantity, str(l.tax_rate)) for l in loaded.lines] == [(5, "Kabel", 2, "0.07")]
+    db.close_connections()
@@ -0,0 +1,215 @@
+from gui.invoice_table import COL_PRICE, COL_QUANTITY, InvoiceTableModel
+from models.invoice_calculator import calculate_totals
+from models.invoice_line import InvoiceLine
+
+
+def make_model(count):
+    model = InvoiceTableModel()
+    for i in range(count):
+        model.add_line(InvoiceLine(i, 1, 1.5, f"Artikel {i}"))
+    return model
+
+
+def test_duplicate_product_raises_quantity():
+    model = make_model(3)
+    row = model.add_line(InvoiceLine(1, 2, 1.5, "ARTIKEL 1"))
+    assert row == 1
+    assert model.rowCount() == 3
+    assert model.line(1).quantity == 3
+
+
+def test_name_index_follows_removals():
+    model = make_model(5)
+    model.remove_row(1)
+    assert model.find_row("Artikel 1") == -1
+    assert [model.find_row(f"Artikel {i}") for i in (0, 2, 3, 4)] == [0, 1, 2, 3]
+
+
+def test_set_lines_merges_duplicates_with_one_reset():
+    model = make_model(3)
+    events = []
+    model.modelReset.connect(lambda: events.append("reset"))
+    model.rowsInserted.connect(lambda *args: events.append("insert"))
+    model.totals_changed.connect(lambda: events.append("totals"))
+
+    model.set_lines([InvoiceLine(1, 2, 1.5, "Kabel"), InvoiceLine(2, 1, 4.0, "Dose", tax_rate=0.07),
+                     InvoiceLine(1, 3, 9.99, "KABEL")])
+    assert events == ["reset", "totals"]
+    assert [(line.name, line.quantity) for line in model.lines()] == [("Kabel", 5), ("Dose", 1)]
+    assert model.find_row("dose") == 1 and model.find_row("Artikel 0") == -1
+    assert model.totals().net_cents == 5 * 150 + 400
+
+
+def test_lines_are_identified_by_product_id():
+    model = InvoiceTableModel()
+    model.add_line(InvoiceLine(None, 1, 2.0, "Kabel"))      # old invoice line without product
+    model.add_line(InvoiceLine(7, 2, 2.0, "kabel"))         # takes the line over
+    model.add_line(InvoiceLine(8, 1, 3.0, "Kabel"))         # renamed product, same name: own line
+    model.add_line(InvoiceLine(7, 1, 2.0, "Kabel (neu)"))   # renamed product 7: still its line
+
+    assert [(line.product_id, line.quantity) for line in model.lines()] == [(7, 4), (8, 1)]
+    assert (model.find_product_row(7), model.find_product_row(8), model.find_product_row(9)) == (0, 1, -1)
+    model.remove_row(0)
+    assert (model.find_product_row(7), model.find_product_row(8), model.find_row("kabel")) == (-1, 0, 0)
+
+
+def test_deleting_from_the_middle_of_a_large_invoice():
+    import random
+
+    model = InvoiceTableModel()
+    rng = random.Random(7)
+    model.set_lines(InvoiceLine(i, rng.randint(1, 9), rng.randint(1, 99_999) / 100, f"Artikel {i}",
+                                tax_rate=rng.choice((0.19, 0.07))) for i in range(10_000))
+    keys = {model.line(row).product_id: model.line_key(row) for row in range(model.rowCount())}
+
+    for _ in range(3000):
+        middle = model.rowCount() // 2
+        model.remove_row(rng.randint(middle - 500, middle + 500))
+        if rng.random() < 0.3:
+            row = rng.randrange(model.rowCount())
+            model.set_quantity(row, model.line(row).quantity + 1)
+    model.remove_key(model.line_key(0))
+    model.add_line(InvoiceLine(10_000, 2, "1.99", "Nachzügler"))
+
+    lines = model.lines()
+    assert len(lines) == 10_000 - 3000 - 1 + 1
+    for row, line in enumerate(lines):
+        assert model.find_product_row(line.product_id) == row
+        assert model.find_row(line.name) == row
+        if line.product_id in keys:
+            assert model.row_of(keys[line.product_id]) == row
+    assert model.find_product_row(0) == -1 and model.row_of(keys[0]) == -1
+
+    expected = calculate_totals(lines)
+    totals = model.totals()
+    assert (totals.net_cents, totals.tax_cents, totals.gross_cents) == \
+        (expected.net_cents, expected.tax_cents, expected.gross_cents)
+
+
+def test_key_lookup_is_a_binary_search():
+    class CountingList(list):
+        reads = 0
+
+        def __getitem__(self, index):
+            CountingList.reads += 1
+            return super().__getitem__(index)
+
+    model = make_model(10_000)
+    keys = [model.line_key(row) for row in range(0, 10_000, 3)]
+    for row in range(0, 10_000, 3):
+        model.remove_row(row - row // 3)
+    model._keys = CountingList(model._keys)
+
+    for key in keys:
+        assert model.row_of(key) == -1
+    assert model.row_of(model.line_key(1000)) == 1000
+    assert CountingList.reads <= (len(keys) + 1) * 16  # ~log2(6666) reads per lookup, not a scan
+
+
+def test_edits_through_set_data():
+    model = make_model(1)
+    changes = []
+    model.totals_changed.connect(lambda: changes.append(True))
+
+    assert model.setData(model.index(0, COL_QUANTITY), 4)
+    assert model.setData(model.index(0, COL_PRICE), 2.25)
+    assert model.line(0).net_cents == 900
+    assert model.data(model.index(0, 3)) == "9.00"
+    assert len(changes) == 2
+
+
+def test_running_totals_match_full_recalculation():
+    model = make_model(50)
+    model.set_quantity(3, 7)
+    model.set_price(10, "4.99")
+    model.remove_row(20)
+    model.add_line(InvoiceLine(99, 2, 3.0, "Reduziert", tax_rate=0.07))
+
+    expected = calculate_totals(model.lines())
+    totals = model.totals()
+    assert (totals.net_cents, totals.tax_cents, totals.gross_cents) == \
+        (expected.net_cents, expected.tax_cents, expected.gross_cents)
+
+
+def test_editing_one_row_does_not_walk_all_rows(monkeypatch):
+    model = make_model(10_000)
+
+    # A full pass over the lines would go through calculate_totals or lines()
+    def forbidden(*args, **kwargs):
+        raise AssertionError("totals recomputed from all lines")
+    monkeypatch.setattr("models.invoice_calculator.calculate_totals", forbidden)
+    monkeypatch.setattr(InvoiceTableModel, "lines", forbidden)
+
+    for i in range(2000):
+        model.set_quantity(i % 10, 2 + i % 5)
+        totals = model.totals()
+    monkeypatch.undo()
+
+    expected = calculate_totals(model.lines())
+    assert (totals.net_cents, totals.tax_cents) == (expected.net_cents, expected.tax_cents)
+
+
+def test_label_updates_are_coalesced(qapp):
+    from PySide6.QtWidgets import QLabel, QWidget
+    from gui.invoice_table import InvoiceTable
+
+    window = QWidget()
+    window.sum_netto_label = QLabel()
+    window.sum_tax_label = QLabel()
+    window.sum_brutto_label = QLabel()
+    table = InvoiceTable()
+    table.parent_window = window
+
+    updates = []
+    original = table.update_totals
+    table.update_totals = lambda: (updates.append(1), original())
+    table.invoice_model.totals_changed.disconnect()
+    table.invoice_model.totals_changed.connect(table.schedule_totals_update)
+
+    for i in range(100):
+        table.add_product(f"Artikel {i}", 1.0)
+    assert updates == []
+
+    qapp.processEvents()
+    assert updates == [1]
+    assert window.sum_netto_label.text() == "Zwischensumme (Netto): 100.00 €"
+
+
+def test_widest_name_follows_inserts_and_removals(qapp):
+    from gui.invoice_table import InvoiceTable
+
+    table = InvoiceTable()
+    table.add_product("Kabel", 1.0)
+    table.add_product("Unterputz-Steckdose mit Klappdeckel", 1.0)
+    table.add_product("Kabel", 1.0)  # same line, no new width
+    assert table._widest == table.calculate_text_width("Unterputz-Steckdose mit Klappdeckel")
+
+    table.delete_row(1)
+    assert table._widest == table.calculate_text_width("Kabel")
+    table.clear_lines()
+    assert table._widest == 0
+
+
+def test_resize_burst_does_not_measure_names(qapp, monkeypatch):
+    from PySide6.QtTest import QTest
+    from gui.invoice_table import InvoiceTable
+
+    table = InvoiceTable()
+    for i in range(10_000):
+        table.add_product(f"Artikel mit langem Namen {i}", 1.0)
+    table.show()
+    QTest.qWait(table.RESIZE_DEBOUNCE_MS * 3)
+
+    measured = []
+    monkeypatch.setattr(table, "calculate_text_width", lambda text: measured.append(text) or 0)
+    for width in range(800, 1200, 10):
+        table.resize(width, 400)
+        qapp.processEvents()
+    assert table._resize_timer.isActive()
+    assert table.columnWidth(0) <= 250
+
+    QTest.qWait(table.RESIZE_DEBOUNCE_MS * 3)
+    assert not table._resize_timer.isActive()
+    assert table.columnWidth(0) == min(table._widest, table._product_max_width)
+    assert measured == []
+    table.close()
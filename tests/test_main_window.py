@@ -0,0 +1,55 @@
+import pytest
+from PySide6.QtCore import QEventLoop, Qt, QTimer
+from PySide6.QtTest import QTest
+
+from database.db import transaction
+from gui.main_window import MainWindow
+
+
+@pytest.fixture
+def window(qapp, temp_db):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO customers (name, city) VALUES (?, ?)",
+                         [("Beta GmbH", "Köln"), ("Alpha AG", "Berlin"), ("Gamma KG", "Bonn")])
+    window = MainWindow()
+    loop = QEventLoop()
+    window.ready.connect(loop.quit)
+    QTimer.singleShot(5000, loop.quit)
+    window.show()
+    loop.exec()
+    yield window
+    window.close()
+
+
+def test_choosing_a_completion_selects_the_customer(qapp, window):
+    completer = window.customer_completer
+    window.customer_combo.setFocus()
+    completer.update_matches("Alpha")
+    completer.complete()
+    completer.popup().setCurrentIndex(completer.completionModel().index(0, 0))
+    QTest.keyClick(completer.popup(), Qt.Key_Return)
+    qapp.processEvents()
+
+    assert window.selected_customer["id"] == 2
+    assert window.customer_combo.currentText() == "2 – Alpha AG"
+
+
+def test_sort_radio_buttons_resort_the_customers(qapp, window):
+    def names():
+        return [window.customer_combo.itemData(i)["name"] for i in range(window.customer_combo.count())]
+
+    assert names() == ["Alpha AG", "Beta GmbH", "Gamma KG"]
+    window.sort_by_id.setChecked(True)
+    assert names() == ["Beta GmbH", "Alpha AG", "Gamma KG"]
+    window.sort_by_name.setChecked(True)
+    assert names() == ["Alpha AG", "Beta GmbH", "Gamma KG"]
+
+
+def test_add_button_adds_the_product(qapp, window):
+    window.name_input.setText("Kabel")
+    window.price_input.setText("2.50")
+    window.add_button.click()
+
+    assert window.name_input.text() == ""
+    window.product_model.fetchMore()  # reloaded lazily
+    assert window.product_model.product_at(0)[1:3] == ("Kabel", 2.5)
@@ -0,0 +1,144 @@
+import sqlite3
+
+import pytest
+
+from database.db import get_connection, transaction
+from database.migrations import MIGRATIONS, current_version, migrate
+
+
+def query_plan(sql, params=()):
+    rows = get_connection().execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_migrations_are_recorded_and_idempotent(temp_db):
+    latest = MIGRATIONS[-1][0]
+    assert current_version() == latest
+    assert migrate() == latest
+    versions = [r[0] for r in get_connection().execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [m[0] for m in MIGRATIONS]
+
+
+def test_unique_product_names_removes_existing_duplicates(tmp_path, monkeypatch):
+    from database import db
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "old.db"))
+    migrate(target=1)
+    with transaction() as conn:
+        conn.executemany("INSERT INTO products (name, price) VALUES (?, ?)",
+                         [("Kabel", 1.0), ("KABEL", 2.0), ("Stecker", 3.0)])
+    migrate()
+
+    rows = get_connection().execute("SELECT name, price FROM products ORDER BY id").fetchall()
+    assert rows == [("Kabel", 1.0), ("Stecker", 3.0)]
+    with pytest.raises(sqlite3.IntegrityError):
+        with transaction() as conn:
+            conn.execute("INSERT INTO products (name, price) VALUES ('kabel', 5.0)")
+    db.close_connections()
+
+
+def test_product_lookup_uses_nocase_index(temp_db):
+    plan = query_plan("SELECT COUNT(*) FROM products WHERE name = ? COLLATE NOCASE", ("x",))
+    assert "idx_products_name_nocase" in plan
+
+
+def test_customer_combo_order_uses_index(temp_db):
+    plan = query_plan("SELECT id, name FROM customers ORDER BY name COLLATE NOCASE ASC")
+    assert "idx_customers_name_nocase" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_invoice_history_uses_customer_date_index(temp_db):
+    plan = query_plan("SELECT id FROM invoices WHERE customer_id = ? AND date >= ? ORDER BY date", (1, "2024-01-01"))
+    assert "idx_invoices_customer_date" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_invoice_lines_lookup_uses_index(temp_db):
+    plan = query_plan("SELECT * FROM invoice_lines WHERE invoice_id = ?", (1,))
+    assert "idx_invoice_lines_invoice" in plan
+
+
+def test_invoice_taxes_backfill_matches_the_calculator(tmp_path, monkeypatch):
+    from database import db
+    from models.invoice_calculator import RABATT_AMOUNT, RABATT_TARGET, calculate_totals
+    from models.invoice_line import InvoiceLine
+
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "old.db"))
+    migrate(target=5)
+    lines = [(3, 19.99, 0.19), (1, 4.05, 0.07), (2, 0.33, 0.19)]
+    discounts = [(None, 0), (RABATT_AMOUNT, 7.5), (RABATT_TARGET, 50.0)]
+    with transaction() as conn:
+        conn.execute("INSERT INTO customers (name) VALUES ('Alpha AG')")
+        for mode, value in discounts:
+            invoice_id = conn.execute(
+                "INSERT INTO invoices (customer_id, date, total, rabatt_mode, rabatt_value) VALUES (1, '2024-03-01', 0, ?, ?)",
+                (mode, value),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO invoice_lines (invoice_id, quantity, price, tax_rate) VALUES (?, ?, ?, ?)",
+                [(invoice_id, *line) for line in lines],
+            )
+    migrate()
+
+    for invoice_id, (mode, value) in enumerate(discounts, start=1):
+        totals = calculate_totals([InvoiceLine(None, q, p, tax_rate=r) for q, p, r in lines], mode, value)
+        rows = get_connection().execute(
+            "SELECT tax_rate, net_cents, tax_cents FROM invoice_taxes WHERE invoice_id = ? ORDER BY tax_rate",
+            (invoice_id,),
+        ).fetchall()
+        assert rows == sorted((float(rate), net, tax) for rate, (net, tax) in totals.by_rate.items())
+    db.close_connections()
+
+
+def test_rollups_are_rebuilt_from_pending_invoices(tmp_path, monkeypatch):
+    from database import db, reporting
+
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "old.db"))
+    migrate(target=7)
+    with transaction() as conn:
+        conn.execute("INSERT INTO customers (name) VALUES ('Alpha AG')")
+        conn.executemany("INSERT INTO invoices (id, customer_id, date, total, net, tax) VALUES (?, 1, ?, 0, ?, 0)",
+                         [(1, "2024-03-01", 10.0), (2, "2024-03-02", 5.0)])
+        # Id 1 committed after the watermark had already moved past it
+        conn.execute("UPDATE rollup_state SET last_invoice_id = 2")
+        conn.execute("INSERT INTO revenue_customer_daily VALUES ('2024-03-02', 1, 1, 500, 0)")
+        conn.execute("INSERT INTO revenue_customer_monthly VALUES ('2024-03', 1, 1, 500, 0)")
+    migrate()
+
+    assert [r["net"] for r in reporting.revenue_by_customer()] == [15]
+    assert reporting.refresh_rollups() == 2
+    assert [r["net"] for r in reporting.revenue_by_customer()] == [15]
+    db.close_connections()
+
+
+def test_search_index_skipped_without_fts5_is_built_later(tmp_path, monkeypatch):
+    from database import db, migrations
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "old.db"))
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "fts5_available", lambda c: False)
+        migrate()
+    with transaction() as conn:
+        conn.execute("INSERT INTO customers (name, city) VALUES ('Müller GmbH', 'Köln')")
+    versions = {r[0] for r in get_connection().execute("SELECT version FROM schema_version")}
+    assert 4 not in versions and MIGRATIONS[-1][0] in versions
+
+    # next start, FTS5 available
+    migrate()
+    assert get_connection().execute("SELECT rowid FROM customers_fts WHERE customers_fts MATCH 'mull*'").fetchall()
+    assert get_connection().execute("SELECT 1 FROM schema_version WHERE version = 4").fetchone()
+    db.close_connections()
+
+
+def test_search_index_recorded_as_skipped_is_retried(tmp_path, monkeypatch):
+    from database import db, migrations
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "old.db"))
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "fts5_available", lambda c: False)
+        migrate(target=8)
+    # as recorded before skipped steps were left out of schema_version
+    with transaction() as conn:
+        conn.execute("INSERT INTO schema_version VALUES (4, 'full-text search index for customers', '2024-01-01')")
+    migrate()
+    assert get_connection().execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='customers_fts'").fetchone()
+    db.close_connections()
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from database.db import get_connection, transaction
+from database.product_import import detect_delimiter, import_products_csv, parse_price
+
+REPO_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "products_and_prices.csv")
+
+
+@pytest.mark.parametrize("text, decimal_comma, expected", [
+    ("19.99", False, 19.99),
+    ("19,99", True, 19.99),
+    ("1.234,56", True, 1234.56),
+    ("1,234.56", False, 1234.56),
+    ("1.234", True, 1234.0),
+    ("12,50 €", True, 12.5),
+])
+def test_parse_price(text, decimal_comma, expected):
+    assert parse_price(text, decimal_comma) == pytest.approx(expected)
+
+
+def test_detect_delimiter():
+    assert detect_delimiter("Name;Preis\n") == ";"
+    assert detect_delimiter('"Salt, Fat",35.99\n') == ","
+
+
+def test_import_shipped_csv(temp_db):
+    result = import_products_csv(REPO_CSV)
+    count = get_connection().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    assert result.added == count > 0
+    assert result.added + result.skipped == result.rows
+
+    again = import_products_csv(REPO_CSV)
+    assert again.added == 0
+    assert again.skipped == again.rows
+
+
+def test_import_german_export_with_upsert(temp_db, tmp_path):
+    with transaction() as conn:
+        conn.execute("INSERT INTO products (name, price) VALUES ('Schraube', 1.0)")
+
+    csv_file = tmp_path / "katalog.csv"
+    csv_file.write_text("Name;Preis\nschraube;1,50\nMutter;0,20\nDübel;1.234,00\nkaputt\n", encoding="utf-8")
+
+    result = import_products_csv(str(csv_file), upsert_prices=True, chunk_size=2)
+    assert (result.added, result.updated, result.skipped) == (2, 1, 2)
+
+    prices = dict(get_connection().execute("SELECT name, price FROM products"))
+    assert prices == {"Schraube": 1.5, "Mutter": 0.2, "Dübel": 1234.0}
+
+
+def test_names_repeated_in_the_file_count_as_duplicates(temp_db, tmp_path):
+    with transaction() as conn:
+        conn.execute("INSERT INTO products (name, price) VALUES ('Schraube', 1.0)")
+
+    csv_file = tmp_path / "katalog.csv"
+    csv_file.write_text("Mutter;0,20\nMUTTER;0,30\nSchraube;1,00\nschraube;2,00\nmutter;0,40\n", encoding="utf-8")
+
+    result = import_products_csv(str(csv_file), upsert_prices=True, chunk_size=2)
+    assert (result.added, result.updated, result.duplicates, result.skipped) == (1, 0, 3, 4)
+
+    prices = dict(get_connection().execute("SELECT name, price FROM products"))
+    assert prices == {"Schraube": 1.0, "Mutter": 0.2}
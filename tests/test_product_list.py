@@ -0,0 +1,52 @@
+from database.db import get_connection, transaction
+from gui.product_list import ProductListModel
+
+
+def seed_products(count):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO products (name, price) VALUES (?, ?)",
+                         ((f"Produkt {i}", float(i)) for i in range(count)))
+
+
+def test_model_fetches_lazily_in_batches(temp_db):
+    seed_products(ProductListModel.BATCH_SIZE * 2 + 5)
+    model = ProductListModel()
+    assert model.rowCount() == 0
+
+    model.fetchMore()
+    assert model.rowCount() == ProductListModel.BATCH_SIZE
+    assert model.product_at(0)[1] == f"Produkt {ProductListModel.BATCH_SIZE * 2 + 4}"  # newest first
+
+    while model.canFetchMore():
+        model.fetchMore()
+    assert model.rowCount() == ProductListModel.BATCH_SIZE * 2 + 5
+    assert len({model.product_at(r)[0] for r in range(model.rowCount())}) == model.rowCount()
+
+
+def test_price_edit_emits_signal(temp_db):
+    seed_products(3)
+    model = ProductListModel()
+    model.fetchMore()
+    changes = []
+    model.price_changed.connect(lambda product_id, price: changes.append((product_id, price)))
+
+    index = model.index(0)
+    assert model.setData(index, "3,75")
+    assert not model.setData(index, "abc")
+    assert changes == [(3, 3.75)]
+    assert model.data(index, ProductListModel.PriceRole) == 3.75
+    assert get_connection().execute("SELECT COUNT(*) FROM products").fetchone()[0] == 3
+
+
+def test_product_of_reads_through_a_proxy(qapp, temp_db):
+    from PySide6.QtCore import QSortFilterProxyModel
+
+    seed_products(5)
+    model = ProductListModel()
+    model.fetchMore()
+    proxy = QSortFilterProxyModel()
+    proxy.setSourceModel(model)
+    proxy.setFilterFixedString("Produkt 1")
+
+    assert proxy.rowCount() == 1
+    assert ProductListModel.product_of(proxy.index(0, 0)) == (2, "Produkt 1", 1.0, 0.19)
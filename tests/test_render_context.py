@@ -0,0 +1,88 @@
+import io
+import threading
+
+from PIL import Image
+
+from database.db import transaction
+from pdf.invoice_renderer import InvoiceRenderer
+from pdf.render_context import get_render_context, invalidate_render_context
+
+
+def _png(width, height):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_context_caches_until_invalidated(temp_db):
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO business_info (id, company_name) VALUES (1, 'Alt GmbH')")
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('logo', ?)", (_png(40, 20),))
+
+    context = get_render_context()
+    assert context is get_render_context(temp_db)
+    assert context.business_info["company_name"] == "Alt GmbH"
+    logo = context.logo
+    assert context.logo_aspect == 0.5
+
+    with transaction() as conn:
+        conn.execute("UPDATE business_info SET company_name = 'Neu GmbH' WHERE id = 1")
+        conn.execute("UPDATE settings SET value = ? WHERE key = 'logo'", (_png(20, 40),))
+    assert context.business_info["company_name"] == "Alt GmbH"
+    assert context.logo is logo
+
+    invalidate_render_context()
+    assert context.business_info["company_name"] == "Neu GmbH"
+    assert context.logo_aspect == 2
+
+
+def test_render_uses_cached_logo(temp_db, tmp_path):
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('logo', ?)", (_png(40, 20),))
+    invalidate_render_context()
+
+    renderer = InvoiceRenderer()
+    items = [{"product": "Kabel", "quantity": 1, "price": 2.0}]
+    for name in ("a.pdf", "b.pdf"):
+        renderer.render(str(tmp_path / name), items)
+        assert b"/Subtype /Image" in (tmp_path / name).read_bytes()
+
+
+def test_snapshot_is_not_affected_by_invalidation(temp_db):
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO business_info (id, company_name) VALUES (1, 'Alt GmbH')")
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('logo', ?)", (_png(40, 20),))
+    invalidate_render_context()
+
+    snapshot = get_render_context().snapshot()
+    with transaction() as conn:
+        conn.execute("UPDATE business_info SET company_name = 'Neu GmbH' WHERE id = 1")
+        conn.execute("DELETE FROM settings WHERE key = 'logo'")
+    invalidate_render_context()
+
+    assert snapshot.business_info["company_name"] == "Alt GmbH"
+    assert snapshot.logo is not None and snapshot.logo_aspect == 0.5
+    fresh = get_render_context().snapshot()
+    assert (fresh.business_info["company_name"], fresh.logo, fresh.logo_aspect) == ("Neu GmbH", None, None)
+
+
+def test_snapshots_stay_consistent_while_invalidated_from_another_thread(temp_db):
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('logo', ?)", (_png(40, 20),))
+    context = get_render_context()
+    stop = threading.Event()
+
+    def invalidate():
+        while not stop.is_set():
+            context.invalidate()
+
+    thread = threading.Thread(target=invalidate)
+    thread.start()
+    try:
+        for _ in range(200):
+            snapshot = context.snapshot()
+            assert snapshot.business_info is not None
+            assert snapshot.logo is not None and snapshot.logo_aspect == 0.5
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+from database.db import get_connection, transaction
+from gui.render_worker import RenderCancelled, RenderQueue
+from models.invoice import InvoiceSnapshot
+from models.invoice_line import InvoiceLine
+from pdf.invoice_data import read_invoice_data
+from pdf.invoice_generator import InvoiceGenerator
+
+
+def _drain(queue):
+    queue.wait()
+    QCoreApplication.processEvents()
+
+
+def _record(queue):
+    events = []
+    queue.progress.connect(lambda tid, done, total: events.append(("progress", tid, done, total)))
+    queue.finished.connect(lambda tid, path, invoice_id: events.append(("finished", tid, invoice_id)))
+    queue.failed.connect(lambda tid, message: events.append(("failed", tid, message)))
+    queue.cancelled.connect(lambda tid: events.append(("cancelled", tid)))
+    return events
+
+
+def test_snapshot_is_detached_from_the_table_lines():
+    line = InvoiceLine(7, 1, "2.50", "Kabel")
+    snapshot = InvoiceSnapshot([line], {"id": 3}, None, 0.0, "2024-05-31")
+    line.quantity = 5
+    snapshot.customer["id"] = 4
+
+    invoice = snapshot.to_invoice()
+    assert (invoice.customer_id, invoice.lines[0].quantity, invoice.lines[0].price_cents) == (3, 1, 250)
+    with pytest.raises(AttributeError):
+        snapshot.lines = ()
+
+
+def test_queued_saves_write_pdf_and_rows(qapp, temp_db, tmp_path):
+    queue = RenderQueue(InvoiceGenerator())
+    events = _record(queue)
+    lines = [InvoiceLine(None, 1, "1.00", f"Artikel {i}") for i in range(120)]
+
+    paths = [str(tmp_path / f"Rechnung{i}.pdf") for i in range(3)]
+    for path in paths:
+        queue.submit(InvoiceSnapshot(lines, {"id": 1}, None, 0.0, "2024-05-31"), path)
+    assert queue.pending() == 3
+    _drain(queue)
+
+    assert queue.pending() == 0
+    assert [e[:2] for e in events if e[0] == "finished"] == [("finished", 1), ("finished", 2), ("finished", 3)]
+    assert ("progress", 1, 50, 120) in events and ("progress", 1, 120, 120) in events
+    assert get_connection().execute("SELECT COUNT(*) FROM invoice_lines").fetchone()[0] == 360
+    assert all(read_invoice_data(path) for path in paths)
+
+
+class BlockingGenerator:
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def write_invoice(self, snapshot, file_path, progress):
+        self.started.set()
+        self.release.wait(5)
+        progress(1, 1)
+        return 1
+
+
+def test_cancel_queued_and_running_saves(qapp):
+    generator = BlockingGenerator()
+    queue = RenderQueue(generator)
+    events = _record(queue)
+
+    running = queue.submit(InvoiceSnapshot([]), "a.pdf")
+    queued = queue.submit(InvoiceSnapshot([]), "b.pdf")
+    assert generator.started.wait(5)
+
+    queue.cancel(queued)          # still waiting: taken off the pool directly
+    assert events == [("cancelled", queued)]
+    queue.cancel()                # running: stops at its next progress call
+    generator.release.set()
+    _drain(queue)
+
+    assert events == [("cancelled", queued), ("cancelled", running)]
+    assert queue.pending() == 0
+
+
+def test_rendering_does_not_hold_the_write_lock(temp_db, tmp_path):
+    waited = []
+
+    def write_from_gui_thread():
+        start = time.perf_counter()
+        with transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('probe', 1)")
+        waited.append(time.perf_counter() - start)
+
+    def progress(done, total):
+        if done == 100:  # mid-render
+            thread = threading.Thread(target=write_from_gui_thread)
+            thread.start()
+            thread.join()
+
+    lines = [InvoiceLine(None, 1, "1.00", f"Artikel {i}") for i in range(200)]
+    out = tmp_path / "pdf"
+    out.mkdir()
+    path = str(out / "Rechnung.pdf")
+    InvoiceGenerator().write_invoice(InvoiceSnapshot(lines, {"id": 1}, None, 0.0, "2024-05-31"), path, progress)
+
+    assert waited and waited[0] < 1.0
+    assert read_invoice_data(path)
+    assert os.listdir(out) == ["Rechnung.pdf"]
+
+
+def test_cancelled_save_leaves_no_rows_and_no_files(temp_db, tmp_path):
+    def progress(done, total):
+        if done == 10:
+            raise RenderCancelled()
+
+    out = tmp_path / "pdf"
+    out.mkdir()
+    lines = [InvoiceLine(None, 1, "1.00", f"Artikel {i}") for i in range(50)]
+    with pytest.raises(RenderCancelled):
+        InvoiceGenerator().write_invoice(InvoiceSnapshot(lines, {"id": 1}, None, 0.0, "2024-05-31"),
+                                         str(out / "Rechnung.pdf"), progress)
+
+    assert get_connection().execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 0
+    assert os.listdir(out) == []
+
+
+def test_failed_commit_restores_the_overwritten_pdf(temp_db, tmp_path, monkeypatch):
+    from contextlib import contextmanager
+    from pdf import invoice_generator
+
+    @contextmanager
+    def failing_commit(**kwargs):
+        with transaction(**kwargs) as conn:
+            yield conn
+            raise RuntimeError("disk I/O error")
+
+    out = tmp_path / "pdf"
+    out.mkdir()
+    path = out / "Rechnung.pdf"
+    path.write_bytes(b"%PDF previous invoice")
+    monkeypatch.setattr(invoice_generator, "transaction", failing_commit)
+
+    lines = [InvoiceLine(None, 1, "1.00", "Kabel")]
+    with pytest.raises(RuntimeError):
+        InvoiceGenerator().write_invoice(InvoiceSnapshot(lines, {"id": 1}, None, 0.0, "2024-05-31"), str(path))
+
+    assert get_connection().execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 0
+    assert os.listdir(out) == ["Rechnung.pdf"]
+    assert path.read_bytes() == b"%PDF previous invoice"
+
+
+def test_overwriting_a_pdf_leaves_no_backup(temp_db, tmp_path):
+    out = tmp_path / "pdf"
+    out.mkdir()
+    path = out / "Rechnung.pdf"
+    path.write_bytes(b"%PDF previous invoice")
+
+    lines = [InvoiceLine(None, 1, "1.00", "Kabel")]
+    InvoiceGenerator().write_invoice(InvoiceSnapshot(lines, {"id": 1}, None, 0.0, "2024-05-31"), str(path))
+
+    assert os.listdir(out) == ["Rechnung.pdf"]
+    assert read_invoice_data(str(path))
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+from PySide6.QtCore import QEventLoop, QTimer
+
+from database.db import transaction
+from gui.main_window import MainWindow
+from pdf.render_context import get_render_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_main_window_import_does_not_load_reportlab():
+    # Fresh interpreter: this test process has imported reportlab long ago
+    code = "import sys, gui.main_window; print(sorted(m for m in sys.modules if m.startswith('reportlab')))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_data_is_loaded_after_the_first_paint(qapp, temp_db):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO products (name, price) VALUES (?, ?)", [("Kabel", 2.5), ("Dose", 4.0)])
+        conn.executemany("INSERT INTO customers (name) VALUES (?)", [("Beta GmbH",), ("Alpha AG",)])
+        conn.execute("INSERT INTO settings (key, value) VALUES ('logo', ?)", (b"not decoded yet",))
+
+    window = MainWindow()
+    events = []
+    window.first_painted.connect(lambda: events.append("first_painted"))
+    window.ready.connect(lambda: events.append("ready"))
+    assert window.product_list.model() is None and window.customer_combo.count() == 0
+
+    loop = QEventLoop()
+    window.ready.connect(loop.quit)
+    QTimer.singleShot(5000, loop.quit)
+    window.show()
+    loop.exec()
+
+    assert events == ["first_painted", "ready"]
+    assert window.product_model.rowCount() == 2
+    assert [window.customer_combo.itemText(i) for i in range(2)] == ["2 – Alpha AG", "1 – Beta GmbH"]
+    assert get_render_context()._logo_blob == b"not decoded yet"
+    assert window.invoice_generator._renderer is None  # reportlab is only needed for the first save
+    window.close()
@@ -1,6 +1,7 @@
 def format_currency(amount):
     return f"{amount:.2f}€"
 
-def generate_invoice_number():
-    # Placeholder: in real app, you would query DB for last invoice
-    return 1
+def generate_invoice_number(invoice_date=None):
+    """Allocate the next invoice number (see database.invoice_numbers)."""
+    from database.invoice_numbers import next_invoice_number
+    return next_invoice_number(invoice_date)
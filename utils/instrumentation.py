@@ -0,0 +1,286 @@
+"""
+Timing instrumentation for "why is this slow?" reports.
+
+Disabled by default; every hook then costs a single flag check. Enabled by
+the environment (or the matching command line flags of main.py):
+
+    BILLCRAFT_TRACE=trace.jsonl      write one JSON object per timed event
+    BILLCRAFT_PROFILE=gui.save_invoice
+                                     run the first such operation under
+                                     cProfile and dump it next to the trace
+
+Events look like
+    {"ts": 1718000000.123, "thread": "MainThread", "name": "db.query",
+     "ms": 0.412, "sql": "SELECT ...", "rows": 1}
+
+Hooks:
+    span(name, **fields)    context manager, e.g. the PDF rendering phases
+    timed(name)             decorator, e.g. GUI handlers
+    traced_connection(conn) wraps a sqlite3 connection so every statement is
+                            recorded with its SQL text, time and row count
+                            (database.db applies it to pooled connections)
+"""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+
+ENV_TRACE = "BILLCRAFT_TRACE"
+ENV_PROFILE = "BILLCRAFT_PROFILE"
+
+SQL_MAX_LENGTH = 500
+
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.trace = None
+        self.profile = None       # operation name still to be profiled
+        self.profile_dir = "."
+        self.lock = threading.Lock()
+
+
+_state = _State()
+
+
+def enabled():
+    return _state.enabled
+
+
+def configure(trace_file=None, profile=None):
+    """
+    Start tracing to trace_file (JSON lines, appended) and/or profiling the
+    first operation called profile. Without both, instrumentation is off.
+    """
+    disable()
+    if trace_file:
+        _state.trace = open(trace_file, "a", encoding="utf-8", buffering=1)
+        _state.profile_dir = os.path.dirname(os.path.abspath(trace_file))
+    _state.profile = profile or None
+    _state.enabled = bool(trace_file or profile)
+
+
+def configure_from_env():
+    configure(os.environ.get(ENV_TRACE), os.environ.get(ENV_PROFILE))
+
+
+def disable():
+    _state.enabled = False
+    _state.profile = None
+    if _state.trace is not None:
+        _state.trace.close()
+        _state.trace = None
+
+
+def record(name, ms, **fields):
+    """Write one event to the trace (if a trace file is configured)."""
+    if _state.trace is None:
+        return
+    event = {"ts": round(time.time(), 3), "thread": threading.current_thread().name,
+             "name": name, "ms": round(ms, 3), **fields}
+    line = json.dumps(event, ensure_ascii=False, default=str)
+    with _state.lock:
+        if _state.trace is not None:
+            _state.trace.write(line + "\n")
+
+
+# ----------------------------------------------------------
+# SPANS AND DECORATORS
+# ----------------------------------------------------------
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "fields", "start", "profiler")
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.profiler = None
+
+    def set(self, **fields):
+        """Attach more fields (e.g. a page count known only at the end)."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        if _state.profile == self.name:
+            _state.profile = None  # a single operation only
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.start) * 1000
+        if self.profiler is not None:
+            self.profiler.disable()
+            path = os.path.join(_state.profile_dir, f"{self.name}-{int(time.time())}.prof")
+            self.profiler.dump_stats(path)
+            self.fields["profile"] = path
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        record(self.name, ms, **self.fields)
+        return False
+
+
+def span(name, **fields):
+    """Time a block: with span("pdf.table", lines=n): ..."""
+    if not _state.enabled:
+        return _NULL_SPAN
+    return _Span(name, fields)
+
+
+def timed(name=None):
+    """Decorator version of span(); the name defaults to module.function."""
+    def decorate(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ----------------------------------------------------------
+# DATABASE
+# ----------------------------------------------------------
+def _sql_text(sql):
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= SQL_MAX_LENGTH else sql[:SQL_MAX_LENGTH] + "..."
+
+
+class TracedCursor:
+    """
+    Cursor proxy that records one db.query event per statement: the time
+    spent executing and fetching, and the rows fetched (or changed, for
+    writes). The event is written once the result is exhausted, the cursor
+    is reused, or the proxy is dropped.
+    """
+
+    def __init__(self, cursor):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_pending", None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)  # e.g. row_factory
+
+    def _start(self, sql, method, args):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            method(sql, *args)
+        finally:
+            # [sql, ms, rows]
+            object.__setattr__(self, "_pending", [sql, (time.perf_counter() - start) * 1000, 0])
+        return self
+
+    def _fetched(self, start, rows, done):
+        pending = self._pending
+        if pending is not None:
+            pending[1] += (time.perf_counter() - start) * 1000
+            pending[2] += rows
+            if done:
+                self._finish()
+
+    def _finish(self):
+        pending = self._pending
+        if pending is None:
+            return
+        object.__setattr__(self, "_pending", None)
+        sql, ms, rows = pending
+        if self._cursor.rowcount > 0:
+            rows = max(rows, self._cursor.rowcount)
+        record("db.query", ms, sql=_sql_text(sql), rows=rows)
+
+    def execute(self, sql, parameters=()):
+        return self._start(sql, self._cursor.execute, (parameters,))
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._start(sql, self._cursor.executemany, (seq_of_parameters,))
+
+    def executescript(self, script):
+        return self._start(script, self._cursor.executescript, ())
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size if size is not None else self._cursor.arraysize)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class TracedConnection:
+    """Connection proxy whose statements go through TracedCursor."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args):
+        return TracedCursor(self._conn.cursor(*args))
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+def traced_connection(conn):
+    """conn itself while instrumentation is off, otherwise a recording proxy."""
+    return TracedConnection(conn) if _state.enabled and _state.trace is not None else conn